@@ -1,12 +1,12 @@
 # Darcy AI - API Bridge
 # Ponte de comunicação entre componentes Python e sistema JavaScript
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
-import asyncio
+import atexit
+import contextlib
 import json
 import os
-import tempfile
 from pathlib import Path
 import logging
 from datetime import datetime
@@ -18,6 +18,9 @@ from darcy_python_core import (
     DarcyMLEnhancer, 
     DarcyWebScraper
 )
+from darcy_uploads import UploadSource
+from darcy_jobs import JobQueue, JobQueueFull
+from darcy_interaction_store import timestamp_seconds
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -30,12 +33,12 @@ CORS(app)  # Permitir requests do frontend JavaScript
 core = None
 components = {}
 
-async def initialize_components():
-    """Inicializa componentes Python"""
+def initialize_components():
+    """Inicializa componentes Python (corrotinas rodam no event loop de fundo do core)"""
     global core, components
     
     core = DarcyPythonCore()
-    await core.initialize()
+    core.run_coroutine(core.initialize())
     
     components = {
         'analyzer': DarcyDataAnalyzer(core),
@@ -44,8 +47,38 @@ async def initialize_components():
         'scraper': DarcyWebScraper(core)
     }
     
+    jobs_config = core.config["jobs"]
+    components['jobs'] = JobQueue(
+        run_file_job,
+        workers=jobs_config.get("workers", 2),
+        max_pending=jobs_config.get("max_pending", 16),
+        result_ttl=jobs_config.get("result_ttl", 3600)
+    )
+    
     logger.info("🐍 Componentes Python inicializados")
 
+def shutdown_components():
+    """Encerra fila de jobs e pool de processos ao desligar o servidor"""
+    if 'jobs' in components:
+        components['jobs'].shutdown()
+    if 'analyzer' in components:
+        components['analyzer'].close()
+    if core:
+        core.shutdown_process_pool()
+        core.stop_event_loop()
+
+def run_file_job(job):
+    """Executa um job de processamento de arquivo (thread da fila de jobs)"""
+    payload = job.payload
+    return core.run_coroutine(components['processor'].process_file(
+        payload["source"],
+        payload["filename"],
+        payload["ocr_scanned_pages"],
+        progress_callback=job.report_progress
+    ))
+
+atexit.register(shutdown_components)
+
 @app.route('/api/python/health', methods=['GET'])
 def health_check():
     """Verificação de saúde da API Python"""
@@ -59,24 +92,73 @@ def health_check():
             "enhancer": "enhancer" in components,
             "scraper": "scraper" in components
         },
-        "llm_providers": core.llm_providers if core else {}
+        "llm_providers": core.llm_providers if core else {},
+        "file_cache": core.file_cache.stats() if core and core.file_cache else {},
+        "tokenizer": core.tokenizer.stats() if core else {},
+        "http_session": core.session_stats() if core else {},
+        "http_cache": core.http_cache.stats() if core and core.http_cache else {},
+        "enhancement_memo": components['enhancer'].memo_stats() if 'enhancer' in components else {},
+        "enhancement_scorers": components['enhancer'].scorer_stats() if 'enhancer' in components else {},
+        "semantic": components['enhancer'].semantic_stats() if 'enhancer' in components else {},
+        "stream_sessions": components['enhancer'].stream_sessions.stats() if 'enhancer' in components else {},
+        "jobs": components['jobs'].stats() if 'jobs' in components else {},
+        "interaction_store": (
+            components['analyzer'].interaction_store.stats()
+            if 'analyzer' in components and components['analyzer'].interaction_store else {}
+        )
     })
 
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-lines')
+
+class InvalidRecord(ValueError):
+    """Linha NDJSON que não é um objeto JSON"""
+
+def ndjson_records(stream):
+    """Lê objetos JSON linha a linha do corpo da requisição (sem carregar o corpo inteiro)"""
+    line_number = 0
+    while True:
+        line = stream.readline()
+        if not line:
+            break
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise InvalidRecord(f"linha {line_number}: {e}")
+        if not isinstance(record, dict):
+            raise InvalidRecord(f"linha {line_number}: esperado um objeto JSON")
+        yield record
+
 @app.route('/api/python/analyze-interactions', methods=['POST'])
 def analyze_interactions():
-    """Analisa padrões de interação do usuário"""
+    """
+    Analisa padrões de interação do usuário
+    - JSON: {"interactions": [...]}
+    - NDJSON (Content-Type application/x-ndjson): uma interação por linha,
+      processada em lotes à medida que o corpo chega
+    """
     try:
-        data = request.get_json()
-        interactions = data.get('interactions', [])
-        
-        if not interactions:
-            return jsonify({"error": "Nenhuma interação fornecida"}), 400
-        
         analyzer = components.get('analyzer')
         if not analyzer:
             return jsonify({"error": "Analisador não inicializado"}), 500
+        
+        if request.mimetype in NDJSON_MIMETYPES:
+            try:
+                result = analyzer.analyze_interaction_stream(ndjson_records(request.stream))
+            except InvalidRecord as e:
+                return jsonify({"error": f"NDJSON inválido: {e}"}), 400
+            if result is None:
+                return jsonify({"error": "Nenhuma interação fornecida"}), 400
+        else:
+            data = request.get_json()
+            interactions = data.get('interactions', [])
             
-        result = analyzer.analyze_learning_patterns(interactions)
+            if not interactions:
+                return jsonify({"error": "Nenhuma interação fornecida"}), 400
+                
+            result = analyzer.analyze_learning_patterns(interactions)
         
         return jsonify({
             "success": True,
@@ -88,6 +170,207 @@ def analyze_interactions():
         logger.error(f"Erro na análise: {e}")
         return jsonify({"error": str(e)}), 500
 
+def pattern_store_request(user_id: str):
+    """Analisador e validação do user_id para as rotas de interações por usuário"""
+    analyzer = components.get('analyzer')
+    if not analyzer:
+        return None, (jsonify({"error": "Analisador não inicializado"}), 500)
+    if not analyzer.get_pattern_store().valid_user_id(user_id):
+        return None, (jsonify({"error": "user_id inválido"}), 400)
+    return analyzer, None
+
+@app.route('/api/python/interactions/<user_id>', methods=['POST'])
+def append_interactions(user_id):
+    """Incorpora novas interações ao estado agregado do usuário"""
+    try:
+        analyzer, error = pattern_store_request(user_id)
+        if error:
+            return error
+        
+        data = request.get_json(silent=True) or {}
+        interactions = data.get('interactions', [])
+        if not isinstance(interactions, list) or not interactions:
+            return jsonify({"error": "Nenhuma interação fornecida"}), 400
+        if not all(isinstance(item, dict) for item in interactions):
+            return jsonify({"error": "Cada interação deve ser um objeto"}), 400
+        
+        return jsonify({
+            "success": True,
+            **analyzer.record_interactions(user_id, interactions),
+            "timestamp": datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao registrar interações: {e}")
+        return jsonify({"error": str(e)}), 500
+
+def period_params():
+    """Intervalo opcional da análise: ?days=N ou ?since=/until= (ISO 8601), em segundos UTC"""
+    days = request.args.get('days')
+    since = request.args.get('since')
+    until = request.args.get('until')
+    if days is None and since is None and until is None:
+        return None
+    
+    now = datetime.now().timestamp()
+    if days is not None:
+        return now - float(days) * 86400, None
+    
+    def parse(value):
+        if value is None:
+            return None
+        seconds = timestamp_seconds(value)
+        if seconds is None:
+            raise ValueError(f"Data inválida: {value}")
+        return seconds
+    
+    return parse(since), parse(until)
+
+@app.route('/api/python/interactions/<user_id>/analysis', methods=['GET'])
+def interactions_analysis(user_id):
+    """
+    Análise atual do usuário, sem reenviar o histórico
+    Com ?days= ou ?since=/until=, analisa só o intervalo no histórico armazenado
+    """
+    analyzer, error = pattern_store_request(user_id)
+    if error:
+        return error
+    
+    try:
+        period = period_params()
+    except ValueError as e:
+        return jsonify({"error": f"Intervalo inválido: {e}"}), 400
+    
+    if period is None:
+        analysis = analyzer.get_learning_patterns(user_id)
+    else:
+        analysis = analyzer.analyze_period(user_id, *period)
+        if analysis is not None and "error" in analysis:
+            return jsonify(analysis), 500
+    if analysis is None:
+        return jsonify({"error": "Nenhuma interação registrada para o usuário"}), 404
+    
+    return jsonify({
+        "success": True,
+        "analysis": analysis,
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/python/interactions/<user_id>/activity', methods=['GET'])
+def interactions_activity(user_id):
+    """Atividade do usuário por hora, dia ou semana (?resolution=hour|day|week, ?days= ou ?since=/until=)"""
+    analyzer, error = pattern_store_request(user_id)
+    if error:
+        return error
+    
+    resolution = request.args.get('resolution', 'day')
+    try:
+        since, until = period_params() or (None, None)
+        buckets = analyzer.activity(user_id, resolution, since, until)
+    except ValueError as e:
+        return jsonify({"error": f"Parâmetros inválidos: {e}"}), 400
+    if buckets is None:
+        return jsonify({"error": "Armazenamento de interações desativado"}), 500
+    
+    return jsonify({
+        "success": True,
+        "user_id": user_id,
+        "resolution": resolution,
+        "buckets": buckets,
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/python/cohorts/analyze', methods=['POST'])
+def analyze_cohort():
+    """
+    Relatório de turma/escola processado em shards paralelos
+    - {"users": {"<user_id>": [interações...]}}: interações enviadas na requisição
+    - {"user_ids": [...], "days": N | "since"/"until", "resolution": "week"}: histórico armazenado
+    """
+    try:
+        analyzer = components.get('analyzer')
+        if not analyzer:
+            return jsonify({"error": "Analisador não inicializado"}), 500
+        
+        data = request.get_json(silent=True) or {}
+        users = data.get('users')
+        user_ids = data.get('user_ids')
+        max_users = core.config["cohorts"].get("max_users", 5000)
+        
+        if users is not None:
+            if not isinstance(users, dict) or not all(isinstance(v, list) for v in users.values()):
+                return jsonify({"error": "users deve mapear user_id para uma lista de interações"}), 400
+            count = len(users)
+        elif isinstance(user_ids, list):
+            store = analyzer.get_pattern_store()
+            if not all(isinstance(u, str) and store.valid_user_id(u) for u in user_ids):
+                return jsonify({"error": "user_id inválido"}), 400
+            count = len(set(user_ids))
+            user_ids = list(dict.fromkeys(user_ids))
+        else:
+            return jsonify({"error": "Informe users ou user_ids"}), 400
+        
+        if count == 0:
+            return jsonify({"error": "Nenhum usuário informado"}), 400
+        if count > max_users:
+            return jsonify({"error": f"Máximo de {max_users} usuários por relatório"}), 400
+        
+        since = until = None
+        if users is None:
+            if data.get('days') is not None:
+                since = datetime.now().timestamp() - float(data['days']) * 86400
+            else:
+                since = timestamp_seconds(data['since']) if data.get('since') else None
+                until = timestamp_seconds(data['until']) if data.get('until') else None
+        
+        report = core.run_coroutine(analyzer.analyze_cohort(
+            users=users,
+            user_ids=user_ids if users is None else None,
+            since=since,
+            until=until,
+            resolution=data.get('resolution')
+        ))
+        
+        if "error" in report:
+            return jsonify(report), 500
+        
+        return jsonify({
+            "success": True,
+            **report,
+            "timestamp": datetime.now().isoformat()
+        })
+        
+    except ValueError as e:
+        return jsonify({"error": f"Parâmetros inválidos: {e}"}), 400
+    except Exception as e:
+        logger.error(f"Erro na análise de coorte: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/python/interactions/<user_id>', methods=['DELETE'])
+def reset_interactions(user_id):
+    """Apaga o estado agregado e o histórico do usuário"""
+    analyzer, error = pattern_store_request(user_id)
+    if error:
+        return error
+    
+    if not analyzer.forget_user(user_id):
+        return jsonify({"error": "Nenhuma interação registrada para o usuário"}), 404
+    return jsonify({"success": True, "user_id": user_id})
+
+def ocr_form_option():
+    """Campo opcional "ocr": liga/desliga OCR das páginas digitalizadas de PDFs"""
+    ocr = request.form.get('ocr')
+    return None if ocr is None else ocr.lower() in ('1', 'true', 'yes')
+
+def open_upload(file) -> UploadSource:
+    """Recebe o upload sem gravar em disco, exceto acima do limite configurado"""
+    return UploadSource.from_stream(
+        file.stream,
+        file.filename,
+        memory_threshold=core.config["uploads"]["memory_threshold"],
+        temp_root=core.config["file_paths"]["temp"]
+    )
+
 @app.route('/api/python/process-file', methods=['POST'])
 def process_file():
     """Processa arquivos enviados pelo usuário"""
@@ -99,37 +382,15 @@ def process_file():
         if file.filename == '':
             return jsonify({"error": "Nome de arquivo inválido"}), 400
         
-        # Salvar arquivo temporariamente
-        temp_dir = tempfile.mkdtemp()
-        file_path = os.path.join(temp_dir, file.filename)
-        file.save(file_path)
-        
         processor = components.get('processor')
         if not processor:
             return jsonify({"error": "Processador não inicializado"}), 500
         
-        # Determinar tipo de arquivo e processar
-        file_ext = Path(file.filename).suffix.lower()
-        
-        if file_ext == '.pdf':
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(processor.process_pdf(file_path))
-            loop.close()
-        elif file_ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(processor.process_image(file_path))
-            loop.close()
-        else:
-            result = {"error": f"Tipo de arquivo não suportado: {file_ext}"}
-        
-        # Limpar arquivo temporário
-        try:
-            os.remove(file_path)
-            os.rmdir(temp_dir)
-        except:
-            pass
+        # Upload processado em memória (arquivo temporário só acima do limite)
+        with open_upload(file) as source:
+            result = core.run_coroutine(
+                processor.process_file(source, file.filename, ocr_form_option())
+            )
             
         return jsonify({
             "success": True,
@@ -142,6 +403,165 @@ def process_file():
         logger.error(f"Erro no processamento: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/python/process-files', methods=['POST'])
+def process_files():
+    """Processa vários arquivos enviados em uma única requisição multipart"""
+    try:
+        files = [f for f in request.files.getlist('files') if f.filename]
+        if not files:
+            return jsonify({"error": "Nenhum arquivo enviado (campo 'files')"}), 400
+        
+        max_files = core.config["batch"].get("max_files", 50)
+        if len(files) > max_files:
+            return jsonify({"error": f"Máximo de {max_files} arquivos por lote"}), 400
+        
+        processor = components.get('processor')
+        if not processor:
+            return jsonify({"error": "Processador não inicializado"}), 500
+        
+        with contextlib.ExitStack() as uploads:
+            batch = [(f.filename, uploads.enter_context(open_upload(f))) for f in files]
+            
+            result = core.run_coroutine(processor.process_batch(batch, ocr_form_option()))
+        
+        return jsonify({
+            "success": True,
+            "results": result["results"],
+            "stats": result["stats"],
+            "timestamp": datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro no processamento em lote: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/python/jobs', methods=['POST'])
+def submit_job():
+    """Enfileira o processamento de um arquivo e retorna o ID do job (202)"""
+    if 'file' not in request.files:
+        return jsonify({"error": "Nenhum arquivo enviado"}), 400
+        
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({"error": "Nome de arquivo inválido"}), 400
+    
+    jobs = components.get('jobs')
+    if not jobs or 'processor' not in components:
+        return jsonify({"error": "Fila de jobs não inicializada"}), 500
+    
+    source = open_upload(file)
+    try:
+        job = jobs.submit(
+            {"source": source, "filename": file.filename, "ocr_scanned_pages": ocr_form_option()},
+            description=file.filename,
+            cleanup=source.close
+        )
+    except JobQueueFull as e:
+        source.close()
+        response = jsonify({"error": str(e), "retry_after": e.retry_after})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    
+    return jsonify({
+        "success": True,
+        "job": job.to_dict(),
+        "status_url": f"/api/python/jobs/{job.id}",
+        "result_url": f"/api/python/jobs/{job.id}/result"
+    }), 202
+
+@app.route('/api/python/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status e progresso de um job"""
+    job = components['jobs'].get(job_id) if 'jobs' in components else None
+    if not job:
+        return jsonify({"error": "Job não encontrado ou expirado"}), 404
+    return jsonify({"success": True, "job": job.to_dict()})
+
+@app.route('/api/python/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Resultado de um job finalizado (202 enquanto ainda está em andamento)"""
+    job = components['jobs'].get(job_id) if 'jobs' in components else None
+    if not job:
+        return jsonify({"error": "Job não encontrado ou expirado"}), 404
+    
+    if job.status == job.COMPLETED:
+        return jsonify({
+            "success": True,
+            "result": job.result,
+            "filename": job.description,
+            "job": job.to_dict()
+        })
+    if job.status == job.FAILED:
+        return jsonify({"error": job.error, "job": job.to_dict()}), 500
+    if job.status == job.CANCELLED:
+        return jsonify({"error": "Job cancelado", "job": job.to_dict()}), 409
+    return jsonify({"success": False, "job": job.to_dict()}), 202
+
+@app.route('/api/python/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancela um job na fila ou em execução"""
+    jobs = components.get('jobs')
+    if not jobs or not jobs.get(job_id):
+        return jsonify({"error": "Job não encontrado ou expirado"}), 404
+    return jsonify({"success": True, "cancelled": jobs.cancel(job_id), "job": jobs.get(job_id).to_dict()})
+
+@app.route('/api/python/process-file/stream', methods=['POST'])
+def process_file_stream():
+    """
+    Processa PDF enviado transmitindo o resultado página a página (NDJSON)
+    Cada linha é um registro JSON: "document", um "page" por página e,
+    ao final, "analysis" com a análise educacional do documento inteiro
+    """
+    if 'file' not in request.files:
+        return jsonify({"error": "Nenhum arquivo enviado"}), 400
+        
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({"error": "Nome de arquivo inválido"}), 400
+    
+    if Path(file.filename).suffix.lower() != '.pdf':
+        return jsonify({"error": "Streaming disponível apenas para PDF"}), 400
+    
+    processor = components.get('processor')
+    if not processor:
+        return jsonify({"error": "Processador não inicializado"}), 500
+    
+    # Upload em memória ou em arquivo temporário, liberado quando o servidor
+    # fecha a resposta (também se o cliente desconectar antes do primeiro registro)
+    source = open_upload(file)
+    filename = file.filename
+    
+    def generate():
+        # Estatísticas acumuladas página a página: memória não cresce com o PDF
+        stats = processor.new_document_stats()
+        pages = 0
+        try:
+            # Extração no pool de processos, fora da thread da requisição
+            for record in processor.stream_pdf_pages(source):
+                if record["type"] == "document":
+                    pages = record["pages"]
+                else:
+                    stats.add_page(record["text"])
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+            
+            yield json.dumps({
+                "type": "analysis",
+                "filename": filename,
+                "pages": pages,
+                "educational_analysis": stats.educational_analysis(),
+                "timestamp": datetime.now().isoformat()
+            }, ensure_ascii=False) + "\n"
+            
+        except ImportError:
+            yield json.dumps({"type": "error", "error": "Bibliotecas PDF não instaladas (pip install PyPDF2 pymupdf)"}) + "\n"
+        except Exception as e:
+            logger.error(f"Erro no processamento em streaming: {e}")
+            yield json.dumps({"type": "error", "error": f"Erro ao processar PDF: {e}"}, ensure_ascii=False) + "\n"
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.call_on_close(source.close)
+    return response
+
 @app.route('/api/python/enhance-response', methods=['POST'])
 def enhance_response():
     """Melhora qualidade de resposta usando ML"""
@@ -153,11 +573,23 @@ def enhance_response():
         if not response:
             return jsonify({"error": "Resposta não fornecida"}), 400
         
+        # Prazo da requisição em ms (no corpo ou no cabeçalho X-Deadline-Ms)
+        deadline_ms = data.get('deadline_ms', request.headers.get('X-Deadline-Ms'))
+        if deadline_ms is None:
+            deadline_ms = core.config["enhancement"].get("deadline_ms")
+        if deadline_ms is not None:
+            try:
+                deadline_ms = float(deadline_ms)
+            except (TypeError, ValueError):
+                deadline_ms = -1
+            if deadline_ms <= 0:
+                return jsonify({"error": "deadline_ms deve ser um número positivo"}), 400
+        
         enhancer = components.get('enhancer')
         if not enhancer:
             return jsonify({"error": "Melhorador não inicializado"}), 500
             
-        result = enhancer.enhance_response_quality(response, context)
+        result = enhancer.enhance_response_quality(response, context, deadline_ms=deadline_ms)
         
         return jsonify({
             "success": True,
@@ -169,6 +601,132 @@ def enhance_response():
         logger.error(f"Erro na melhoria: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/python/enhance-response/batch', methods=['POST'])
+def enhance_response_batch():
+    """Avalia várias respostas com o mesmo contexto (mesmo resultado de chamadas individuais)"""
+    try:
+        data = request.get_json() or {}
+        responses = data.get('responses')
+        context = data.get('context') or {}
+        
+        if not isinstance(responses, list) or not responses:
+            return jsonify({"error": "Lista de respostas não fornecida"}), 400
+        if not all(isinstance(response, str) and response for response in responses):
+            return jsonify({"error": "Todas as respostas devem ser textos não vazios"}), 400
+        
+        enhancer = components.get('enhancer')
+        if not enhancer:
+            return jsonify({"error": "Melhorador não inicializado"}), 500
+        
+        max_batch = core.config["enhancement"].get("max_batch", 64)
+        if len(responses) > max_batch:
+            return jsonify({"error": f"Máximo de {max_batch} respostas por lote"}), 400
+        
+        results = enhancer.enhance_batch(responses, context)
+        
+        return jsonify({
+            "success": True,
+            "enhancements": results,
+            "count": len(results),
+            "timestamp": datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro na melhoria em lote: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/python/enhance-response/stream', methods=['POST'])
+def enhance_response_stream_start():
+    """Abre uma sessão de avaliação incremental (resposta do LLM chegando em trechos)"""
+    try:
+        enhancer = components.get('enhancer')
+        if not enhancer:
+            return jsonify({"error": "Melhorador não inicializado"}), 500
+        
+        data = request.get_json(silent=True) or {}
+        scorer = enhancer.start_stream(data.get('context') or {})
+        return jsonify({"success": True, "session": scorer.status()}), 201
+        
+    except Exception as e:
+        logger.error(f"Erro ao abrir sessão de avaliação: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/python/enhance-response/stream/<session_id>', methods=['POST', 'GET', 'DELETE'])
+def enhance_response_stream(session_id):
+    """
+    POST {"delta": "...", "final": false}: adiciona o trecho e retorna os scores provisórios
+    ("final": true finaliza e retorna a análise completa); GET: scores atuais; DELETE: descarta
+    """
+    try:
+        enhancer = components.get('enhancer')
+        if not enhancer:
+            return jsonify({"error": "Melhorador não inicializado"}), 500
+        
+        if request.method == 'DELETE':
+            return jsonify({"success": True, "removed": enhancer.stream_sessions.remove(session_id)})
+        
+        scorer = enhancer.stream_session(session_id)
+        if scorer is None:
+            return jsonify({"error": "Sessão não encontrada ou expirada"}), 404
+        
+        final = False
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            delta = data.get('delta', '')
+            if not isinstance(delta, str):
+                return jsonify({"error": "Campo 'delta' deve ser texto"}), 400
+            final = bool(data.get('final'))
+            if final:
+                result = enhancer.finish_stream(scorer, delta)
+            else:
+                result = scorer.feed(delta).scores()
+        else:
+            result = scorer.scores()
+        
+        return jsonify({
+            "success": True,
+            "session": scorer.status(),
+            "final": final,
+            "enhancement": result,
+            "timestamp": datetime.now().isoformat()
+        })
+        
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        logger.error(f"Erro na avaliação incremental: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/python/references/<topic>', methods=['POST', 'DELETE'])
+def reference_answers(topic):
+    """Respostas de referência do tópico usadas na completude semântica"""
+    try:
+        enhancer = components.get('enhancer')
+        if not enhancer:
+            return jsonify({"error": "Melhorador não inicializado"}), 500
+        
+        if request.method == 'DELETE':
+            return jsonify({"success": True, "topic": topic, "removed": enhancer.remove_references(topic)})
+        
+        data = request.get_json() or {}
+        answers = data.get('answers')
+        if not isinstance(answers, list) or not answers:
+            return jsonify({"error": "Lista de respostas de referência não fornecida"}), 400
+        
+        added = enhancer.add_references(topic, answers)
+        return jsonify({
+            "success": True,
+            "topic": topic,
+            "added": added,
+            "references": enhancer.semantic_stats()["references"]
+        })
+        
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        logger.error(f"Erro nas referências: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/python/search-educational', methods=['POST'])
 def search_educational():
     """Busca conteúdo educacional na web"""
@@ -184,10 +742,7 @@ def search_educational():
         if not scraper:
             return jsonify({"error": "Scraper não inicializado"}), 500
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(scraper.search_educational_content(query, sources))
-        loop.close()
+        result = core.run_coroutine(scraper.search_educational_content(query, sources))
         
         return jsonify({
             "success": True,
@@ -205,18 +760,28 @@ def get_capabilities():
     return jsonify({
         "data_analysis": {
             "learning_patterns": "Analisa padrões de aprendizado do usuário",
+            "cohort_analysis": "Relatórios de turma/escola processados em shards paralelos",
+            "incremental_learning_patterns": "Estado agregado por usuário, atualizado só com as novas interações",
             "topic_analysis": "Identifica tópicos mais consultados",
             "crew_preferences": "Analisa preferências de equipes",
             "recommendations": "Gera recomendações personalizadas"
         },
         "file_processing": {
             "pdf_processing": "Extrai texto e metadados de PDFs",
+            "pdf_streaming": "Transmite o texto do PDF página a página (NDJSON)",
             "image_ocr": "Reconhecimento de texto em imagens",
+            "background_jobs": "Fila de jobs com progresso por página, cancelamento e resultado posterior",
+            "batch_processing": "Processa vários arquivos em uma requisição, sem repetir duplicados",
+            "scanned_pdf_ocr": "OCR paralelo apenas nas páginas digitalizadas do PDF",
             "educational_content_analysis": "Analisa conteúdo educacional",
             "reading_level_assessment": "Avalia nível de leitura"
         },
         "ml_enhancement": {
             "response_quality": "Avalia qualidade das respostas",
+            "batch_quality": "Avalia várias respostas com o mesmo contexto em uma chamada",
+            "deadline_aware": "Respeita o prazo da requisição (deadline_ms) e retorna resultado parcial",
+            "streaming_quality": "Scores provisórios enquanto a resposta do LLM chega, por sessão",
+            "semantic_completeness": "Compara pergunta, resposta e respostas de referência por n-gramas de caracteres",
             "clarity_assessment": "Analisa clareza do texto",
             "completeness_check": "Verifica completude das respostas",
             "improvement_suggestions": "Sugere melhorias"
@@ -286,16 +851,22 @@ def log_response(response):
 
 if __name__ == '__main__':
     # Inicializar componentes
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(initialize_components())
+    initialize_components()
     
     print("🚀 Darcy AI Python API rodando em http://localhost:5000")
     print("📋 Endpoints disponíveis:")
     print("  - GET  /api/python/health")
-    print("  - POST /api/python/analyze-interactions")
+    print("  - POST /api/python/analyze-interactions  (JSON ou NDJSON)")
+    print("  - POST /api/python/cohorts/analyze")
+    print("  - POST /api/python/interactions/<user_id>  (GET .../analysis[?days=N], GET .../activity, DELETE)")
     print("  - POST /api/python/process-file")
+    print("  - POST /api/python/process-file/stream")
+    print("  - POST /api/python/process-files")
+    print("  - POST /api/python/jobs  (GET/DELETE /api/python/jobs/<id>, GET /api/python/jobs/<id>/result)")
     print("  - POST /api/python/enhance-response") 
+    print("  - POST /api/python/enhance-response/batch")
+    print("  - POST /api/python/enhance-response/stream  (POST/GET/DELETE .../stream/<session_id>)")
+    print("  - POST /api/python/references/<topic>  (DELETE remove o tópico)")
     print("  - POST /api/python/search-educational")
     print("  - GET  /api/python/capabilities")
     print("  - POST /api/python/install-requirements")
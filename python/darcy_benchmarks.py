@@ -0,0 +1,399 @@
+# Darcy AI - Benchmarks
+# Medições de desempenho dos componentes Python (python darcy_benchmarks.py <benchmark>)
+
+import sys
+import time
+import random
+import argparse
+from typing import Callable, Dict, List
+
+def timed(func: Callable, *args, repeat: int = 3):
+    """Executa func algumas vezes e retorna (melhor tempo em segundos, último resultado)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def report(title: str, rows: List[Dict]):
+    """Imprime uma tabela simples de resultados"""
+    print(f"\n📊 {title}")
+    if not rows:
+        return
+    columns = list(rows[0].keys())
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(widths[c]) for c in columns))
+
+# ---------------------------------------------------------------------------
+# Análise de texto educacional (DarcyFileProcessor.analyze_educational_content)
+# ---------------------------------------------------------------------------
+
+def bench_text_analysis(sizes: List[int]):
+    from darcy_python_core import DarcyFileProcessor
+    from tests.support import legacy_analyze_educational_content, sample_text
+
+    processor = DarcyFileProcessor(None)
+    rows = []
+    for size in sizes:
+        text = sample_text(size)
+        legacy_time, _ = timed(legacy_analyze_educational_content, text)
+        current_time, _ = timed(processor.analyze_educational_content, text)
+        rows.append({
+            "words": size,
+            "MB": f"{len(text.encode('utf-8')) / 1e6:.1f}",
+            "legacy_ms": f"{legacy_time * 1000:.1f}",
+            "single_pass_ms": f"{current_time * 1000:.1f}",
+            "speedup": f"{legacy_time / current_time:.2f}x"
+        })
+    report("analyze_educational_content", rows)
+
+def bench_document_stats(sizes: List[int]):
+    import tracemalloc
+    from darcy_python_core import DarcyFileProcessor
+    from tests.support import sample_text
+
+    processor = DarcyFileProcessor(None)
+
+    def peak_kb(func, *args):
+        tracemalloc.start()
+        func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak / 1024
+
+    rows = []
+    for size in sizes:
+        # Páginas de ~500 palavras; o texto completo só existe para a referência
+        pages = [sample_text(500, seed=i) for i in range(max(1, size // 500))]
+        text = "\n".join(pages)
+        rows.append({
+            "words": size,
+            "pages": len(pages),
+            "full_text_peak_kb": f"{peak_kb(processor.analyze_educational_content, text):.0f}",
+            "per_page_peak_kb": f"{peak_kb(processor.analyze_pages, pages):.0f}",
+            "per_page_ms": f"{timed(processor.analyze_pages, pages)[0] * 1000:.1f}"
+        })
+    report("DocumentStatsAccumulator (memória de pico além das páginas)", rows)
+
+# ---------------------------------------------------------------------------
+# Padrões de aprendizado (DarcyDataAnalyzer.analyze_learning_patterns)
+# ---------------------------------------------------------------------------
+
+def bench_learning_patterns(sizes: List[int]):
+    from darcy_python_core import DarcyDataAnalyzer
+    from tests.support import legacy_learning_patterns, sample_interactions
+
+    analyzer = DarcyDataAnalyzer(None)
+    rows = []
+    for size in sizes:
+        interactions = sample_interactions(size)
+        legacy_time, _ = timed(legacy_learning_patterns, analyzer, interactions)
+        current_time, _ = timed(analyzer.analyze_learning_patterns, interactions)
+        basic_time, _ = timed(analyzer.basic_analysis, interactions)
+        rows.append({
+            "interactions": size,
+            "dataframe_ms": f"{legacy_time * 1000:.1f}",
+            "columnar_ms": f"{current_time * 1000:.1f}",
+            "basic_ms": f"{basic_time * 1000:.1f}",
+            "speedup": f"{legacy_time / current_time:.2f}x"
+        })
+    report("analyze_learning_patterns", rows)
+
+# ---------------------------------------------------------------------------
+# Tópicos aproximados (SpaceSavingCounter x Counter exato)
+# ---------------------------------------------------------------------------
+
+def bench_topic_tracking(sizes: List[int]):
+    from collections import Counter
+    from darcy_learning import SpaceSavingCounter
+    from tests.support import zipf_words
+
+    capacity = 500
+    rows = []
+    for size in sizes:
+        words = zipf_words(size, vocabulary=20_000)
+
+        exact_time, exact = timed(Counter, words, repeat=1)
+        approx_time, approx = timed(lambda w: SpaceSavingCounter(capacity).update(w) or None, words, repeat=1)
+        approx = SpaceSavingCounter(capacity)
+        approx.update(words)
+
+        # Shards (ex.: turmas) resumidos separadamente e combinados
+        shards = 8
+        merged = SpaceSavingCounter(capacity)
+        for i in range(shards):
+            shard = SpaceSavingCounter(capacity)
+            shard.update(words[i::shards])
+            merged.merge(shard)
+
+        top_exact = [item for item, _ in exact.most_common(10)]
+        rows.append({
+            "words": size,
+            "distinct": len(exact),
+            "tracked": len(approx),
+            "error_bound": f"{size / capacity:.0f}",
+            "max_error": approx.max_error(),
+            "top10_recall": f"{len(set(top_exact) & set(dict(approx.most_common(10)))) / 10:.0%}",
+            "merged_top10_recall": f"{len(set(top_exact) & set(dict(merged.most_common(10)))) / 10:.0%}",
+            "exact_ms": f"{exact_time * 1000:.1f}",
+            "space_saving_ms": f"{approx_time * 1000:.1f}"
+        })
+    report(f"SpaceSavingCounter(capacity={capacity}) x Counter", rows)
+
+# ---------------------------------------------------------------------------
+# Avaliação de respostas em lote (DarcyMLEnhancer.enhance_batch)
+# ---------------------------------------------------------------------------
+
+def bench_enhance_batch(sizes: List[int]):
+    from darcy_python_core import DarcyPythonCore, DarcyMLEnhancer
+    from tests.support import sample_responses
+
+    core = DarcyPythonCore()
+    memoized = DarcyMLEnhancer(core)
+    enhancer = DarcyMLEnhancer(core)
+    enhancer.memo = None  # compara a avaliação em si, sem memo
+    contexts = [
+        {"query": "Explique derivada e integral de uma função", "crew": "teaching"},
+        {"query": "exercícios sobre células", "crew": "assessment"},
+        {"query": "derivadas", "topic": "calculo"},
+        {}
+    ]
+    for target in (enhancer, memoized):
+        target.add_references("calculo", sample_responses(20, seed=5))
+
+    rows = []
+    for size in sizes:
+        responses = sample_responses(size)
+        context = contexts[0]
+        # Mesmo memo de tokenização nos dois lados: mede só a avaliação
+        for response in responses:
+            enhancer.core.tokenize(response)
+        single_time, single = timed(lambda: [enhancer.enhance_response_quality(r, context) for r in responses])
+        batch_time, batch = timed(enhancer.enhance_batch, responses, context)
+        memoized.enhance_batch(responses, context)
+        memo_time, memo = timed(lambda: [memoized.enhance_response_quality(r, context) for r in responses])
+        rows.append({
+            "responses": size,
+            "single_ms": f"{single_time * 1000:.1f}",
+            "batch_ms": f"{batch_time * 1000:.1f}",
+            "speedup": f"{single_time / batch_time:.2f}x",
+            "memo_hit_ms": f"{memo_time * 1000:.1f}"
+        })
+    report("enhance_batch x enhance_response_quality", rows)
+
+# ---------------------------------------------------------------------------
+# Completude semântica (n-gramas com hashing + índice de referências)
+# ---------------------------------------------------------------------------
+
+SEMANTIC_BUDGET_MS = 5.0
+
+def bench_semantic_completeness(sizes: List[int]):
+    from darcy_python_core import DarcyPythonCore, DarcyMLEnhancer
+    from tests.support import sample_responses
+
+    core = DarcyPythonCore()
+    enhancer = DarcyMLEnhancer(core)
+    references = core.config["semantic"]["max_references_per_topic"]
+    enhancer.add_references("calculo", sample_responses(references, seed=5))
+
+    rows = []
+    for words in sizes:
+        # Textos distintos a cada medição: inclui tokenização (sem acerto no memo)
+        responses = [
+            " ".join(" ".join(sample_responses(words // 8 + 1, seed=seed)).split()[:words])
+            for seed in range(200)
+        ]
+        context = {"query": "Explique derivada e integral de uma função", "topic": "calculo"}
+        latencies = []
+        for response in responses:
+            start = time.perf_counter()
+            enhancer.assess_semantic_completeness(response, context)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        rows.append({
+            "words": words,
+            "references": references,
+            "p50_ms": f"{latencies[len(latencies) // 2]:.2f}",
+            "p95_ms": f"{p95:.2f}",
+            "max_ms": f"{latencies[-1]:.2f}"
+        })
+        assert p95 < SEMANTIC_BUDGET_MS, f"p95 de {p95:.2f} ms acima do orçamento de {SEMANTIC_BUDGET_MS} ms"
+    report(f"assess_semantic_completeness por resposta (orçamento p95 < {SEMANTIC_BUDGET_MS} ms)", rows)
+
+# ---------------------------------------------------------------------------
+# Avaliação incremental de respostas em streaming (ResponseStreamScorer)
+# ---------------------------------------------------------------------------
+
+def bench_response_stream(sizes: List[int]):
+    from darcy_python_core import DarcyPythonCore, DarcyMLEnhancer
+    from tests.support import sample_responses
+
+    enhancer = DarcyMLEnhancer(DarcyPythonCore())
+    enhancer.memo = None
+    enhancer.add_references("calculo", sample_responses(20, seed=5))
+    context = {"query": "Explique derivada e integral de uma função", "crew": "assessment", "topic": "calculo"}
+
+    rows = []
+    for words in sizes:
+        text = " ".join(" ".join(sample_responses(words // 8 + 1, seed=words)).split()[:words])
+        chunks = [text[i:i + 40] for i in range(0, len(text), 40)]  # ~ um delta de LLM
+
+        def incremental():
+            scorer = enhancer.start_stream(context)
+            for chunk in chunks:
+                scorer.feed(chunk).scores()
+            return enhancer.finish_stream(scorer)
+
+        def rescore():
+            received = ""
+            for chunk in chunks:
+                received += chunk
+                enhancer.core.tokenizer.memo.clear()
+                enhancer.enhance_response_quality(received, context)
+            return enhancer.enhance_response_quality(received, context)
+
+        incremental_time, _ = timed(incremental, repeat=1)
+        rescore_time, _ = timed(rescore, repeat=1)
+        rows.append({
+            "words": words,
+            "deltas": len(chunks),
+            "incremental_ms": f"{incremental_time * 1000:.1f}",
+            "per_delta_us": f"{incremental_time / len(chunks) * 1e6:.0f}",
+            "rescore_ms": f"{rescore_time * 1000:.1f}",
+            "speedup": f"{rescore_time / incremental_time:.1f}x"
+        })
+    report("ResponseStreamScorer (feed + scores a cada delta) x reavaliar o texto acumulado", rows)
+
+# ---------------------------------------------------------------------------
+# Avaliação com prazo (enhance_response_quality(..., deadline_ms))
+# ---------------------------------------------------------------------------
+
+def bench_enhance_deadline(sizes: List[int]):
+    from darcy_python_core import DarcyPythonCore, DarcyMLEnhancer
+    from tests.support import sample_responses
+
+    deadline_ms = 10.0
+    context = {"query": "Explique derivada e integral de uma função", "crew": "teaching"}
+    rows = []
+    for slow_ms in sizes:
+        enhancer = DarcyMLEnhancer(DarcyPythonCore())
+        enhancer.memo = None
+
+        # Avaliador opcional lento (ex.: modelo externo), simulado com espera
+        semantic = enhancer.assess_semantic_completeness
+        def slow_semantic(response, context, semantic=semantic, delay=slow_ms / 1000):
+            time.sleep(delay)
+            return semantic(response, context)
+        enhancer._scorers = tuple(
+            (name, slow_semantic if name == "semantic_completeness" else scorer)
+            for name, scorer in enhancer._scorers
+        )
+        enhancer.calibrate_scorers()  # como no __init__: mede e reordena com o avaliador lento
+
+        responses = [" ".join(sample_responses(rng_seed % 7 + 1, seed=rng_seed)) for rng_seed in range(200)]
+        latencies, partial = [], 0
+        for response in responses:
+            start = time.perf_counter()
+            result = enhancer.enhance_response_quality(response, context, deadline_ms=deadline_ms)
+            latencies.append((time.perf_counter() - start) * 1000)
+            partial += result["partial"]
+        # Inclui a primeira chamada: os custos já vêm da calibração
+        ordered = sorted(latencies)
+        p99 = ordered[int(len(ordered) * 0.99) - 1]
+        rows.append({
+            "slow_scorer_ms": slow_ms,
+            "deadline_ms": deadline_ms,
+            "p50_ms": f"{ordered[len(ordered) // 2]:.2f}",
+            "p99_ms": f"{p99:.2f}",
+            "first_ms": f"{latencies[0]:.2f}",
+            "partial": f"{partial / len(responses):.0%}"
+        })
+        assert p99 < deadline_ms, f"p99 de {p99:.2f} ms acima do prazo de {deadline_ms} ms"
+        assert latencies[0] < deadline_ms, f"primeira chamada levou {latencies[0]:.2f} ms (prazo {deadline_ms} ms)"
+    report("enhance_response_quality com prazo e avaliador opcional lento", rows)
+
+# ---------------------------------------------------------------------------
+# Cache HTTP das fontes de busca (HttpResponseCache) contra um servidor local
+# ---------------------------------------------------------------------------
+
+def _zipf_pages(count: int, pages: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, pages + 1)]
+    return [f"pagina{i}" for i in rng.choices(range(pages), weights=weights, k=count)]
+
+def bench_http_cache(sizes: List[int]):
+    import asyncio
+    import tempfile
+    import aiohttp
+    from darcy_http_cache import HttpResponseCache
+    from tests.support import StandInSource
+
+    async def fetch_all(cache, session, url, pages, source="wikipedia_summary"):
+        return [await cache.get_json(session, url + page, source=source) for page in pages]
+
+    async def measure(source, cache_dir, pages):
+        async with aiohttp.ClientSession() as session:
+            start = time.perf_counter()
+            for page in pages:
+                async with session.get(source.url + page) as response:
+                    await response.json()
+            uncached = time.perf_counter() - start
+
+            before = source.counts[200]
+            cache = HttpResponseCache(cache_dir)
+            start = time.perf_counter()
+            await fetch_all(cache, session, source.url, pages)
+            cached = time.perf_counter() - start
+            return uncached, cached, source.counts[200] - before, cache.stats()["totals"]
+
+    source = StandInSource()
+    try:
+        rows = []
+        for requests in sizes:
+            pages = _zipf_pages(requests, pages=max(requests // 10, 1), seed=requests)
+            with tempfile.TemporaryDirectory() as cache_dir:
+                uncached, cached, fetched, totals = asyncio.run(measure(source, cache_dir, pages))
+            rows.append({
+                "requests": requests,
+                "distinct": len(set(pages)),
+                "upstream": fetched,
+                "hit_rate": f"{totals['hit_rate']:.0%}",
+                "uncached_ms": f"{uncached * 1000:.1f}",
+                "cached_ms": f"{cached * 1000:.1f}",
+                "speedup": f"{uncached / cached:.1f}x"
+            })
+        report("HttpResponseCache (buscas com popularidade de Zipf) x GET direto no servidor local", rows)
+    finally:
+        source.close()
+
+BENCHMARKS = {
+    "text-analysis": (bench_text_analysis, [10_000, 100_000, 1_000_000]),
+    "document-stats": (bench_document_stats, [10_000, 100_000, 1_000_000]),
+    "learning-patterns": (bench_learning_patterns, [10_000, 100_000, 1_000_000]),
+    "topic-tracking": (bench_topic_tracking, [100_000, 1_000_000]),
+    "enhance-batch": (bench_enhance_batch, [16, 64, 256]),
+    "semantic-completeness": (bench_semantic_completeness, [50, 300, 1_000]),
+    "response-stream": (bench_response_stream, [200, 1_000, 3_000]),
+    "enhance-deadline": (bench_enhance_deadline, [1, 5, 50]),
+    "http-cache": (bench_http_cache, [100, 1_000, 5_000]),
+}
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks dos componentes Python do Darcy AI")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS) + ["all"])
+    parser.add_argument("--sizes", type=int, nargs="+", help="tamanhos de entrada (padrão por benchmark)")
+    args = parser.parse_args(argv)
+
+    names = sorted(BENCHMARKS) if args.benchmark == "all" else [args.benchmark]
+    for name in names:
+        func, default_sizes = BENCHMARKS[name]
+        func(args.sizes or default_sizes)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+# Darcy AI - Cache de Resultados
+# Cache endereçado por conteúdo para resultados de processamento de arquivos
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class FileResultCache:
+    """
+    Cache em disco dos resultados de process_pdf/process_image
+    - Chave: SHA-256 dos bytes enviados + tipo de processamento + versão do processador
+    - Política de remoção: LRU limitada pelo tamanho total em bytes
+    - Contadores de acerto/erro expostos em /api/python/health
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # chave -> tamanho em bytes (mais antigo primeiro)
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Reconstrói o índice LRU a partir dos arquivos existentes (ordem por mtime)"""
+        files = sorted(self.cache_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            size = path.stat().st_size
+            self._entries[path.stem] = size
+            self._total_bytes += size
+        self._evict()
+
+    @staticmethod
+    def make_key(content_hash: str, kind: str, version: str) -> str:
+        """Chave do cache: tipo, versão do processador e hash do conteúdo"""
+        return f"{kind}-v{version}-{content_hash}"
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Retorna o resultado armazenado ou None"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        try:
+            path = self._path(key)
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            os.utime(path)  # mtime guarda a ordem LRU entre reinícios
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrada de cache inválida {key}: {e}")
+            with self._lock:
+                self._discard(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: Dict):
+        """Armazena um resultado e remove os menos usados se passar do limite"""
+        data = json.dumps(result, ensure_ascii=False, default=str).encode('utf-8')
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Falha ao gravar cache {key}: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _discard(self, key: str):
+        """Remove uma entrada do índice e do disco (chamar com o lock)"""
+        self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Remove entradas menos usadas até caber no limite (chamar com o lock)"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._discard(key)
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        """Contadores para monitoramento"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+class LRUCache:
+    """
+    Cache em memória limitado por número de entradas (LRU), seguro entre threads
+    Usado para memoizar resultados derivados de texto (ex.: tokenização)
+    - ttl (segundos): entradas mais antigas contam como ausentes e são descartadas
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # chave -> (expira_em, valor)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry is not None else default
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl
+            }
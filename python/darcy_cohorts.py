@@ -0,0 +1,96 @@
+# Darcy AI - Análise de Coortes
+# Relatórios de turma/escola: usuários divididos em shards, agregados em paralelo e combinados
+
+import json
+import time
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+from darcy_learning import LearningPatternAggregate
+
+def plan_shards(user_sizes: Dict[str, int], shards: int) -> List[List[str]]:
+    """Distribui usuários em até `shards` grupos com volume de interações parecido (maiores primeiro)"""
+    shards = max(1, min(shards, len(user_sizes)))
+    groups = [[] for _ in range(shards)]
+    loads = [0] * shards
+    for user_id, size in sorted(user_sizes.items(), key=lambda item: item[1], reverse=True):
+        target = loads.index(min(loads))
+        groups[target].append(user_id)
+        loads[target] += max(size, 1)
+    return [group for group in groups if group]
+
+def user_summary(aggregate: LearningPatternAggregate) -> Dict:
+    """Resumo por usuário incluído no relatório da coorte"""
+    return {
+        "total_interactions": aggregate.total,
+        "top_topics": dict(aggregate.topics.most_common(5)),
+        "crew_preferences": dict(aggregate.crews),
+        "avg_response_time": aggregate.processing_time_sum / aggregate.total if aggregate.total else 0.0,
+        "active_days": len(aggregate.daily)
+    }
+
+def _store_interactions(db_path: str, user_ids: List[str], since: Optional[float],
+                        until: Optional[float]) -> Dict[str, List[Dict]]:
+    """Lê do histórico SQLite (somente leitura) as interações dos usuários do shard"""
+    sql = (
+        "SELECT user_id, data FROM interactions "
+        f"WHERE user_id IN ({', '.join('?' * len(user_ids))})"
+    )
+    params = list(user_ids)
+    if since is not None:
+        sql += " AND ts >= ?"
+        params.append(since)
+    if until is not None:
+        sql += " AND ts < ?"
+        params.append(until)
+    sql += " ORDER BY user_id, ts, id"
+
+    users = {user_id: [] for user_id in user_ids}
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        for user_id, data in conn.execute(sql, params):
+            users[user_id].append(json.loads(data))
+    finally:
+        conn.close()
+    return users
+
+def analyze_shard(shard: Dict) -> Dict:
+    """
+    Tarefa do pool de processos: agrega os usuários de um shard
+    O shard traz as interações ("users") ou a referência ao histórico
+    ("db_path", "user_ids", "since", "until"), lido dentro do worker
+    Retorna o agregado do shard serializado, resumos por usuário e tempos
+    """
+    start = time.perf_counter()
+    if "db_path" in shard:
+        users = _store_interactions(shard["db_path"], shard["user_ids"], shard.get("since"), shard.get("until"))
+    else:
+        users = shard["users"]
+    loaded = time.perf_counter()
+
+    topic_capacity = shard.get("topic_capacity")
+    merged = LearningPatternAggregate(topic_capacity)
+    summaries = {}
+    for user_id, interactions in users.items():
+        aggregate = LearningPatternAggregate(topic_capacity).extend(interactions)
+        summaries[user_id] = user_summary(aggregate)
+        merged.merge(aggregate)
+
+    return {
+        "index": shard["index"],
+        "aggregate": merged.to_dict(),
+        "users": summaries,
+        "timings_ms": {
+            "load": round((loaded - start) * 1000, 2),
+            "aggregate": round((time.perf_counter() - loaded) * 1000, 2)
+        }
+    }
+
+def merge_shards(results: List[Dict], topic_capacity: Optional[int] = None) -> Tuple[LearningPatternAggregate, Dict]:
+    """Combina os agregados dos shards na ordem dos shards"""
+    cohort = LearningPatternAggregate(topic_capacity)
+    users = {}
+    for result in sorted(results, key=lambda r: r["index"]):
+        cohort.merge(LearningPatternAggregate.from_dict(result["aggregate"]))
+        users.update(result["users"])
+    return cohort, users
@@ -0,0 +1,162 @@
+# Darcy AI - Cache HTTP
+# Respostas das fontes de busca em dois níveis (memória + disco), com TTL por fonte e revalidação condicional
+
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from typing import Dict, Optional
+
+import aiohttp
+
+from darcy_cache import FileResultCache, LRUCache
+
+# Respostas guardadas: sucesso e "não encontrado" (evita repetir buscas sem resultado)
+CACHEABLE_STATUSES = (200, 404)
+
+class UpstreamError(Exception):
+    """Fonte respondeu com erro de servidor (5xx)"""
+
+class CachedResponse:
+    """
+    Resposta entregue ao scraper
+    - origin: "memory" ou "disk" (entrada válida), "revalidated" (304),
+      "upstream" (baixada agora) ou "stale" (vencida, servida porque a fonte falhou)
+    """
+
+    __slots__ = ("status", "data", "origin")
+
+    def __init__(self, status: int, data, origin: str):
+        self.status = status
+        self.data = data
+        self.origin = origin
+
+class HttpResponseCache:
+    """
+    Cache de GETs JSON das fontes de busca
+    - Nível 1: LRU em memória; nível 2: FileResultCache no diretório de cache
+    - TTL por fonte; entrada vencida é revalidada com If-None-Match /
+      If-Modified-Since e um 304 renova o prazo sem baixar o corpo
+    - Falha de rede ou 5xx com entrada vencida há até max_stale segundos:
+      a entrada é servida (stale-on-error)
+    - Contadores por fonte: acertos em memória/disco, revalidações, downloads,
+      respostas vencidas servidas e erros
+    """
+
+    def __init__(self, cache_dir: str, memory_entries: int = 512, max_disk_bytes: int = 64 * 1024 * 1024,
+                 ttls: Optional[Dict[str, float]] = None, default_ttl: float = 3600, max_stale: float = 86400):
+        self.memory = LRUCache(memory_entries)
+        self.disk = FileResultCache(cache_dir, max_disk_bytes)
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.max_stale = max_stale
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict] = None) -> str:
+        payload = json.dumps([url, sorted((params or {}).items())], ensure_ascii=False, default=str)
+        return "http-" + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:40]
+
+    def ttl_for(self, source: str) -> float:
+        return self.ttls.get(source, self.default_ttl)
+
+    def _count(self, source: str, counter: str):
+        with self._lock:
+            counters = self._counters.setdefault(source, {
+                "requests": 0, "memory_hits": 0, "disk_hits": 0, "revalidated": 0,
+                "fetched": 0, "stale_served": 0, "errors": 0
+            })
+            counters[counter] += 1
+
+    async def _lookup(self, key: str):
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry, "memory"
+        # Disco fora do event loop (compartilhado por todas as requisições)
+        entry = await asyncio.to_thread(self.disk.get, key)
+        if entry is not None:
+            self.memory.put(key, entry)
+            return entry, "disk"
+        return None, None
+
+    async def _store(self, key: str, entry: Dict):
+        self.memory.put(key, entry)
+        await asyncio.to_thread(self.disk.put, key, entry)
+
+    async def get_json(self, session: aiohttp.ClientSession, url: str, params: Optional[Dict] = None,
+                       source: str = "default") -> CachedResponse:
+        """GET com cache; o corpo só é lido (JSON) em respostas 200"""
+        self._count(source, "requests")
+        key = self.make_key(url, params)
+        entry, tier = await self._lookup(key)
+        now = time.time()
+
+        if entry is not None and entry["expires_at"] > now:
+            self._count(source, f"{tier}_hits")
+            return CachedResponse(entry["status"], entry["data"], tier)
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            async with session.get(url, params=params, headers=headers) as response:
+                if response.status == 304 and entry is not None:
+                    entry = dict(
+                        entry,
+                        expires_at=now + self.ttl_for(source),
+                        etag=response.headers.get("ETag", entry.get("etag")),
+                        last_modified=response.headers.get("Last-Modified", entry.get("last_modified"))
+                    )
+                    await self._store(key, entry)
+                    self._count(source, "revalidated")
+                    return CachedResponse(entry["status"], entry["data"], "revalidated")
+
+                if response.status >= 500:
+                    raise UpstreamError(f"{source}: HTTP {response.status}")
+
+                data = await response.json() if response.status == 200 else None
+                if response.status in CACHEABLE_STATUSES and \
+                        "no-store" not in response.headers.get("Cache-Control", ""):
+                    await self._store(key, {
+                        "status": response.status,
+                        "data": data,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                        "expires_at": now + self.ttl_for(source)
+                    })
+                self._count(source, "fetched")
+                return CachedResponse(response.status, data, "upstream")
+
+        except (aiohttp.ClientError, asyncio.TimeoutError, UpstreamError, ValueError):
+            if entry is not None and now - entry["expires_at"] <= self.max_stale:
+                self._count(source, "stale_served")
+                return CachedResponse(entry["status"], entry["data"], "stale")
+            self._count(source, "errors")
+            raise
+
+    def stats(self) -> Dict:
+        """Contadores por fonte e totais, com as taxas de acerto e de acesso à fonte"""
+        with self._lock:
+            sources = {source: dict(counters) for source, counters in self._counters.items()}
+        totals = {}
+        for counters in sources.values():
+            for name, value in counters.items():
+                totals[name] = totals.get(name, 0) + value
+        for counters in list(sources.values()) + [totals]:
+            requests = counters.get("requests", 0)
+            served = counters.get("memory_hits", 0) + counters.get("disk_hits", 0)
+            upstream = counters.get("revalidated", 0) + counters.get("fetched", 0)
+            counters["hit_rate"] = served / requests if requests else 0.0
+            counters["upstream_rate"] = upstream / requests if requests else 0.0
+        return {
+            "sources": sources,
+            "totals": totals,
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats()
+        }
@@ -0,0 +1,229 @@
+# Darcy AI - Pipeline de Imagem
+# Pré-processamento com limite de memória e OCR em blocos (tiles) para fotos grandes
+
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from darcy_uploads import open_payload
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMAGE_SETTINGS = {
+    "target_dpi": 300,                      # fotos com DPI maior são reduzidas
+    "max_pixels": 8_000_000,                # teto de pixels após o pré-processamento
+    "max_memory_bytes": 512 * 1024 * 1024,  # teto de memória da imagem decodificada
+    "binarize": True,                       # limiar de Otsu após escala de cinza
+    "tile_size": 1600,                      # lado máximo de cada bloco de OCR
+    "tile_overlap": 64                      # sobreposição entre blocos vizinhos
+}
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+def preprocess_image(payload, settings: Dict) -> Dict:
+    """
+    Tarefa do pool de processos: decodifica, reduz, converte e divide a imagem
+    - Redução ciente de DPI e do teto de pixels; em JPEG a redução começa na
+      própria decodificação (draft), sem carregar a resolução cheia
+    - Escala de cinza e binarização opcional (Otsu)
+    - Blocos com sobreposição quando a imagem passa de tile_size
+    Retorna os blocos em bytes (modo "L") prontos para ocr_tile
+    """
+    from PIL import Image
+
+    settings = {**DEFAULT_IMAGE_SETTINGS, **(settings or {})}
+    timings = {}
+
+    start = time.perf_counter()
+    with open_payload(payload) as stream, Image.open(stream) as img:
+        original_size = img.size
+        scale = _target_scale(img, settings)
+        target_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+
+        # Decodificação reduzida (JPEG) antes de checar o teto de memória
+        img.draft("L", target_size)
+        decoded_bytes = img.width * img.height * len(img.getbands())
+        if decoded_bytes > settings["max_memory_bytes"]:
+            return {
+                "error": f"Imagem excede o limite de memória ({decoded_bytes} > {settings['max_memory_bytes']} bytes)",
+                "info": {"original_size": original_size},
+                "timings_ms": {"decode": _elapsed_ms(start)}
+            }
+        img.load()
+        timings["decode"] = _elapsed_ms(start)
+
+        start = time.perf_counter()
+        gray = img.convert("L")
+    if gray.size != target_size:
+        gray = gray.resize(target_size, Image.Resampling.LANCZOS)
+    threshold = None
+    if settings["binarize"]:
+        threshold = _otsu_threshold(gray.histogram())
+        gray = gray.point(lambda p: 255 if p > threshold else 0)
+    timings["preprocess"] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    tiles = _split_tiles(gray, settings["tile_size"], settings["tile_overlap"])
+    timings["tiling"] = _elapsed_ms(start)
+
+    return {
+        "tiles": tiles,
+        "info": {
+            "original_size": original_size,
+            "processed_size": gray.size,
+            "scale": round(scale, 4),
+            "binarize_threshold": threshold,
+            "tiles": len(tiles)
+        },
+        "timings_ms": timings
+    }
+
+def _target_scale(img, settings: Dict) -> float:
+    """Fator de redução: DPI acima do alvo e teto de pixels (nunca amplia)"""
+    scale = 1.0
+
+    dpi = img.info.get("dpi")
+    if dpi and dpi[0] and float(dpi[0]) > settings["target_dpi"]:
+        scale = settings["target_dpi"] / float(dpi[0])
+
+    pixels = img.width * img.height * scale * scale
+    if pixels > settings["max_pixels"]:
+        scale *= (settings["max_pixels"] / pixels) ** 0.5
+
+    return min(scale, 1.0)
+
+def _otsu_threshold(histogram: List[int]) -> int:
+    """Limiar de Otsu a partir do histograma de 256 níveis"""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+
+    background = 0
+    weighted_background = 0
+    best_threshold, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = level, variance
+    return best_threshold
+
+def _split_tiles(img, tile_size: int, overlap: int) -> List[Dict]:
+    """
+    Divide a imagem em blocos com sobreposição
+    Cada bloco tem uma área "core" (sem sobreposição); as áreas core particionam
+    a imagem, então cada palavra é atribuída a exatamente um bloco
+    """
+    width, height = img.size
+    if width <= tile_size and height <= tile_size:
+        return [{"box": (0, 0, width, height), "core": None, "size": img.size, "pixels": img.tobytes()}]
+
+    tiles = []
+    for top in range(0, height, tile_size):
+        for left in range(0, width, tile_size):
+            core = (left, top, min(left + tile_size, width), min(top + tile_size, height))
+            box = (
+                max(core[0] - overlap, 0), max(core[1] - overlap, 0),
+                min(core[2] + overlap, width), min(core[3] + overlap, height)
+            )
+            tile = img.crop(box)
+            tiles.append({"box": box, "core": core, "size": tile.size, "pixels": tile.tobytes()})
+    return tiles
+
+def ocr_tile(tile: Dict, lang: str) -> Dict:
+    """Tarefa do pool de processos: OCR de um bloco (texto direto se for a imagem inteira)"""
+    from PIL import Image
+
+    img = Image.frombytes("L", tuple(tile["size"]), tile["pixels"])
+    return run_tesseract(img, lang, tile if tile["core"] is not None else None)
+
+def run_tesseract(img, lang: str, tile: Optional[Dict] = None) -> Dict:
+    """
+    OCR com Tesseract, resiliente à ausência da biblioteca ou do executável
+    Com `tile`, retorna palavras com posição global em vez de texto
+    """
+    try:
+        import pytesseract
+    except ImportError:
+        logger.warning("pytesseract não disponível - continuando sem OCR")
+        return {
+            "text": "",
+            "ocr_available": False,
+            "ocr_message": "OCR não disponível: biblioteca pytesseract não instalada"
+        }
+
+    try:
+        if tile is None:
+            text = pytesseract.image_to_string(img, lang=lang)
+            return {"text": text.strip(), "ocr_available": True}
+
+        data = pytesseract.image_to_data(img, lang=lang, output_type=pytesseract.Output.DICT)
+        return {"words": _owned_words(data, tile), "ocr_available": True}
+    except pytesseract.TesseractNotFoundError:
+        logger.warning("Tesseract OCR não disponível - continuando sem OCR")
+        return {
+            "text": "",
+            "ocr_available": False,
+            "ocr_message": "OCR não disponível: Tesseract não encontrado no servidor"
+        }
+    except Exception as e:
+        logger.warning(f"Erro no OCR: {e}")
+        return {"text": "", "ocr_error": str(e), "ocr_available": False}
+
+def _owned_words(data: Dict, tile: Dict) -> List[Tuple[int, int, int, int, str]]:
+    """Palavras do bloco em coordenadas globais, só as com centro na área core"""
+    offset_x, offset_y = tile["box"][0], tile["box"][1]
+    core_left, core_top, core_right, core_bottom = tile["core"]
+
+    words = []
+    for i, text in enumerate(data["text"]):
+        text = text.strip()
+        if not text:
+            continue
+        left = data["left"][i] + offset_x
+        top = data["top"][i] + offset_y
+        width, height = data["width"][i], data["height"][i]
+        center_x, center_y = left + width / 2, top + height / 2
+        if core_left <= center_x < core_right and core_top <= center_y < core_bottom:
+            words.append((left, top, width, height, text))
+    return words
+
+def stitch_tiles(outcomes: List[Dict]) -> Dict:
+    """Junta o OCR dos blocos em um texto único, em ordem de leitura"""
+    for outcome in outcomes:
+        if not outcome.get("ocr_available", False):
+            return outcome
+
+    if len(outcomes) == 1 and "text" in outcomes[0]:
+        return outcomes[0]
+
+    words = [word for outcome in outcomes for word in outcome["words"]]
+    if not words:
+        return {"text": "", "ocr_available": True}
+
+    # Agrupa palavras em linhas pelo centro vertical
+    heights = sorted(word[3] for word in words)
+    tolerance = max(heights[len(heights) // 2] / 2, 1)
+    words.sort(key=lambda w: w[1] + w[3] / 2)
+
+    lines = []
+    current, current_center = [], None
+    for word in words:
+        center = word[1] + word[3] / 2
+        if current and abs(center - current_center) > tolerance:
+            lines.append(current)
+            current = []
+        current.append(word)
+        current_center = sum(w[1] + w[3] / 2 for w in current) / len(current)
+    lines.append(current)
+
+    text = "\n".join(" ".join(w[4] for w in sorted(line, key=lambda w: w[0])) for line in lines)
+    return {"text": text, "ocr_available": True}
@@ -0,0 +1,328 @@
+# Darcy AI - Armazenamento de Interações
+# Histórico local de interações em SQLite, indexado por usuário e tempo
+
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Union
+import logging
+
+from darcy_learning import parse_timestamp, interaction_day, processing_seconds
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    ts REAL NOT NULL,   -- segundos UTC (timestamp da interação ou do recebimento)
+    day TEXT,           -- AAAA-MM-DD (UTC) do timestamp original (NULL se ausente)
+    data TEXT NOT NULL  -- interação original em JSON
+);
+CREATE INDEX IF NOT EXISTS idx_interactions_user_ts ON interactions (user_id, ts);
+"""
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    user_id TEXT NOT NULL,
+    resolution TEXT NOT NULL,      -- hour, day ou week
+    bucket_start INTEGER NOT NULL, -- início do intervalo em segundos UTC
+    interactions INTEGER NOT NULL,
+    processing_time_sum REAL NOT NULL,
+    PRIMARY KEY (user_id, resolution, bucket_start)
+) WITHOUT ROWID;
+"""
+
+HOUR = 3600
+DAY = 24 * HOUR
+ROLLUP_RESOLUTIONS = ("hour", "day", "week")
+
+def bucket_start(ts: float, resolution: str) -> int:
+    """Início (UTC) do intervalo que contém ts; semanas começam na segunda-feira"""
+    if resolution == "hour":
+        return int(ts // HOUR) * HOUR
+    day = int(ts // DAY) * DAY
+    if resolution == "day":
+        return day
+    if resolution == "week":
+        # 1970-01-01 foi uma quinta-feira: desloca 3 dias para alinhar na segunda
+        return day - ((day // DAY + 3) % 7) * DAY
+    raise ValueError(f"Resolução desconhecida: {resolution}")
+
+def bucket_label(start: int, resolution: str) -> str:
+    moment = datetime.fromtimestamp(start, timezone.utc)
+    if resolution == "hour":
+        return moment.strftime("%Y-%m-%dT%H:00Z")
+    if resolution == "day":
+        return moment.strftime("%Y-%m-%d")
+    year, week, _ = moment.isocalendar()
+    return f"{year}-W{week:02d}"
+
+def timestamp_seconds(timestamp) -> Optional[float]:
+    """Segundos UTC de um timestamp ISO 8601; sem fuso é tratado como UTC"""
+    parsed = parse_timestamp(timestamp)
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def interaction_time(interaction: Dict, received_at: float) -> float:
+    """Momento da interação; sem timestamp válido vale o do recebimento"""
+    seconds = timestamp_seconds(interaction.get('timestamp'))
+    return received_at if seconds is None else seconds
+
+class InteractionStore:
+    """
+    Histórico de interações em SQLite (WAL) com índice (user_id, ts)
+    - Escritas em lote: as interações ficam em buffer até batch_size linhas ou
+      flush_interval segundos; leituras e o encerramento gravam o buffer antes
+    - Consultas por usuário e intervalo de tempo usam só a faixa do índice
+    - Compactação periódica: remove o que passou de retention_days, faz
+      checkpoint do WAL e VACUUM
+    - Rollups por hora, dia e semana (UTC) atualizados na mesma transação de
+      cada lote; consultas de atividade leem só os rollups, nunca os eventos,
+      e continuam válidas depois que a retenção remove eventos antigos
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 500, flush_interval: float = 5.0,
+                 retention_days: Optional[float] = None, compact_interval: float = 24 * 3600):
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.compact_interval = compact_interval
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._buffer_since = None
+        self._last_compaction = time.time()
+        self.flushes = 0
+        self.compactions = 0
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        has_rollups = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollups'"
+        ).fetchone() is not None
+        self._conn.executescript(ROLLUP_SCHEMA)
+        if not has_rollups:
+            self._rebuild_rollups()
+
+    def add(self, user_id: str, interactions: List[Dict]):
+        """Enfileira interações para gravação em lote"""
+        received_at = time.time()
+        rows = [
+            (
+                user_id,
+                interaction_time(item, received_at),
+                interaction_day(item.get('timestamp')),
+                json.dumps(item, ensure_ascii=False),
+                processing_seconds(item.get('processing_time'))
+            )
+            for item in interactions
+        ]
+        with self._lock:
+            if not self._buffer:
+                self._buffer_since = time.monotonic()
+            self._buffer.extend(rows)
+            if (len(self._buffer) >= self.batch_size or
+                    time.monotonic() - self._buffer_since >= self.flush_interval):
+                # O lote já foi aceito: se a gravação falhar, as linhas ficam no
+                # buffer para o próximo flush em vez de o cliente reenviá-las
+                try:
+                    self._flush()
+                    self._maybe_compact()
+                except sqlite3.Error as e:
+                    logger.error(f"Erro ao gravar interações (mantidas no buffer): {e}")
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        """Grava o buffer em uma única transação (chamar com o lock)"""
+        if not self._buffer:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO interactions (user_id, ts, day, data) VALUES (?, ?, ?, ?)",
+                [row[:4] for row in self._buffer]
+            )
+            self._upsert_rollups(
+                (user_id, ts, processing_time)
+                for user_id, ts, day, _, processing_time in self._buffer if day is not None
+            )
+        self._buffer = []
+        self._buffer_since = None
+        self.flushes += 1
+
+    def _upsert_rollups(self, events: Iterable):
+        """Soma um lote de (user_id, ts, processing_time) aos rollups (dentro da transação)"""
+        totals = defaultdict(lambda: [0, 0.0])
+        for user_id, ts, processing_time in events:
+            for resolution in ROLLUP_RESOLUTIONS:
+                bucket = totals[(user_id, resolution, bucket_start(ts, resolution))]
+                bucket[0] += 1
+                bucket[1] += processing_time
+        self._conn.executemany(
+            """INSERT INTO rollups (user_id, resolution, bucket_start, interactions, processing_time_sum)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (user_id, resolution, bucket_start) DO UPDATE SET
+                   interactions = interactions + excluded.interactions,
+                   processing_time_sum = processing_time_sum + excluded.processing_time_sum""",
+            [(*key, count, time_sum) for key, (count, time_sum) in totals.items()]
+        )
+
+    def _rebuild_rollups(self):
+        """Gera os rollups a partir dos eventos existentes (bancos anteriores aos rollups)"""
+        with self._conn:
+            self._conn.execute("DELETE FROM rollups")
+            cursor = self._conn.execute("SELECT user_id, ts, data FROM interactions WHERE day IS NOT NULL")
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                self._upsert_rollups(
+                    (user_id, ts, processing_seconds(json.loads(data).get('processing_time')))
+                    for user_id, ts, data in rows
+                )
+
+    def activity(self, user_ids: Union[str, List[str]], resolution: str = "day",
+                 since: Optional[float] = None, until: Optional[float] = None) -> List[Dict]:
+        """
+        Interações por intervalo (hour/day/week) lidas dos rollups
+        Inclui os intervalos que contêm since e que começam antes de until;
+        com vários usuários (ex.: uma turma), os intervalos são somados
+        """
+        if resolution not in ROLLUP_RESOLUTIONS:
+            raise ValueError(f"Resolução desconhecida: {resolution}")
+        if isinstance(user_ids, str):
+            user_ids = [user_ids]
+
+        sql = (
+            "SELECT bucket_start, SUM(interactions), SUM(processing_time_sum) FROM rollups "
+            f"WHERE resolution = ? AND user_id IN ({', '.join('?' * len(user_ids))})"
+        )
+        params = [resolution, *user_ids]
+        if since is not None:
+            sql += " AND bucket_start >= ?"
+            params.append(bucket_start(since, resolution))
+        if until is not None:
+            sql += " AND bucket_start < ?"
+            params.append(until)
+        sql += " GROUP BY bucket_start ORDER BY bucket_start"
+
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "bucket": bucket_label(start, resolution),
+                "start": datetime.fromtimestamp(start, timezone.utc).isoformat(),
+                "interactions": count,
+                "avg_processing_time": time_sum / count if count else 0.0
+            }
+            for start, count, time_sum in rows
+        ]
+
+    def count_by_user(self, user_ids: List[str], since: Optional[float] = None,
+                      until: Optional[float] = None) -> Dict[str, int]:
+        """Quantidade de interações por usuário no intervalo (contagem pelo índice)"""
+        sql = (
+            "SELECT user_id, COUNT(*) FROM interactions "
+            f"WHERE user_id IN ({', '.join('?' * len(user_ids))})"
+        )
+        params = list(user_ids)
+        if since is not None:
+            sql += " AND ts >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND ts < ?"
+            params.append(until)
+        sql += " GROUP BY user_id"
+
+        with self._lock:
+            self._flush()
+            counts = dict(self._conn.execute(sql, params).fetchall())
+        return {user_id: counts.get(user_id, 0) for user_id in user_ids}
+
+    def query(self, user_id: str, since: Optional[float] = None, until: Optional[float] = None) -> List[Dict]:
+        """Interações do usuário com since <= ts < until, em ordem cronológica"""
+        sql = "SELECT data FROM interactions WHERE user_id = ?"
+        params = [user_id]
+        if since is not None:
+            sql += " AND ts >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND ts < ?"
+            params.append(until)
+        sql += " ORDER BY ts, id"
+
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def delete_user(self, user_id: str) -> int:
+        with self._lock:
+            self._buffer = [row for row in self._buffer if row[0] != user_id]
+            with self._conn:
+                self._conn.execute("DELETE FROM rollups WHERE user_id = ?", (user_id,))
+                return self._conn.execute("DELETE FROM interactions WHERE user_id = ?", (user_id,)).rowcount
+
+    def _maybe_compact(self):
+        if time.time() - self._last_compaction >= self.compact_interval:
+            self._compact()
+
+    def compact(self) -> Dict:
+        with self._lock:
+            return self._compact()
+
+    def _compact(self) -> Dict:
+        """Aplica a retenção e devolve espaço ao sistema de arquivos (chamar com o lock)"""
+        self._flush()
+        size_before = self._size_bytes()
+        deleted = 0
+        if self.retention_days is not None:
+            cutoff = time.time() - self.retention_days * 86400
+            with self._conn:
+                deleted = self._conn.execute("DELETE FROM interactions WHERE ts < ?", (cutoff,)).rowcount
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if deleted:
+            self._conn.execute("VACUUM")
+        self._conn.execute("ANALYZE")
+        self._last_compaction = time.time()
+        self.compactions += 1
+        result = {"deleted": deleted, "bytes_before": size_before, "bytes_after": self._size_bytes()}
+        logger.info(f"🗜️ Histórico de interações compactado: {result}")
+        return result
+
+    def _size_bytes(self) -> int:
+        total = 0
+        for suffix in ("", "-wal"):
+            path = Path(f"{self.db_path}{suffix}")
+            if path.exists():
+                total += path.stat().st_size
+        return total
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "buffered": len(self._buffer),
+                "flushes": self.flushes,
+                "compactions": self.compactions,
+                "bytes": self._size_bytes(),
+                "last_compaction": datetime.fromtimestamp(self._last_compaction).isoformat()
+            }
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._conn.close()
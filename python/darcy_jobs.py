@@ -0,0 +1,227 @@
+# Darcy AI - Fila de Jobs
+# Fila local e limitada para processamentos longos (submissão, status, resultado)
+
+import time
+import uuid
+import queue
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class JobQueueFull(Exception):
+    """Fila cheia: o cliente deve tentar novamente após retry_after segundos"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Fila de jobs cheia, tente novamente em {retry_after}s")
+        self.retry_after = retry_after
+
+class JobCancelled(Exception):
+    """Levantada no callback de progresso quando o job foi cancelado"""
+
+class Job:
+    """Estado de um job: status, progresso, resultado e tempos"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+    def __init__(self, payload: Dict, description: str = "", cleanup: Optional[Callable] = None):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.description = description
+        self.status = Job.QUEUED
+        self.progress = {"current": 0, "total": None, "stage": None}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cleanup = cleanup
+        self._cancel_requested = threading.Event()
+
+    def report_progress(self, current: int, total: Optional[int] = None, stage: Optional[str] = None):
+        """
+        Callback de progresso para o processamento; interrompe se cancelado
+        stage identifica a etapa (ex.: "text", "ocr"), cada uma com seu total
+        """
+        self.progress = {"current": current, "total": total, "stage": stage}
+        if self._cancel_requested.is_set():
+            raise JobCancelled(self.id)
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_requested.is_set()
+
+    def release(self):
+        """Libera o payload (ex.: upload em memória ou diretório temporário)"""
+        if self._cleanup is not None:
+            try:
+                self._cleanup()
+            except Exception as e:
+                logger.warning(f"Erro ao liberar job {self.id}: {e}")
+            self._cleanup = None
+        self.payload = None
+
+    def to_dict(self) -> Dict:
+        """Status público do job (sem o resultado)"""
+        total = self.progress["total"]
+        return {
+            "job_id": self.id,
+            "description": self.description,
+            "status": self.status,
+            "progress": {
+                **self.progress,
+                "percent": round(100 * self.progress["current"] / total, 1) if total else None
+            },
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class JobQueue:
+    """
+    Fila de jobs em processo com workers em threads
+    - Capacidade limitada: submit levanta JobQueueFull com estimativa de espera
+    - Progresso reportado pelo runner via job.report_progress
+    - Cancelamento de jobs na fila ou em execução
+    - Resultados mantidos por result_ttl segundos após o término
+    """
+
+    def __init__(self, runner: Callable[[Job], Any], workers: int = 2, max_pending: int = 16,
+                 result_ttl: float = 3600, max_retained: int = 1000):
+        self.runner = runner
+        self.result_ttl = result_ttl
+        self.max_retained = max_retained
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._jobs = OrderedDict()  # job_id -> Job, na ordem de submissão
+        self._lock = threading.Lock()
+        self._avg_duration = None
+        self._running = True
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"darcy-job-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, payload: Dict, description: str = "", cleanup: Optional[Callable] = None) -> Job:
+        """Enfileira um job; levanta JobQueueFull se não houver vaga"""
+        self._purge()
+        job = Job(payload, description, cleanup)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._pending.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            raise JobQueueFull(self.retry_after())
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._purge()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Solicita cancelamento; jobs na fila nem chegam a executar"""
+        job = self.get(job_id)
+        if job is None or job.status in Job.FINISHED:
+            return False
+        job._cancel_requested.set()
+        return True
+
+    def retry_after(self) -> int:
+        """Estimativa (segundos) até abrir vaga na fila"""
+        avg = self._avg_duration or 5.0
+        waiting = self._pending.qsize()
+        return max(1, int(avg * max(waiting, 1) / len(self._workers) + 0.5))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            statuses = {}
+            for job in self._jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "workers": len(self._workers),
+            "pending": self._pending.qsize(),
+            "capacity": self._pending.maxsize,
+            "jobs": statuses,
+            "avg_duration_s": round(self._avg_duration, 3) if self._avg_duration else None
+        }
+
+    def shutdown(self, timeout: float = 5.0):
+        """Cancela jobs pendentes e encerra os workers"""
+        self._running = False
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status not in Job.FINISHED:
+                    job._cancel_requested.set()
+        for _ in self._workers:
+            try:
+                self._pending.put_nowait(None)
+            except queue.Full:
+                break
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def _worker(self):
+        while self._running:
+            try:
+                job = self._pending.get(timeout=1)
+            except queue.Empty:
+                continue
+            if job is None:
+                break
+            try:
+                self._run(job)
+            finally:
+                job.release()
+                self._pending.task_done()
+
+    def _run(self, job: Job):
+        if job.cancel_requested:
+            self._finish(job, Job.CANCELLED)
+            return
+
+        job.status = Job.RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = self.runner(job)
+            self._finish(job, Job.COMPLETED)
+        except JobCancelled:
+            self._finish(job, Job.CANCELLED)
+        except Exception as e:
+            logger.error(f"Job {job.id} falhou: {e}")
+            job.error = str(e)
+            self._finish(job, Job.FAILED)
+
+        duration = job.finished_at - job.started_at
+        self._avg_duration = duration if self._avg_duration is None else 0.8 * self._avg_duration + 0.2 * duration
+
+    def _finish(self, job: Job, status: str):
+        job.status = status
+        job.finished_at = time.time()
+
+    def _purge(self):
+        """Remove jobs finalizados com TTL vencido (e os mais antigos acima do limite)"""
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.status in Job.FINISHED and now - job.finished_at > self.result_ttl
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+            finished = [job_id for job_id, job in self._jobs.items() if job.status in Job.FINISHED]
+            for job_id in finished[:max(0, len(self._jobs) - self.max_retained)]:
+                del self._jobs[job_id]
@@ -0,0 +1,447 @@
+# Darcy AI - Padrões de Aprendizado
+# Agregados incrementais por usuário (tópicos, equipes, tempos, atividade diária)
+
+import os
+import re
+import json
+import time
+import heapq
+from itertools import islice
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+USER_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+def parse_timestamp(timestamp) -> Optional[datetime]:
+    """Timestamp ISO 8601 (aceita o sufixo Z); None se ausente ou inválido"""
+    if not isinstance(timestamp, str) or not timestamp:
+        return None
+    try:
+        return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+def interaction_day(timestamp) -> Optional[str]:
+    """
+    Dia (AAAA-MM-DD) em UTC de um timestamp ISO 8601; sem fuso é tratado como UTC
+    Mesma convenção dos rollups do histórico (InteractionStore), então
+    daily_activity e /activity contam os mesmos dias
+    """
+    parsed = parse_timestamp(timestamp)
+    if parsed is None:
+        return None
+    if parsed.tzinfo is not None:
+        try:
+            parsed = parsed.astimezone(timezone.utc)
+        except OverflowError:
+            return None
+    return parsed.date().isoformat()
+
+def processing_seconds(value) -> float:
+    """Tempo de processamento em segundos; ausente ou não numérico vale 0"""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+class SpaceSavingCounter:
+    """
+    Contagem aproximada dos itens mais frequentes com memória fixa (SpaceSaving)
+    - Guarda no máximo `capacity` itens; um item novo com a estrutura cheia
+      substitui o de menor contagem e herda essa contagem como erro
+    - Garantias, com N = total de ocorrências vistas:
+      * count(x) - error(x) <= frequência real de x <= count(x)
+      * error(x) <= max_error() <= N / capacity
+      * todo item com frequência real > N / capacity está entre os guardados
+    - merge() combina resumos (ex.: shards por turma ou escola) mantendo as
+      mesmas garantias para o N somado
+    Interface compatível com o uso de Counter aqui: update, most_common, bool
+    """
+
+    UPDATE_CHUNK = 10_000
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = max(1, int(capacity))
+        self.total = 0
+        self._counts = {}
+        self._errors = {}
+        # Uma entrada (contagem, item) por item; contagens só crescem, então
+        # entradas desatualizadas são corrigidas quando chegam ao topo
+        self._heap = []
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __bool__(self) -> bool:
+        return bool(self._counts)
+
+    def add(self, item: str, count: int = 1):
+        self.total += count
+        if item in self._counts:
+            self._counts[item] += count
+            return
+        if len(self._counts) < self.capacity:
+            self._counts[item] = count
+            self._errors[item] = 0
+            heapq.heappush(self._heap, (count, item))
+            return
+
+        evicted_count = self._pop_min()
+        self._counts[item] = evicted_count + count
+        self._errors[item] = evicted_count
+        heapq.heappush(self._heap, (evicted_count + count, item))
+
+    def update(self, items: Union[Iterable[str], Dict[str, int]]):
+        """Adiciona ocorrências; sequências são pré-contadas em blocos (as garantias valem para pesos)"""
+        if isinstance(items, dict):
+            for item, count in items.items():
+                self.add(item, count)
+            return
+        iterator = iter(items)
+        while True:
+            chunk = Counter(islice(iterator, self.UPDATE_CHUNK))
+            if not chunk:
+                break
+            for item, count in chunk.items():
+                self.add(item, count)
+
+    def _pop_min(self) -> int:
+        """Remove o item de menor contagem e retorna a contagem dele"""
+        while True:
+            count, item = heapq.heappop(self._heap)
+            current = self._counts[item]
+            if current == count:
+                del self._counts[item]
+                del self._errors[item]
+                return count
+            heapq.heappush(self._heap, (current, item))
+
+    def max_error(self) -> int:
+        """Maior superestimativa possível de um item (0 enquanto não encher)"""
+        if len(self._counts) < self.capacity:
+            return 0
+        return min(self._counts.values())
+
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        ranked = sorted(self._counts.items(), key=lambda kv: kv[1], reverse=True)
+        return ranked if n is None else ranked[:n]
+
+    def error(self, item: str) -> int:
+        return self._errors.get(item, self.max_error())
+
+    def merge(self, other: 'SpaceSavingCounter') -> 'SpaceSavingCounter':
+        """
+        Soma outro resumo: um item ausente de um lado conta com o max_error
+        daquele lado (limite superior), e ficam os `capacity` maiores
+        """
+        self_floor, other_floor = self.max_error(), other.max_error()
+        keys = list(self._counts) + [k for k in other._counts if k not in self._counts]
+        merged = [
+            (
+                key,
+                self._counts.get(key, self_floor) + other._counts.get(key, other_floor),
+                self._errors.get(key, self_floor) + other._errors.get(key, other_floor)
+            )
+            for key in keys
+        ]
+        merged.sort(key=lambda entry: entry[1], reverse=True)
+
+        self.total += other.total
+        self._counts = {key: count for key, count, _ in merged[:self.capacity]}
+        self._errors = {key: error for key, _, error in merged[:self.capacity]}
+        self._heap = [(count, key) for key, count in self._counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def stats(self) -> Dict:
+        return {
+            "mode": "space_saving",
+            "capacity": self.capacity,
+            "tracked": len(self._counts),
+            "total": self.total,
+            "max_error": self.max_error()
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "items": [[key, count, self._errors[key]] for key, count in self._counts.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SpaceSavingCounter':
+        counter = cls(data.get("capacity", 1000))
+        counter.total = data.get("total", 0)
+        for key, count, error in data.get("items", []):
+            counter._counts[key] = count
+            counter._errors[key] = error
+        counter._heap = [(count, key) for key, count in counter._counts.items()]
+        heapq.heapify(counter._heap)
+        return counter
+
+    @classmethod
+    def from_counter(cls, counts: Dict[str, int], capacity: int) -> 'SpaceSavingCounter':
+        counter = cls(capacity)
+        counter.update(counts)
+        return counter
+
+class LearningPatternAggregate:
+    """
+    Estado agregado das interações de um usuário
+    - Contadores de tópicos (palavras das consultas), equipes e interações por dia
+    - Soma dos tempos de processamento (média sem guardar o histórico)
+    A ordem de inserção dos contadores é preservada, então empates em
+    most_common saem na mesma ordem de uma análise do histórico completo
+    Com topic_capacity, os tópicos usam SpaceSavingCounter (memória fixa,
+    contagens aproximadas com erro limitado)
+    """
+
+    def __init__(self, topic_capacity: Optional[int] = None):
+        self.total = 0
+        self.processing_time_sum = 0.0
+        self.topics = SpaceSavingCounter(topic_capacity) if topic_capacity else Counter()
+        self.crews = Counter()
+        self.daily = Counter()
+        self.updated_at = None
+
+    @staticmethod
+    def _fields(interaction: Dict) -> Tuple[Optional[List[str]], object, float, Optional[str]]:
+        """Campos de uma interação já normalizados; nada no agregado muda aqui"""
+        words = str(interaction['query']).lower().split() if 'query' in interaction else None
+        crew = interaction.get('crew', 'unknown')
+        if isinstance(crew, (list, dict)):
+            crew = json.dumps(crew, ensure_ascii=False, sort_keys=True)
+        return (
+            words,
+            crew,
+            processing_seconds(interaction.get('processing_time')),
+            interaction_day(interaction.get('timestamp'))
+        )
+
+    def _apply(self, words, crew, seconds: float, day: Optional[str]):
+        self.total += 1
+        if words is not None:
+            self.topics.update(words)
+        self.crews[crew] += 1
+        self.processing_time_sum += seconds
+        if day is not None:
+            self.daily[day] += 1
+
+    def add(self, interaction: Dict):
+        self._apply(*self._fields(interaction))
+
+    def extend(self, interactions: Iterable[Dict]) -> 'LearningPatternAggregate':
+        """Incorpora um lote inteiro ou nada: os campos são lidos antes de alterar o agregado"""
+        rows = [self._fields(interaction) for interaction in interactions]
+        for row in rows:
+            self._apply(*row)
+        self.updated_at = datetime.now().isoformat()
+        return self
+
+    def merge(self, other: 'LearningPatternAggregate') -> 'LearningPatternAggregate':
+        """Combina com outro agregado (ex.: lotes processados separadamente)"""
+        self.total += other.total
+        self.processing_time_sum += other.processing_time_sum
+        if isinstance(self.topics, SpaceSavingCounter) or isinstance(other.topics, SpaceSavingCounter):
+            approximate = self.topics if isinstance(self.topics, SpaceSavingCounter) else other.topics
+            capacity = approximate.capacity
+            self.topics = _as_space_saving(self.topics, capacity).merge(_as_space_saving(other.topics, capacity))
+        else:
+            self.topics.update(other.topics)
+        self.crews.update(other.crews)
+        self.daily.update(other.daily)
+        self.updated_at = max(filter(None, [self.updated_at, other.updated_at]), default=None)
+        return self
+
+    def analysis(self, recommend: Callable[[Counter, Counter], List[str]]) -> Dict:
+        """Mesmo formato de DarcyDataAnalyzer.analyze_learning_patterns"""
+        analysis = {
+            "total_interactions": self.total,
+            "top_topics": dict(self.topics.most_common(10)),
+            "crew_preferences": dict(self.crews),
+            "avg_response_time": self.processing_time_sum / self.total if self.total else 0.0,
+            "daily_activity": dict(sorted(self.daily.items())),
+            "recommendations": recommend(self.topics, self.crews),
+            "analysis_timestamp": datetime.now().isoformat()
+        }
+        if isinstance(self.topics, SpaceSavingCounter):
+            analysis["topic_tracking"] = self.topics.stats()
+        return analysis
+
+    def to_dict(self) -> Dict:
+        return {
+            "total": self.total,
+            "processing_time_sum": self.processing_time_sum,
+            "topics": self.topics.to_dict() if isinstance(self.topics, SpaceSavingCounter) else dict(self.topics),
+            "topics_mode": "space_saving" if isinstance(self.topics, SpaceSavingCounter) else "exact",
+            "crews": dict(self.crews),
+            "daily": dict(self.daily),
+            "updated_at": self.updated_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LearningPatternAggregate':
+        aggregate = cls()
+        aggregate.total = data.get("total", 0)
+        aggregate.processing_time_sum = data.get("processing_time_sum", 0.0)
+        if data.get("topics_mode") == "space_saving":
+            aggregate.topics = SpaceSavingCounter.from_dict(data["topics"])
+        else:
+            aggregate.topics = Counter(data.get("topics", {}))
+        aggregate.crews = Counter(data.get("crews", {}))
+        aggregate.daily = Counter(data.get("daily", {}))
+        aggregate.updated_at = data.get("updated_at")
+        return aggregate
+
+def _as_space_saving(topics, capacity: int) -> SpaceSavingCounter:
+    if isinstance(topics, SpaceSavingCounter):
+        return topics
+    return SpaceSavingCounter.from_counter(topics, capacity)
+
+class LearningPatternStore:
+    """
+    Agregados por usuário persistidos em disco (um JSON por usuário)
+    - append: custo proporcional ao lote novo, não ao histórico; o JSON do
+      usuário é regravado no máximo a cada flush_interval segundos (e ao sair
+      do LRU, em flush() e em close()), não a cada lote
+    - analysis: leitura O(1) de um snapshot refeito só quando há novas interações
+    - Mantém em memória no máximo max_cached_users agregados (LRU)
+    """
+
+    def __init__(self, state_dir: str, recommend: Callable[[Counter, Counter], List[str]],
+                 max_cached_users: int = 1000, topic_capacity: Optional[int] = None,
+                 flush_interval: float = 5.0):
+        self.state_dir = Path(state_dir)
+        self.recommend = recommend
+        self.max_cached_users = max_cached_users
+        self.topic_capacity = topic_capacity
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._aggregates = OrderedDict()  # user_id -> LearningPatternAggregate
+        self._snapshots = {}              # user_id -> análise pronta
+        self._dirty = {}                  # user_id -> instante (monotonic) da primeira alteração não gravada
+        self.saves = 0
+
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def valid_user_id(user_id: str) -> bool:
+        return bool(user_id) and USER_ID_PATTERN.match(user_id) is not None
+
+    def _path(self, user_id: str) -> Path:
+        return self.state_dir / f"{user_id}.json"
+
+    def _load(self, user_id: str) -> Optional[LearningPatternAggregate]:
+        """Agregado do usuário (memória ou disco); chamar com o lock"""
+        aggregate = self._aggregates.get(user_id)
+        if aggregate is not None:
+            self._aggregates.move_to_end(user_id)
+            return aggregate
+
+        path = self._path(user_id)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                aggregate = LearningPatternAggregate.from_dict(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Estado de aprendizado inválido para {user_id}: {e}")
+            return None
+        self._remember(user_id, aggregate)
+        return aggregate
+
+    def _remember(self, user_id: str, aggregate: LearningPatternAggregate):
+        self._aggregates[user_id] = aggregate
+        self._aggregates.move_to_end(user_id)
+        while len(self._aggregates) > self.max_cached_users:
+            evicted, evicted_aggregate = self._aggregates.popitem(last=False)
+            self._snapshots.pop(evicted, None)
+            if evicted in self._dirty:
+                try:
+                    self._save(evicted, evicted_aggregate)
+                except OSError as e:
+                    self._dirty.pop(evicted, None)
+                    logger.error(f"Estado de aprendizado de {evicted} perdido ao sair da memória: {e}")
+
+    def _save(self, user_id: str, aggregate: LearningPatternAggregate):
+        path = self._path(user_id)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(aggregate.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._dirty.pop(user_id, None)
+        self.saves += 1
+
+    def _flush(self, due_only: bool = False):
+        """Grava os agregados alterados (só os vencidos com due_only); chamar com o lock"""
+        now = time.monotonic()
+        for user_id, since in list(self._dirty.items()):
+            if due_only and now - since < self.flush_interval:
+                continue
+            try:
+                self._save(user_id, self._aggregates[user_id])
+            except OSError as e:
+                logger.error(f"Erro ao gravar estado de aprendizado de {user_id}: {e}")
+
+    def append(self, user_id: str, interactions: List[Dict]) -> LearningPatternAggregate:
+        """Incorpora novas interações ao agregado do usuário; a gravação em disco é adiada"""
+        with self._lock:
+            aggregate = self._load(user_id) or LearningPatternAggregate(self.topic_capacity)
+            aggregate.extend(interactions)
+            self._dirty.setdefault(user_id, time.monotonic())
+            self._remember(user_id, aggregate)
+            self._snapshots.pop(user_id, None)
+            self._flush(due_only=True)
+            return aggregate
+
+    def analysis(self, user_id: str) -> Optional[Dict]:
+        """Análise atual do usuário; None se não houver interações registradas"""
+        with self._lock:
+            snapshot = self._snapshots.get(user_id)
+            if snapshot is not None:
+                self._aggregates.move_to_end(user_id)
+            else:
+                aggregate = self._load(user_id)
+                if aggregate is None:
+                    return None
+                snapshot = aggregate.analysis(self.recommend)
+                self._snapshots[user_id] = snapshot
+        # O snapshot é reaproveitado; o horário é o da leitura
+        return {**snapshot, "analysis_timestamp": datetime.now().isoformat()}
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """Grava os agregados pendentes (ao desligar o servidor)"""
+        self.flush()
+
+    def reset(self, user_id: str) -> bool:
+        """Apaga o estado do usuário"""
+        with self._lock:
+            self._aggregates.pop(user_id, None)
+            self._snapshots.pop(user_id, None)
+            self._dirty.pop(user_id, None)
+            try:
+                self._path(user_id).unlink()
+                return True
+            except FileNotFoundError:
+                return False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "cached_users": len(self._aggregates),
+                "cached_snapshots": len(self._snapshots),
+                "max_cached_users": self.max_cached_users,
+                "unsaved_users": len(self._dirty),
+                "saves": self.saves
+            }
@@ -5,13 +5,31 @@ import os
 import sys
 import json
 import asyncio
+import time
+import threading
+import functools
 import aiohttp
+import hashlib
 from pathlib import Path
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any, Iterable, Iterator
 from collections import Counter
+import concurrent.futures
+from concurrent.futures import ProcessPoolExecutor
 import logging
 
+from darcy_cache import FileResultCache, LRUCache
+from darcy_http_cache import HttpResponseCache, CachedResponse
+from darcy_tokenizer import Tokenizer, TokenizedText, normalize_text
+from darcy_uploads import UploadSource, open_payload, spill_to_temp
+import darcy_text_analysis as text_analysis
+from darcy_jobs import JobCancelled
+from darcy_learning import LearningPatternStore, LearningPatternAggregate, interaction_day
+from darcy_interaction_store import InteractionStore
+from darcy_cohorts import plan_shards, analyze_shard, merge_shards
+from darcy_response_stream import ResponseStreamScorer, ScoringSessions
+from darcy_image_pipeline import DEFAULT_IMAGE_SETTINGS, preprocess_image, ocr_tile, stitch_tiles, run_tesseract
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,7 +43,24 @@ class DarcyPythonCore:
     def __init__(self, config_path: str = None):
         self.config = self.load_config(config_path)
         self.session = None
+        self._session_loop = None
+        self._loop = None
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
         self.llm_providers = {}
+        self._process_pool = None
+        self._process_pool_lock = threading.Lock()
+        self._process_pool_tasks = 0
+        self._process_pool_workers = 0
+        self._process_pool_native_recycling = True
+        self._pool_inflight = {}   # pool -> futures submetidos e ainda não concluídos
+        self._pool_abandoned = {}  # pool -> futures cujo prazo estourou
+        self.file_cache = None
+        self.http_cache = None
+        tokenizer_config = self.config["tokenizer"]
+        self.tokenizer = Tokenizer(
+            memo_entries=tokenizer_config.get("memo_entries", 1024)
+        )
         self.selective_components = {
             'file_processing': False,  # Ativa apenas se houver upload
             'data_analysis': False,    # Ativa apenas se houver dados para analisar
@@ -54,6 +89,91 @@ class DarcyPythonCore:
             "file_paths": {
                 "temp": "./temp",
                 "cache": "./cache"
+            },
+            "http": {
+                "limit": 100,                # conexões abertas no total
+                "limit_per_host": 8,         # conexões por host (ex.: pt.wikipedia.org)
+                "keepalive_timeout": 60,     # segundos que uma conexão ociosa fica aberta
+                "ttl_dns_cache": 300,        # segundos de cache de DNS
+                "connect_timeout": 5,
+                "total_timeout": 20
+            },
+            "http_cache": {
+                "enabled": True,
+                "memory_entries": 512,            # respostas mantidas em memória
+                "max_bytes": 64 * 1024 * 1024,    # limite do nível em disco
+                "default_ttl": 3600,              # segundos até revalidar (fontes sem TTL próprio)
+                "ttls": {
+                    "wikipedia_summary": 86400,   # resumos mudam pouco
+                    "wikipedia_search": 6 * 3600
+                },
+                "max_stale": 7 * 86400            # segundos servindo resposta vencida se a fonte falhar
+            },
+            "execution": {
+                "process_pool": True,        # PDF/OCR fora da thread da requisição
+                "max_workers": None,         # None = número de CPUs
+                "task_timeout": 120,         # segundos por tarefa
+                "max_tasks_per_child": 50    # recicla workers para conter vazamentos
+            },
+            "ocr": {
+                "lang": "por+eng",
+                "scanned_pdf_pages": True,   # OCR só nas páginas sem camada de texto
+                "pdf_dpi": 200,              # resolução de renderização das páginas
+                "min_text_chars": 20,        # abaixo disso a página é tratada como digitalizada
+                "image": dict(DEFAULT_IMAGE_SETTINGS)  # pré-processamento e blocos de fotos
+            },
+            "uploads": {
+                "memory_threshold": 32 * 1024 * 1024  # acima disso o upload vai para arquivo temporário
+            },
+            "batch": {
+                "max_files": 50,         # arquivos por requisição em lote
+                "max_concurrency": 4     # arquivos processados ao mesmo tempo
+            },
+            "jobs": {
+                "workers": 2,            # jobs longos processados ao mesmo tempo
+                "max_pending": 16,       # acima disso a API responde 429
+                "result_ttl": 3600,      # segundos que o resultado fica disponível
+                "pages_per_task": 25     # páginas por tarefa do pool na extração com progresso
+            },
+            "enhancement": {
+                "max_batch": 64,             # respostas por requisição em lote
+                "memo_entries": 2048,        # avaliações memoizadas (0 = desativado)
+                "memo_ttl": 3600,            # segundos; None = sem expiração
+                "stream_sessions": 256,      # avaliações incrementais abertas ao mesmo tempo
+                "stream_session_ttl": 600,   # segundos de inatividade até a sessão expirar
+                "deadline_ms": None          # orçamento padrão por requisição (None = sem limite)
+            },
+            "semantic": {
+                "dimensions": 2048,              # baldes do vetor de n-gramas
+                "ngram_min": 3,
+                "ngram_max": 5,
+                "term_cache_entries": 50_000,    # n-gramas já calculados por termo
+                "max_references_per_topic": 100, # ~8 KB por referência
+                "max_topics": 100
+            },
+            "tokenizer": {
+                "memo_entries": 1024         # textos tokenizados mantidos em memória
+            },
+            "file_cache": {
+                "enabled": True,
+                "max_bytes": 256 * 1024 * 1024  # limite do cache de resultados em disco
+            },
+            "learning_patterns": {
+                "max_cached_users": 1000,   # agregados por usuário mantidos em memória
+                "stream_batch_size": 1000,  # interações por lote na ingestão NDJSON
+                "topic_capacity": None,     # None = tópicos exatos; N = SpaceSaving com N itens
+                "flush_interval": 5         # segundos entre gravações do estado de um usuário
+            },
+            "cohorts": {
+                "max_users": 5000,           # usuários por relatório de turma/escola
+                "shards": None               # None = um shard por worker do pool
+            },
+            "interaction_store": {
+                "enabled": True,
+                "batch_size": 500,           # interações acumuladas antes de gravar
+                "flush_interval": 5,         # segundos máximos no buffer
+                "retention_days": None,      # None = manter todo o histórico
+                "compact_interval": 86400    # segundos entre compactações
             }
         }
         
@@ -94,8 +214,7 @@ class DarcyPythonCore:
 
     async def selective_initialize(self, needed_components: List[str]):
         """Inicializa apenas componentes necessários"""
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+        await self.get_session()
         
         for component in needed_components:
             if component in self.selective_components:
@@ -114,6 +233,277 @@ class DarcyPythonCore:
         if any(comp in active_components for comp in ['data_analysis', 'ml_enhancement']):
             Path(self.config["file_paths"]["cache"]).mkdir(parents=True, exist_ok=True)
             
+    async def initialize(self):
+        """Inicialização completa usada pela ponte Flask"""
+        await self.selective_initialize(list(self.selective_components.keys()))
+        await self.check_llm_providers()
+        
+    async def cleanup(self):
+        """Libera sessão HTTP e pool de processos"""
+        self.shutdown_process_pool()
+        await self.close_session()
+    
+    def get_event_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Event loop persistente em uma thread de fundo (criado sob demanda)
+        A ponte Flask envia as corrotinas para ele com run_coroutine, então a
+        sessão HTTP e suas conexões keep-alive são reaproveitadas entre requisições
+        """
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+                
+                self._loop_thread = threading.Thread(target=run, name="darcy-event-loop", daemon=True)
+                self._loop_thread.start()
+                ready.wait()
+                self._loop = loop
+                logger.info("🔁 Event loop de fundo iniciado")
+            return self._loop
+    
+    def run_coroutine(self, coro, timeout: Optional[float] = None):
+        """Executa a corrotina no event loop de fundo e aguarda o resultado (chamado de threads síncronas)"""
+        loop = self.get_event_loop()
+        if threading.current_thread() is self._loop_thread:
+            coro.close()
+            raise RuntimeError("run_coroutine chamado de dentro do event loop de fundo; use await")
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+    
+    def stop_event_loop(self, timeout: float = 10):
+        """Fecha a sessão HTTP e encerra o event loop de fundo"""
+        with self._loop_lock:
+            loop, thread = self._loop, self._loop_thread
+            self._loop = self._loop_thread = None
+        if loop is None or loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.close_session(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Erro ao fechar sessão HTTP: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        loop.close()
+        logger.info("🔁 Event loop de fundo encerrado")
+    
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        Sessão HTTP compartilhada, com pool de conexões ajustado (limites por host,
+        keep-alive e cache de DNS); pertence ao event loop em que foi criada
+        """
+        loop = asyncio.get_running_loop()
+        if self.session is not None and not self.session.closed:
+            if self._session_loop is not loop:
+                raise RuntimeError("Sessão HTTP pertence a outro event loop; use core.run_coroutine")
+            return self.session
+        
+        http = self.config["http"]
+        connector = aiohttp.TCPConnector(
+            limit=http.get("limit", 100),
+            limit_per_host=http.get("limit_per_host", 8),
+            keepalive_timeout=http.get("keepalive_timeout", 60),
+            ttl_dns_cache=http.get("ttl_dns_cache", 300),
+            use_dns_cache=True
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(
+                total=http.get("total_timeout", 20),
+                connect=http.get("connect_timeout", 5)
+            )
+        )
+        self._session_loop = loop
+        return self.session
+    
+    async def close_session(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+            self._session_loop = None
+    
+    def session_stats(self) -> Dict:
+        """Estado do pool de conexões HTTP"""
+        if self.session is None or self.session.closed:
+            return {"open": False}
+        connector = self.session.connector
+        return {
+            "open": True,
+            "limit": connector.limit,
+            "limit_per_host": connector.limit_per_host,
+            "event_loop_thread": self._loop_thread is not None and self._loop_thread.is_alive()
+        }
+            
+    def tokenize(self, text: str) -> TokenizedText:
+        """Tokenização compartilhada entre componentes (memoizada por hash do texto)"""
+        return self.tokenizer.tokenize(text)
+    
+    def get_file_cache(self) -> Optional[FileResultCache]:
+        """Cache de resultados de arquivos em disco (criado sob demanda)"""
+        cache_config = self.config["file_cache"]
+        if not cache_config.get("enabled", True):
+            return None
+            
+        if self.file_cache is None:
+            cache_dir = Path(self.config["file_paths"]["cache"]) / "files"
+            self.file_cache = FileResultCache(str(cache_dir), cache_config.get("max_bytes"))
+        return self.file_cache
+    
+    def get_http_cache(self) -> Optional[HttpResponseCache]:
+        """Cache das respostas das fontes de busca (memória + disco, criado sob demanda)"""
+        cache_config = self.config["http_cache"]
+        if not cache_config.get("enabled", True):
+            return None
+            
+        if self.http_cache is None:
+            cache_dir = Path(self.config["file_paths"]["cache"]) / "http"
+            self.http_cache = HttpResponseCache(
+                str(cache_dir),
+                memory_entries=cache_config.get("memory_entries", 512),
+                max_disk_bytes=cache_config.get("max_bytes"),
+                ttls=cache_config.get("ttls"),
+                default_ttl=cache_config.get("default_ttl", 3600),
+                max_stale=cache_config.get("max_stale", 7 * 86400)
+            )
+        return self.http_cache
+    
+    async def fetch_json(self, url: str, params: Optional[Dict] = None, source: str = "default") -> CachedResponse:
+        """GET de uma fonte de busca pela sessão compartilhada, passando pelo cache HTTP quando ativo"""
+        session = await self.get_session()
+        cache = self.get_http_cache()
+        if cache is not None:
+            return await cache.get_json(session, url, params=params, source=source)
+        async with session.get(url, params=params) as response:
+            data = await response.json() if response.status == 200 else None
+            return CachedResponse(response.status, data, "upstream")
+    
+    def get_process_pool(self) -> ProcessPoolExecutor:
+        """Retorna o pool de processos para tarefas CPU-bound (criado sob demanda)"""
+        execution = self.config["execution"]
+        
+        with self._process_pool_lock:
+            if self._process_pool is not None and self._process_pool_tasks >= self._pool_task_budget():
+                # Sem max_tasks_per_child nativo (Python < 3.11): recicla o pool inteiro
+                self._retire_process_pool()
+                
+            if self._process_pool is None:
+                max_workers = execution.get("max_workers") or os.cpu_count() or 1
+                max_tasks = execution.get("max_tasks_per_child")
+                try:
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=max_workers,
+                        max_tasks_per_child=max_tasks
+                    )
+                    self._process_pool_native_recycling = True
+                except TypeError:
+                    self._process_pool = ProcessPoolExecutor(max_workers=max_workers)
+                    self._process_pool_native_recycling = False
+                self._process_pool_workers = max_workers
+                self._process_pool_tasks = 0
+                logger.info(f"⚙️ Pool de processos iniciado com {max_workers} workers")
+                
+            self._process_pool_tasks += 1
+            return self._process_pool
+    
+    def _pool_task_budget(self) -> float:
+        """Número de tarefas antes de reciclar o pool quando não há reciclagem nativa"""
+        max_tasks = self.config["execution"].get("max_tasks_per_child")
+        if not max_tasks or self._process_pool_native_recycling:
+            return float('inf')
+        return max_tasks * self._process_pool_workers
+    
+    def _retire_process_pool(self):
+        """
+        Descarta o pool atual sem bloquear (chamado com _process_pool_lock)
+        - Tarefas já enviadas por outras requisições continuam e terminam normalmente
+        - Uma thread encerra os workers restantes (inclusive os travados em
+          tarefas com prazo estourado) quando só sobrarem tarefas abandonadas
+        """
+        pool = self._process_pool
+        if pool is None:
+            return
+        self._process_pool = None
+        processes = list((getattr(pool, "_processes", None) or {}).values())  # shutdown() descarta a lista
+        pool.shutdown(wait=False, cancel_futures=False)
+        threading.Thread(
+            target=self._reap_process_pool, args=(pool, processes), name="darcy-pool-reaper", daemon=True
+        ).start()
+    
+    def _reap_process_pool(self, pool: ProcessPoolExecutor, processes: List):
+        while True:
+            with self._process_pool_lock:
+                abandoned = self._pool_abandoned.get(pool, set())
+                pending = [f for f in self._pool_inflight.get(pool, ()) if f not in abandoned]
+            if not pending:
+                break
+            concurrent.futures.wait(pending, timeout=1.0)  # novas tarefas podem ser abandonadas
+            
+        stuck = [process for process in processes if process.is_alive()]
+        for process in stuck:
+            process.terminate()
+        for process in stuck:
+            process.join(5)
+        with self._process_pool_lock:
+            self._pool_inflight.pop(pool, None)
+            self._pool_abandoned.pop(pool, None)
+        if stuck:
+            logger.info(f"⚙️ Pool antigo encerrado ({len(stuck)} workers finalizados)")
+    
+    def _track_pool_future(self, pool: ProcessPoolExecutor, future: concurrent.futures.Future):
+        with self._process_pool_lock:
+            self._pool_inflight.setdefault(pool, set()).add(future)
+        
+        def done(f, pool=pool):
+            with self._process_pool_lock:
+                inflight = self._pool_inflight.get(pool)
+                if inflight is not None:
+                    inflight.discard(f)
+        future.add_done_callback(done)
+    
+    async def run_cpu_bound(self, func, *args, timeout: float = None):
+        """
+        Executa função CPU-bound (PyPDF2, pytesseract) no pool de processos
+        A função precisa ser de nível de módulo para poder ser serializada
+        Se o tempo limite estourar, o pool é descartado (as outras tarefas dele
+        terminam, o worker travado é encerrado) e um novo é criado na próxima tarefa
+        """
+        execution = self.config["execution"]
+        timeout = timeout if timeout is not None else execution.get("task_timeout")
+        loop = asyncio.get_running_loop()
+        if not execution.get("process_pool", True):
+            # Sem pool: thread de fundo, para não travar o event loop compartilhado
+            return await asyncio.wait_for(loop.run_in_executor(None, func, *args), timeout)
+            
+        pool = self.get_process_pool()
+        future = pool.submit(func, *args)
+        self._track_pool_future(pool, future)
+        
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future, loop=loop), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ Tarefa {func.__name__} excedeu {timeout}s - reciclando pool")
+            with self._process_pool_lock:
+                self._pool_abandoned.setdefault(pool, set()).add(future)
+                if self._process_pool is pool:
+                    self._retire_process_pool()
+            raise
+    
+    def shutdown_process_pool(self, wait: bool = True):
+        """Encerra o pool de processos (chamado no desligamento do servidor)"""
+        with self._process_pool_lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=wait, cancel_futures=True)
+                self._process_pool = None
+                logger.info("⚙️ Pool de processos encerrado")
+        
     async def check_llm_providers(self):
         """Verifica disponibilidade dos provedores LLM"""
         providers = self.config["llm_endpoints"]
@@ -128,7 +518,8 @@ class DarcyPythonCore:
                 
                 endpoint = health_endpoints.get(name, f"{url}/health")
                 
-                async with self.session.get(endpoint, timeout=5) as response:
+                session = await self.get_session()
+                async with session.get(endpoint, timeout=aiohttp.ClientTimeout(total=5)) as response:
                     if response.status == 200:
                         self.llm_providers[name] = {"status": "healthy", "url": url}
                         logger.info(f"✅ {name} disponível em {url}")
@@ -147,6 +538,203 @@ class DarcyDataAnalyzer:
     
     def __init__(self, core: DarcyPythonCore):
         self.core = core
+        self.pattern_store = None
+        self.interaction_store = None
+        
+    def get_pattern_store(self) -> LearningPatternStore:
+        """Agregados persistentes por usuário (criados sob demanda)"""
+        if self.pattern_store is None:
+            state_dir = Path(self.core.config["file_paths"]["cache"]) / "learning"
+            patterns_config = self.core.config["learning_patterns"]
+            self.pattern_store = LearningPatternStore(
+                str(state_dir),
+                self.generate_recommendations,
+                patterns_config.get("max_cached_users", 1000),
+                patterns_config.get("topic_capacity"),
+                patterns_config.get("flush_interval", 5)
+            )
+        return self.pattern_store
+    
+    def get_interaction_store(self) -> Optional[InteractionStore]:
+        """Histórico de interações em SQLite (criado sob demanda)"""
+        store_config = self.core.config["interaction_store"]
+        if not store_config.get("enabled", True):
+            return None
+        if self.interaction_store is None:
+            db_path = Path(self.core.config["file_paths"]["cache"]) / "interactions.db"
+            self.interaction_store = InteractionStore(
+                str(db_path),
+                batch_size=store_config.get("batch_size", 500),
+                flush_interval=store_config.get("flush_interval", 5),
+                retention_days=store_config.get("retention_days"),
+                compact_interval=store_config.get("compact_interval", 86400)
+            )
+        return self.interaction_store
+    
+    def record_interactions(self, user_id: str, interactions: List[Dict]) -> Dict:
+        """
+        Incorpora novas interações ao estado do usuário (custo do lote, não do histórico)
+        O agregado valida e aplica o lote inteiro antes da gravação no histórico:
+        um lote rejeitado não deixa linhas no SQLite que uma nova tentativa duplicaria
+        """
+        aggregate = self.get_pattern_store().append(user_id, interactions)
+        store = self.get_interaction_store()
+        if store is not None:
+            store.add(user_id, interactions)
+        return {
+            "user_id": user_id,
+            "added": len(interactions),
+            "total_interactions": aggregate.total,
+            "updated_at": aggregate.updated_at
+        }
+    
+    def get_learning_patterns(self, user_id: str) -> Optional[Dict]:
+        """Análise atual do usuário a partir do estado agregado"""
+        return self.get_pattern_store().analysis(user_id)
+    
+    def analyze_interaction_stream(self, records: Iterable[Dict], batch_size: Optional[int] = None) -> Dict:
+        """
+        Análise de um fluxo de interações (ex.: NDJSON lido linha a linha)
+        Os registros são consumidos em lotes e incorporados a um agregado, então
+        a memória depende do tamanho do lote e não do total enviado
+        """
+        patterns_config = self.core.config["learning_patterns"]
+        batch_size = batch_size or patterns_config.get("stream_batch_size", 1000)
+        aggregate = LearningPatternAggregate(patterns_config.get("topic_capacity"))
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                aggregate.extend(batch)
+                batch = []
+        aggregate.extend(batch)
+        
+        if aggregate.total == 0:
+            return None
+        return aggregate.analysis(self.generate_recommendations)
+    
+    def analyze_period(self, user_id: str, since: Optional[float] = None,
+                       until: Optional[float] = None) -> Optional[Dict]:
+        """
+        Análise das interações armazenadas em um intervalo (segundos UTC)
+        Lê apenas a faixa (user_id, ts) do índice, não o histórico inteiro
+        """
+        store = self.get_interaction_store()
+        if store is None:
+            return {"error": "Armazenamento de interações desativado"}
+        
+        interactions = store.query(user_id, since, until)
+        if not interactions:
+            return None
+        
+        # Mesmo caminho do estado agregado: timestamps com fusos diferentes ou
+        # inválidos (aceitos pelo armazenamento) não quebram a análise
+        topic_capacity = self.core.config["learning_patterns"].get("topic_capacity")
+        analysis = LearningPatternAggregate(topic_capacity).extend(interactions).analysis(self.generate_recommendations)
+        analysis["period"] = {
+            "since": datetime.fromtimestamp(since, timezone.utc).isoformat() if since is not None else None,
+            "until": datetime.fromtimestamp(until, timezone.utc).isoformat() if until is not None else None
+        }
+        return analysis
+    
+    def activity(self, user_ids, resolution: str = "day", since: Optional[float] = None,
+                 until: Optional[float] = None) -> Optional[List[Dict]]:
+        """Atividade por hora/dia/semana a partir dos rollups (custo independe do histórico)"""
+        store = self.get_interaction_store()
+        if store is None:
+            return None
+        return store.activity(user_ids, resolution, since, until)
+    
+    async def analyze_cohort(self, users: Optional[Dict[str, List[Dict]]] = None,
+                             user_ids: Optional[List[str]] = None, since: Optional[float] = None,
+                             until: Optional[float] = None, resolution: Optional[str] = None) -> Dict:
+        """
+        Relatório de turma/escola
+        - users: interações enviadas por usuário; ou user_ids: lidas do histórico
+          (no intervalo since/until) dentro de cada worker
+        - Usuários divididos em shards de volume parecido, agregados no pool de
+          processos em paralelo e combinados (contadores e atividade diária)
+        - resolution (hour/day/week) adiciona a atividade somada dos rollups
+        """
+        start = time.perf_counter()
+        topic_capacity = self.core.config["learning_patterns"].get("topic_capacity")
+        store = None
+        
+        if users is not None:
+            sizes = {user_id: len(interactions) for user_id, interactions in users.items()}
+        else:
+            store = self.get_interaction_store()
+            if store is None:
+                return {"error": "Armazenamento de interações desativado"}
+            sizes = store.count_by_user(user_ids, since, until)
+        
+        if not sizes:
+            return {"error": "Nenhum usuário informado"}
+        
+        shard_count = (
+            self.core.config["cohorts"].get("shards")
+            or self.core.config["execution"].get("max_workers")
+            or os.cpu_count() or 1
+        )
+        shards = []
+        for index, group in enumerate(plan_shards(sizes, shard_count)):
+            shard = {"index": index, "topic_capacity": topic_capacity}
+            if store is None:
+                shard["users"] = {user_id: users[user_id] for user_id in group}
+            else:
+                shard.update(db_path=str(store.db_path), user_ids=group, since=since, until=until)
+            shards.append(shard)
+        
+        async def run(shard):
+            shard_start = time.perf_counter()
+            result = await self.core.run_cpu_bound(analyze_shard, shard)
+            result["timings_ms"]["wall"] = round((time.perf_counter() - shard_start) * 1000, 2)
+            return result
+        
+        try:
+            results = await asyncio.gather(*(run(shard) for shard in shards))
+        except asyncio.TimeoutError:
+            return {"error": "Tempo limite excedido na análise da coorte"}
+        
+        merge_start = time.perf_counter()
+        cohort, summaries = merge_shards(results, topic_capacity)
+        analysis = cohort.analysis(self.generate_recommendations)
+        analysis["users"] = len(summaries)
+        
+        report = {
+            "cohort": analysis,
+            "users": summaries,
+            "shards": [
+                {
+                    "shard": result["index"],
+                    "users": len(result["users"]),
+                    "interactions": sum(summary["total_interactions"] for summary in result["users"].values()),
+                    "timings_ms": result["timings_ms"]
+                }
+                for result in results
+            ],
+            "timings_ms": {
+                "merge": round((time.perf_counter() - merge_start) * 1000, 2),
+                "total": round((time.perf_counter() - start) * 1000, 2)
+            }
+        }
+        if store is not None and resolution:
+            report["activity"] = store.activity(user_ids, resolution, since, until)
+        return report
+    
+    def forget_user(self, user_id: str) -> bool:
+        """Apaga estado agregado e histórico do usuário"""
+        store = self.get_interaction_store()
+        deleted = store.delete_user(user_id) if store is not None else 0
+        return self.get_pattern_store().reset(user_id) or deleted > 0
+    
+    def close(self):
+        """Grava interações e agregados pendentes e fecha o histórico"""
+        if self.pattern_store is not None:
+            self.pattern_store.close()
+        if self.interaction_store is not None:
+            self.interaction_store.close()
+            self.interaction_store = None
         
     def analyze_learning_patterns(self, interaction_data: List[Dict]) -> Dict:
         """
@@ -155,46 +743,51 @@ class DarcyDataAnalyzer:
         - Progresso temporal  
         - Áreas de dificuldade
         - Recomendações personalizadas
+        Caminho colunar: cada campo vira um array uma única vez e as contagens,
+        a média e o agrupamento por dia são feitos em operações vetorizadas
         """
         try:
             import pandas as pd
             import numpy as np
-            from collections import Counter
-            
-            df = pd.DataFrame(interaction_data)
-            
-            # Análise de tópicos mais consultados
-            topics = Counter()
-            for item in interaction_data:
-                if 'query' in item:
-                    # Extrair palavras-chave da consulta
-                    words = item['query'].lower().split()
-                    topics.update(words)
-            
-            # Análise temporal
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                daily_interactions = df.groupby(df['timestamp'].dt.date).size()
-                
-            # Análise de crews mais utilizadas
-            crew_usage = Counter([item.get('crew', 'unknown') for item in interaction_data])
+        except ImportError:
+            logger.warning("pandas/numpy não disponível - análise limitada")
+            return self.basic_analysis(interaction_data)
+            
+        try:
+            # Colunas extraídas uma única vez, com os mesmos padrões da análise por item
+            queries = [item['query'] for item in interaction_data if 'query' in item]
+            crews = pd.Series([item.get('crew', 'unknown') for item in interaction_data], dtype=object)
+            processing_times = np.array([item.get('processing_time', 0) for item in interaction_data], dtype=float)
+            has_timestamp = any('timestamp' in item for item in interaction_data)
+            
+            # Tópicos: uma única divisão do texto concatenado (contagem em C);
+            # a ordem de inserção é a mesma da contagem consulta a consulta
+            topics = Counter(" ".join(queries).lower().split())
+            
+            # Equipes: contagem na ordem da primeira ocorrência
+            crew_usage = Counter(crews.value_counts(sort=False, dropna=False).to_dict())
             
-            # Análise de satisfação (se disponível)
-            avg_response_time = np.mean([item.get('processing_time', 0) for item in interaction_data])
+            avg_response_time = float(processing_times.mean()) if len(processing_times) else 0.0
+            
+            daily_activity = {}
+            if has_timestamp:
+                # Dias em UTC, como nos rollups do histórico (sem fuso = UTC)
+                days = pd.Series([interaction_day(item.get('timestamp')) for item in interaction_data])
+                daily_activity = {
+                    day: int(count)
+                    for day, count in days.value_counts().sort_index().items()
+                }
             
             return {
                 "total_interactions": len(interaction_data),
                 "top_topics": dict(topics.most_common(10)),
                 "crew_preferences": dict(crew_usage),
                 "avg_response_time": avg_response_time,
-                "daily_activity": daily_interactions.to_dict() if 'timestamp' in df.columns else {},
+                "daily_activity": daily_activity,
                 "recommendations": self.generate_recommendations(topics, crew_usage),
                 "analysis_timestamp": datetime.now().isoformat()
             }
             
-        except ImportError:
-            logger.warning("pandas/numpy não disponível - análise limitada")
-            return self.basic_analysis(interaction_data)
         except Exception as e:
             logger.error(f"Erro na análise: {e}")
             return {"error": str(e)}
@@ -244,15 +837,143 @@ class DarcyFileProcessor:
     Funcionalidades que JavaScript não consegue fazer nativamente
     """
     
+    # Incrementar quando a saída de process_pdf/process_image mudar (invalida o cache)
+    PROCESSOR_VERSION = "3"
+    
+    IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
+    
     def __init__(self, core: DarcyPythonCore):
         self.core = core
         
-    async def process_pdf(self, file_path: str) -> Dict:
-        """Processa arquivos PDF com OCR se necessário"""
+    async def process_file(self, source, filename: str, ocr_scanned_pages: Optional[bool] = None,
+                           progress_callback=None) -> Dict:
+        """
+        Processa um arquivo escolhendo o processador pela extensão do nome
+        progress_callback(atual, total, etapa) é chamado a cada faixa de páginas
+        ou página reconhecida (PDF) ou etapa (imagem)
+        """
+        file_ext = Path(filename).suffix.lower()
+        
+        if file_ext == '.pdf':
+            return await self.process_pdf(source, ocr_scanned_pages, progress_callback)
+        elif file_ext in self.IMAGE_EXTENSIONS:
+            if progress_callback:
+                progress_callback(0, 1)
+            result = await self.process_image(source)
+            if progress_callback:
+                progress_callback(1, 1)
+            return result
+        else:
+            return {"error": f"Tipo de arquivo não suportado: {file_ext}"}
+    
+    async def process_batch(self, files: List[tuple], ocr_scanned_pages: Optional[bool] = None,
+                            max_concurrency: Optional[int] = None) -> Dict:
+        """
+        Processa vários arquivos [(nome, source), ...] com paralelismo limitado
+        - Arquivos com conteúdo idêntico (mesmo SHA-256) são processados uma vez
+        - Retorna resultados por arquivo, na ordem recebida, e estatísticas do lote
+        """
+        max_concurrency = max_concurrency or self.core.config["batch"].get("max_concurrency", 4)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        start = time.perf_counter()
+        
+        sources = [UploadSource.coerce(source) for _, source in files]
+        first_by_content = {}
+        entries = []
+        for index, ((filename, _), source) in enumerate(zip(files, sources)):
+            key = (await asyncio.to_thread(source.sha256), Path(filename).suffix.lower())
+            entry = {"filename": filename, "bytes": source.size}
+            if key in first_by_content:
+                entry["duplicate_of"] = files[first_by_content[key]][0]
+                entry["_original"] = first_by_content[key]
+            else:
+                first_by_content[key] = index
+            entries.append(entry)
+        
+        async def run(index: int):
+            async with semaphore:
+                file_start = time.perf_counter()
+                try:
+                    result = await self.process_file(sources[index], files[index][0], ocr_scanned_pages)
+                except Exception as e:
+                    result = {"error": f"Erro ao processar arquivo: {e}"}
+                entries[index]["result"] = result
+                entries[index]["elapsed_ms"] = round((time.perf_counter() - file_start) * 1000, 2)
+        
+        await asyncio.gather(*[run(index) for index in first_by_content.values()])
+        
+        for entry in entries:
+            original = entry.pop("_original", None)
+            if original is not None:
+                entry["result"] = entries[original]["result"]
+                entry["elapsed_ms"] = 0.0
+        
+        elapsed = time.perf_counter() - start
+        total_bytes = sum(entry["bytes"] for entry in entries)
+        processed_bytes = sum(entries[index]["bytes"] for index in first_by_content.values())
+        return {
+            "results": entries,
+            "stats": {
+                "files": len(entries),
+                "unique_files": len(first_by_content),
+                "duplicates": len(entries) - len(first_by_content),
+                "errors": sum(1 for entry in entries if "error" in entry["result"]),
+                "total_bytes": total_bytes,
+                "processed_bytes": processed_bytes,
+                "max_concurrency": max_concurrency,
+                "elapsed_ms": round(elapsed * 1000, 2),
+                "files_per_second": round(len(entries) / elapsed, 2) if elapsed else None,
+                "mb_per_second": round(processed_bytes / 1e6 / elapsed, 3) if elapsed else None
+            }
+        }
+        
+    async def process_pdf(self, source, ocr_scanned_pages: Optional[bool] = None, progress_callback=None) -> Dict:
+        """
+        Processa arquivos PDF com OCR se necessário (resultado em cache por conteúdo)
+        source: caminho, bytes, objeto de arquivo ou UploadSource
+        ocr_scanned_pages: OCR nas páginas sem texto (None = usa config["ocr"])
+        progress_callback(atual, total, etapa): chamado a cada faixa de páginas
+        extraída (etapa "text") e a cada página reconhecida (etapa "ocr"); pode
+        levantar JobCancelled para interromper
+        """
+        if ocr_scanned_pages is None:
+            ocr_scanned_pages = self.core.config["ocr"].get("scanned_pdf_pages", True)
+        kind = "pdf-ocr" if ocr_scanned_pages else "pdf"
+        return await self._with_cache(kind, source, functools.partial(
+            self._process_pdf, ocr_scanned_pages=ocr_scanned_pages, progress_callback=progress_callback
+        ))
+    
+    async def process_image(self, source) -> Dict:
+        """Processa imagens com OCR (resultado em cache por conteúdo)"""
+        return await self._with_cache("image", source, self._process_image)
+    
+    async def _with_cache(self, kind: str, source, process) -> Dict:
+        """Consulta o cache pelo SHA-256 do conteúdo antes de processar"""
+        source = UploadSource.coerce(source)
+        cache = self.core.get_file_cache()
+        if cache is None:
+            return await process(source)
+        
+        try:
+            key = cache.make_key(await asyncio.to_thread(source.sha256), kind, self.PROCESSOR_VERSION)
+        except OSError:
+            return await process(source)
+        
+        # Hash, leitura e gravação em disco fora do event loop compartilhado
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            cached["cached"] = True
+            return cached
+        
+        result = await process(source)
+        if "error" not in result:
+            await asyncio.to_thread(cache.put, key, result)
+        return result
+        
+    async def _process_pdf(self, source: UploadSource, ocr_scanned_pages: bool = False, progress_callback=None) -> Dict:
+        """Extrai texto e metadados do PDF e analisa o conteúdo"""
+        payload = _PoolPayload(source, self.core.config["file_paths"]["temp"])
         try:
-            import PyPDF2
-            import fitz  # pymupdf
-            
             result = {
                 "type": "pdf",
                 "pages": 0,
@@ -261,45 +982,250 @@ class DarcyFileProcessor:
                 "images": []
             }
             
-            # Tentar PyPDF2 primeiro (mais rápido)
-            try:
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    result["pages"] = len(pdf_reader.pages)
-                    result["metadata"] = pdf_reader.metadata
-                    
-                    text_content = []
-                    for page in pdf_reader.pages:
-                        text_content.append(page.extract_text())
-                    
-                    result["text"] = "\n".join(text_content)
-                    
-            except Exception as e:
-                logger.warning(f"PyPDF2 falhou, tentando pymupdf: {e}")
-                
-                # Fallback para pymupdf (mais robusto)
-                doc = fitz.open(file_path)
-                result["pages"] = len(doc)
-                
-                text_content = []
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    text_content.append(page.get_text())
-                
-                result["text"] = "\n".join(text_content)
-                doc.close()
+            if progress_callback is None:
+                # Extração CPU-bound roda no pool de processos do core
+                extracted = await self.core.run_cpu_bound(_extract_pdf_task, source.payload)
+            else:
+                # Com progresso (jobs), extrai em faixas de páginas no pool
+                extracted = await self._extract_pdf_ranges(payload, progress_callback)
+            page_texts = extracted.pop("page_texts")
+            result.update(extracted)
+            
+            if ocr_scanned_pages:
+                result["ocr"] = await self._ocr_scanned_pages(payload, page_texts, progress_callback)
+            
+            result["text"] = "\n".join(page_texts)
             
-            # Análise educacional do conteúdo
-            result["educational_analysis"] = self.analyze_educational_content(result["text"])
+            # Análise educacional do conteúdo, página a página (fora do event loop)
+            result["educational_analysis"] = await asyncio.to_thread(self.analyze_pages, page_texts)
             
             return result
             
         except ImportError:
             return {"error": "Bibliotecas PDF não instaladas (pip install PyPDF2 pymupdf)"}
+        except asyncio.TimeoutError:
+            return {"error": "Tempo limite excedido ao processar PDF"}
+        except JobCancelled:
+            raise
         except Exception as e:
             return {"error": f"Erro ao processar PDF: {e}"}
+        finally:
+            payload.cleanup()
+    
+    async def _map_pool(self, func, calls: List[tuple], on_done=None) -> List:
+        """
+        Executa func(*args) no pool de processos para cada item de calls
+        - No máximo max_workers tarefas desta requisição em andamento, para
+          não enfileirar um documento inteiro na frente das outras requisições
+        - Resultados na ordem de calls; exceções das tarefas voltam como valores
+        - on_done(resultado) a cada tarefa concluída; se levantar (ex.:
+          JobCancelled), as tarefas pendentes são canceladas
+        """
+        window = self.core.config["execution"].get("max_workers") or os.cpu_count() or 1
+        outcomes = [None] * len(calls)
+        pending = {}
+        next_call = 0
+        try:
+            while next_call < len(calls) or pending:
+                while next_call < len(calls) and len(pending) < window:
+                    task = asyncio.ensure_future(self.core.run_cpu_bound(func, *calls[next_call]))
+                    pending[task] = next_call
+                    next_call += 1
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=pending.get):
+                    index = pending.pop(task)
+                    if task.cancelled():
+                        outcomes[index] = asyncio.CancelledError()
+                    else:
+                        outcomes[index] = task.exception() or task.result()
+                    if on_done is not None:
+                        on_done(outcomes[index])
+        finally:
+            for task in pending:
+                task.cancel()
+        return outcomes
+    
+    async def _extract_pdf_ranges(self, payload: '_PoolPayload', progress_callback) -> Dict:
+        """
+        Extração para jobs: faixas de jobs.pages_per_task páginas no pool de
+        processos, com progresso e verificação de cancelamento a cada faixa
+        """
+        per_task = max(1, self.core.config["jobs"].get("pages_per_task", 25))
+        extracted = await self.core.run_cpu_bound(_extract_pdf_task, payload.source.payload, 0, per_task)
+        total = extracted["pages"]
+        done_pages = len(extracted["page_texts"])
+        progress_callback(done_pages, total, "text")
+        if done_pages >= total:
+            return extracted
+        
+        def on_done(outcome):
+            nonlocal done_pages
+            if not isinstance(outcome, BaseException):
+                done_pages += len(outcome["page_texts"])
+            progress_callback(done_pages, total, "text")
+        
+        path = await payload.shared()
+        outcomes = await self._map_pool(
+            _extract_pdf_task, [(path, start, start + per_task) for start in range(per_task, total, per_task)], on_done
+        )
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+            extracted["page_texts"].extend(outcome["page_texts"])
+        return extracted
+    
+    async def _ocr_scanned_pages(self, payload: '_PoolPayload', page_texts: List[str], progress_callback=None) -> Dict:
+        """
+        OCR seletivo: só as páginas sem camada de texto utilizável são
+        renderizadas (pymupdf) e reconhecidas, em paralelo no pool de processos
+        O texto reconhecido substitui a página correspondente em page_texts
+        Com progress_callback (jobs), o progresso da etapa "ocr" é reportado e
+        o cancelamento verificado a cada página reconhecida
+        """
+        ocr_config = self.core.config["ocr"]
+        min_chars = ocr_config.get("min_text_chars", 20)
+        dpi = ocr_config.get("pdf_dpi", 200)
+        
+        scanned = [i for i, text in enumerate(page_texts) if len(text.strip()) < min_chars]
+        summary = {
+            "scanned_pages": [i + 1 for i in scanned],
+            "text_layer_pages": len(page_texts) - len(scanned),
+            "recognized_pages": [],
+            "dpi": dpi,
+            "ocr_available": True
+        }
+        if not scanned:
+            return summary
+        
+        # Várias páginas: cada tarefa recebe o caminho, não uma cópia do PDF inteiro
+        path = await payload.shared() if len(scanned) > 1 else payload.source.payload
+        on_done = None
+        if progress_callback is not None:
+            done_pages = 0
+            progress_callback(0, len(scanned), "ocr")
+            
+            def on_done(outcome):
+                nonlocal done_pages
+                done_pages += 1
+                progress_callback(done_pages, len(scanned), "ocr")
+        
+        lang = ocr_config.get("lang", "por+eng")
+        outcomes = await self._map_pool(
+            _ocr_pdf_page_task, [(path, page_index, dpi, lang) for page_index in scanned], on_done
+        )
+        
+        # Resultados voltam na ordem das páginas enviadas
+        for page_index, outcome in zip(scanned, outcomes):
+            if isinstance(outcome, BaseException):
+                summary.setdefault("errors", {})[page_index + 1] = str(outcome) or type(outcome).__name__
+                continue
+            if not outcome.get("ocr_available", False):
+                summary["ocr_available"] = False
+                if "ocr_message" in outcome:
+                    summary["ocr_message"] = outcome["ocr_message"]
+                elif "ocr_error" in outcome:
+                    summary.setdefault("errors", {})[page_index + 1] = outcome["ocr_error"]
+                continue
+            if outcome["text"]:
+                page_texts[page_index] = outcome["text"]
+                summary["recognized_pages"].append(page_index + 1)
+        
+        return summary
+    
+    @staticmethod
+    def iter_pdf_pages(payload, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Extrai o PDF página a página (gerador) a partir de bytes ou caminho
+        - Primeiro um registro "document" com número de páginas e metadados
+        - Depois um registro "page" por página, na ordem
+        - start/stop limitam as páginas extraídas (índices a partir de 0)
+        Se o PyPDF2 falhar no meio, o pymupdf continua da página seguinte
+        (o registro "document" sai uma única vez)
+        """
+        import PyPDF2
+        import fitz  # pymupdf
+        
+        pages_done = start
+        header_sent = False
+        
+        # Tentar PyPDF2 primeiro (mais rápido)
+        try:
+            with open_payload(payload) as file:
+                pdf_reader = PyPDF2.PdfReader(file)
+                total_pages = len(pdf_reader.pages)
+                header = DarcyFileProcessor._pdf_document_record(total_pages, pdf_reader.metadata, "PyPDF2")
+                header_sent = True
+                yield header
+                
+                for page_num in range(start, min(stop if stop is not None else total_pages, total_pages)):
+                    text = pdf_reader.pages[page_num].extract_text()
+                    yield DarcyFileProcessor._pdf_page_record(page_num, total_pages, text)
+                    pages_done += 1
+                    
+        except Exception as e:
+            logger.warning(f"PyPDF2 falhou na página {pages_done + 1}, tentando pymupdf: {e}")
+            
+            # Fallback para pymupdf (mais robusto)
+            doc = _open_fitz_document(payload)
+            try:
+                total_pages = len(doc)
+                if not header_sent:
+                    yield DarcyFileProcessor._pdf_document_record(total_pages, doc.metadata, "pymupdf")
+                
+                for page_num in range(pages_done, min(stop if stop is not None else total_pages, total_pages)):
+                    page = doc.load_page(page_num)
+                    yield DarcyFileProcessor._pdf_page_record(page_num, total_pages, page.get_text())
+            finally:
+                doc.close()
+    
+    def stream_pdf_pages(self, source: UploadSource) -> Iterator[Dict]:
+        """
+        Mesmos registros de iter_pdf_pages, para a ponte Flask (gerador síncrono)
+        A extração roda no pool de processos em faixas de jobs.pages_per_task
+        páginas; a thread da requisição só espera cada faixa e repassa os registros
+        Uploads em memória vão para um arquivo temporário a partir da segunda faixa
+        """
+        per_task = max(1, self.core.config["jobs"].get("pages_per_task", 25))
+        payload = _PoolPayload(source, self.core.config["file_paths"]["temp"])
+        try:
+            records = self.core.run_coroutine(
+                self.core.run_cpu_bound(_pdf_records_task, source.payload, 0, per_task)
+            )
+            yield from records
+            total = records[0]["pages"]
+            for start in range(per_task, total, per_task):
+                path = self.core.run_coroutine(payload.shared())
+                records = self.core.run_coroutine(
+                    self.core.run_cpu_bound(_pdf_records_task, path, start, start + per_task)
+                )
+                # Cada faixa traz de novo o registro "document"; ele sai uma única vez
+                yield from records[1:]
+        finally:
+            payload.cleanup()
+    
+    @staticmethod
+    def _pdf_document_record(total_pages: int, metadata: Optional[Dict], engine: str) -> Dict:
+        """Registro inicial do documento (metadados convertidos para JSON simples)"""
+        return {
+            "type": "document",
+            "pages": total_pages,
+            "metadata": {str(k): str(v) for k, v in (metadata or {}).items() if v is not None},
+            "engine": engine
+        }
+    
+    @staticmethod
+    def _pdf_page_record(page_index: int, total_pages: int, text: Optional[str]) -> Dict:
+        """Registro de uma página extraída (número da página começa em 1)"""
+        text = text or ""
+        return {
+            "type": "page",
+            "page": page_index + 1,
+            "total_pages": total_pages,
+            "text": text,
+            "char_count": len(text)
+        }
     
-    async def process_image(self, file_path: str) -> Dict:
+    async def _process_image(self, source: UploadSource) -> Dict:
         """Processa imagens com OCR e análise (resiliente à ausência do Tesseract)"""
         try:
             from PIL import Image
@@ -311,47 +1237,31 @@ class DarcyFileProcessor:
                 "analysis": {}
             }
             
-            # Abrir imagem
-            with Image.open(file_path) as img:
+            # Abrir imagem (só o cabeçalho é lido aqui)
+            with source.open() as stream, Image.open(stream) as img:
                 result["metadata"] = {
                     "size": img.size,
                     "mode": img.mode,
                     "format": img.format
                 }
-                
-                # Tentar OCR se disponível
-                try:
-                    import pytesseract
-                    # Verificar se o executável do Tesseract está disponível
-                    try:
-                        text = pytesseract.image_to_string(img, lang='por+eng')
-                        result["text"] = text.strip()
-                        result["ocr_available"] = True
-                    except pytesseract.TesseractNotFoundError:
-                        result["text"] = ""
-                        result["ocr_available"] = False
-                        result["ocr_message"] = "OCR não disponível: Tesseract não encontrado no servidor"
-                        logger.warning("Tesseract OCR não disponível - continuando sem OCR")
-                    except Exception as e:
-                        result["text"] = ""
-                        result["ocr_error"] = str(e)
-                        result["ocr_available"] = False
-                        logger.warning(f"Erro no OCR: {e}")
-                        
-                except ImportError:
-                    result["text"] = ""
-                    result["ocr_available"] = False
-                    result["ocr_message"] = "OCR não disponível: biblioteca pytesseract não instalada"
-                    logger.warning("pytesseract não disponível - continuando sem OCR")
-                
-                # Análise básica da imagem (sempre disponível)
-                result["analysis"] = {
-                    "has_text": len(result["text"]) > 10,
-                    "likely_educational": self.is_educational_image(result["text"]) if result["text"] else False,
-                    "color_mode": img.mode,
-                    "dimensions": img.size,
-                    "file_size_bytes": os.path.getsize(file_path) if os.path.exists(file_path) else 0
-                }
+            
+            # Pré-processamento e OCR em blocos rodam no pool de processos do core
+            try:
+                result.update(await self._ocr_image(source, result["metadata"]))
+            except asyncio.TimeoutError:
+                result["text"] = ""
+                result["ocr_error"] = "Tempo limite excedido no OCR"
+                result["ocr_available"] = False
+                logger.warning("Tempo limite excedido no OCR")
+            
+            # Análise básica da imagem (sempre disponível)
+            result["analysis"] = {
+                "has_text": len(result["text"]) > 10,
+                "likely_educational": self.is_educational_image(result["text"]) if result["text"] else False,
+                "color_mode": result["metadata"]["mode"],
+                "dimensions": result["metadata"]["size"],
+                "file_size_bytes": source.size
+            }
             
             return result
             
@@ -364,72 +1274,127 @@ class DarcyFileProcessor:
         except Exception as e:
             return {"error": f"Erro ao processar imagem: {e}", "ocr_available": False}
     
+    async def _ocr_image(self, source: UploadSource, metadata: Dict) -> Dict:
+        """
+        Pipeline de OCR de imagem: pré-processamento (redução, cinza, binarização,
+        blocos) em um worker e OCR dos blocos em paralelo, depois costurados
+        Tempos de cada etapa vão para metadata["timings_ms"]
+        """
+        ocr_config = self.core.config["ocr"]
+        
+        prepared = await self.core.run_cpu_bound(preprocess_image, source.payload, ocr_config.get("image"))
+        metadata["preprocessing"] = prepared["info"]
+        metadata["timings_ms"] = timings = prepared["timings_ms"]
+        if "error" in prepared:
+            return {"text": "", "ocr_available": False, "ocr_message": prepared["error"]}
+        
+        start = time.perf_counter()
+        lang = ocr_config.get("lang", "por+eng")
+        # Mesma janela por requisição do OCR de PDF: uma foto grande não ocupa o pool inteiro
+        outcomes = await self._map_pool(ocr_tile, [(tile, lang) for tile in prepared["tiles"]])
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+        timings["ocr"] = round((time.perf_counter() - start) * 1000, 2)
+        
+        start = time.perf_counter()
+        stitched = await asyncio.to_thread(stitch_tiles, outcomes)
+        timings["stitch"] = round((time.perf_counter() - start) * 1000, 2)
+        return stitched
+    
     def analyze_educational_content(self, text: str) -> Dict:
-        """Analisa conteúdo educacional em texto"""
+        """Analisa conteúdo educacional em texto (uma passagem, ver darcy_text_analysis)"""
         if not text or len(text) < 50:
             return {"type": "insufficient_content"}
             
-        # Palavras-chave educacionais
-        educational_keywords = {
-            "mathematics": ["equação", "função", "derivada", "integral", "geometria", "álgebra"],
-            "science": ["experimento", "hipótese", "teoria", "átomo", "célula", "energia"],
-            "history": ["século", "guerra", "revolução", "império", "civilização"],
-            "literature": ["narrativa", "poesia", "romance", "análise", "personagem"],
-            "programming": ["código", "função", "variável", "algoritmo", "programa"]
-        }
-        
-        text_lower = text.lower()
-        subject_scores = {}
-        
-        for subject, keywords in educational_keywords.items():
-            score = sum(1 for keyword in keywords if keyword in text_lower)
-            if score > 0:
-                subject_scores[subject] = score
-        
-        # Determinar assunto principal
-        main_subject = max(subject_scores.items(), key=lambda x: x[1])[0] if subject_scores else "general"
-        
-        return {
-            "main_subject": main_subject,
-            "subject_scores": subject_scores,
-            "word_count": len(text.split()),
-            "reading_level": self.estimate_reading_level(text),
-            "has_equations": "=" in text or "∫" in text or "∑" in text,
-            "has_code": any(keyword in text_lower for keyword in ["def ", "function", "class ", "import"])
-        }
+        return text_analysis.profile_text(text).educational_analysis()
+    
+    def new_document_stats(self) -> text_analysis.DocumentStatsAccumulator:
+        """Acumulador de estatísticas para documentos processados em partes"""
+        return text_analysis.DocumentStatsAccumulator()
+    
+    def analyze_pages(self, pages) -> Dict:
+        """Mesmo resultado de analyze_educational_content("\n".join(pages)), sem juntar o texto"""
+        stats = self.new_document_stats()
+        for page in pages:
+            stats.add_page(page)
+        return stats.educational_analysis()
     
     def estimate_reading_level(self, text: str) -> str:
         """Estima nível de leitura do texto"""
-        words = text.split()
-        sentences = text.split('.')
-        
-        if len(words) < 10:
-            return "insufficient"
-            
-        avg_sentence_length = len(words) / max(len(sentences), 1)
-        avg_word_length = sum(len(word) for word in words) / len(words)
-        
-        # Heurística simples
-        if avg_sentence_length > 25 or avg_word_length > 6:
-            return "advanced"
-        elif avg_sentence_length > 15 or avg_word_length > 5:
-            return "intermediate"
-        else:
-            return "basic"
+        return text_analysis.profile_text(text).reading_level()
     
     def is_educational_image(self, text: str) -> bool:
         """Determina se uma imagem tem conteúdo educacional"""
         if not text:
             return False
             
-        educational_indicators = [
-            "exercício", "problema", "questão", "resposta",
-            "capítulo", "página", "figura", "gráfico",
-            "fórmula", "definição", "exemplo", "teoria"
-        ]
-        
-        text_lower = text.lower()
-        return any(indicator in text_lower for indicator in educational_indicators)
+        return text_analysis.has_educational_indicators(text_analysis.profile_text(text))
+
+class _PoolPayload:
+    """
+    Conteúdo de um upload compartilhado por várias tarefas do pool
+    shared() grava uploads em memória uma única vez em arquivo temporário
+    (fora do event loop) e devolve o caminho; cleanup() remove o arquivo
+    """
+
+    def __init__(self, source: UploadSource, temp_root: Optional[str] = None):
+        self.source = source
+        self.temp_root = temp_root
+        self._spilled = None
+        self._path = None
+
+    async def shared(self):
+        if self.source.data is None:
+            return self.source.path
+        if self._spilled is None:
+            self._spilled, self._path = await asyncio.to_thread(
+                spill_to_temp, self.source.data, ".pdf", self.temp_root
+            )
+        return self._path
+
+    def cleanup(self):
+        if self._spilled is not None:
+            self._spilled.cleanup()
+            self._spilled = None
+
+def _extract_pdf_task(payload, start: int = 0, stop: Optional[int] = None) -> Dict:
+    """Tarefa do pool de processos: extrai texto por página (faixa start:stop) e metadados do PDF"""
+    extracted = {"pages": 0, "metadata": {}, "page_texts": []}
+    
+    for record in DarcyFileProcessor.iter_pdf_pages(payload, start, stop):
+        if record["type"] == "document":
+            extracted["pages"] = record["pages"]
+            extracted["metadata"] = record["metadata"]
+        else:
+            extracted["page_texts"].append(record["text"])
+    
+    return extracted
+
+def _pdf_records_task(payload, start: int = 0, stop: Optional[int] = None) -> List[Dict]:
+    """Tarefa do pool de processos: registros de iter_pdf_pages da faixa start:stop"""
+    return list(DarcyFileProcessor.iter_pdf_pages(payload, start, stop))
+
+def _open_fitz_document(payload):
+    """Abre documento no pymupdf direto de bytes ou de caminho"""
+    import fitz  # pymupdf
+    
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=payload, filetype="pdf")
+    return fitz.open(payload)
+
+def _ocr_pdf_page_task(payload, page_index: int, dpi: int, lang: str) -> Dict:
+    """Tarefa do pool de processos: renderiza uma página do PDF e faz OCR"""
+    import fitz  # pymupdf
+    from PIL import Image
+    
+    doc = _open_fitz_document(payload)
+    try:
+        pix = doc.load_page(page_index).get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    finally:
+        doc.close()
+    return run_tesseract(img, lang)
 
 class DarcyMLEnhancer:
     """
@@ -437,67 +1402,416 @@ class DarcyMLEnhancer:
     Funcionalidades avançadas de IA que complementam os LLMs
     """
     
+    QUALITY_INDICATORS = [normalize_text(indicator) for indicator in [
+        "exemplo", "por exemplo", "imagine que", "considere",
+        "passo a passo", "primeiro", "segundo", "finalmente",
+        "importante", "lembre-se", "note que", "observe",
+        "prática", "exercício", "atividade", "aplicação"
+    ]]
+    
+    STRUCTURE_MARKERS = [normalize_text(marker) for marker in ["primeiro", "segundo", "além disso", "portanto"]]
+    
+    # Campos que não entram no memo (resposta original e dados da execução com prazo)
+    UNCACHED_KEYS = ("original_response", "partial", "skipped", "timings_ms")
+    
+    # Indicadores e marcadores buscados juntos na avaliação em lote
+    PHRASES = text_analysis.PhraseMatcher(QUALITY_INDICATORS + STRUCTURE_MARKERS)
+    
+    # Resposta de exemplo (~1000 caracteres) para a medição inicial dos avaliadores
+    CALIBRATION_CONTEXT = {"query": "Explique derivada e integral de uma função", "crew": "teaching"}
+    CALIBRATION_RESPONSE = (
+        "Primeiro, considere a derivada como a taxa de variação de uma função. Por exemplo, "
+        "a velocidade é a derivada da posição em relação ao tempo. Além disso, a integral "
+        "acumula essa variação: observe que a área sob a curva da velocidade é o deslocamento. "
+        "Segundo, note que derivada e integral são operações inversas, como afirma o teorema "
+        "fundamental do cálculo. Portanto, calcular uma integral definida é encontrar uma "
+        "primitiva e avaliar nos limites. Imagine que f(x) = x²: a derivada é 2x e a integral "
+        "de 0 a 1 vale 1/3. Passo a passo: escreva a função, aplique a regra da potência e "
+        "confira o resultado derivando a primitiva. Lembre-se de que constantes desaparecem na "
+        "derivada. Exercício: calcule a derivada de x³ e a integral de 2x entre 0 e 2. "
+        "Finalmente, pratique com aplicações em física e economia para fixar os conceitos."
+    )
+    
     def __init__(self, core: DarcyPythonCore):
         self.core = core
+        # Memo das avaliações: o resultado depende só da resposta, da pergunta e
+        # da crew; a resposta original não é guardada (é devolvida da entrada)
+        memo_config = core.config.get("enhancement", {})
+        memo_entries = memo_config.get("memo_entries", 2048)
+        self.memo = LRUCache(memo_entries, ttl=memo_config.get("memo_ttl")) if memo_entries else None
         
-    def enhance_response_quality(self, response: str, context: Dict) -> Dict:
+        # Completude semântica: n-gramas com hashing e referências por tópico (requer NumPy)
+        try:
+            from darcy_semantic import HashedNgramVectorizer, ReferenceIndex
+            semantic_config = core.config.get("semantic", {})
+            self.vectorizer = HashedNgramVectorizer(
+                dimensions=semantic_config.get("dimensions", 2048),
+                ngram_min=semantic_config.get("ngram_min", 3),
+                ngram_max=semantic_config.get("ngram_max", 5),
+                term_cache_entries=semantic_config.get("term_cache_entries", 50_000)
+            )
+            self.references = ReferenceIndex(
+                self.vectorizer,
+                max_per_topic=semantic_config.get("max_references_per_topic", 100),
+                max_topics=semantic_config.get("max_topics", 100)
+            )
+        except ImportError:
+            logger.warning("NumPy não disponível; completude semântica usa a sobreposição de termos")
+            self.vectorizer = None
+            self.references = None
+        
+        # Avaliadores em ordem de custo medido (mais baratos primeiro), reordenados
+        # a cada atualização das estimativas; com prazo, os que não cabem no
+        # tempo restante ficam de fora do resultado.
+        # Custo de cada um em ms por 1000 caracteres: média e desvio suavizados,
+        # como na estimativa de RTT do TCP
+        self.scorer_timings = {}
+        self._timings_lock = threading.Lock()
+        self._scorer_calls = 0
+        self._scorers = (
+            ("clarity_score", lambda response, context: self.assess_clarity(response)),
+            ("completeness", self.assess_completeness),
+            ("educational_quality", lambda response, context: self.assess_educational_quality(response)),
+            ("semantic_completeness", self.assess_semantic_completeness)
+        )
+        self.calibrate_scorers()
+        
+        # Avaliação incremental de respostas em streaming
+        self.stream_sessions = ScoringSessions(
+            max_sessions=memo_config.get("stream_sessions", 256),
+            ttl=memo_config.get("stream_session_ttl", 600)
+        )
+        
+    def memo_key(self, response: str, context: Dict) -> bytes:
+        """Hash de (resposta, pergunta, crew, tópico e versão das referências do tópico)"""
+        topic = context.get('topic')
+        version = self.references.version(topic) if self.references is not None else 0
+        payload = json.dumps(
+            [response, context.get('query', ''), context.get('crew', ''), topic, version],
+            ensure_ascii=False
+        )
+        return hashlib.blake2b(payload.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    
+    def add_references(self, topic: str, answers: List) -> int:
+        """
+        Adiciona respostas de referência ao tópico
+        Cada item é um texto ou {"id": ..., "text": ...}; sem id, o id é o hash do texto
+        """
+        if self.references is None:
+            raise RuntimeError("Completude semântica indisponível (NumPy não instalado)")
+        added = 0
+        for answer in answers:
+            if isinstance(answer, dict):
+                text, reference_id = answer.get('text', ''), answer.get('id')
+            else:
+                text, reference_id = answer, None
+            if not text:
+                continue
+            if reference_id is None:
+                reference_id = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=8).hexdigest()
+            self.references.add(topic, str(reference_id), self.vectorizer.vector(self.core.tokenize(text).terms))
+            added += 1
+        return added
+    
+    def remove_references(self, topic: str) -> bool:
+        return self.references.remove_topic(topic) if self.references is not None else False
+    
+    def semantic_stats(self) -> Dict:
+        if self.vectorizer is None:
+            return {"enabled": False}
+        return {"vectorizer": self.vectorizer.stats(), "references": self.references.stats()}
+    
+    def _memo_get(self, key: bytes, response: str) -> Optional[Dict]:
+        cached = self.memo.get(key)
+        if cached is None:
+            return None
+        return {"original_response": response, **cached, "suggestions": list(cached["suggestions"])}
+    
+    def _memo_put(self, key: bytes, analysis: Dict):
+        if "error" not in analysis:
+            cached = {k: v for k, v in analysis.items() if k not in self.UNCACHED_KEYS}
+            cached["suggestions"] = tuple(cached["suggestions"])
+            self.memo.put(key, cached)
+    
+    def start_stream(self, context: Dict) -> ResponseStreamScorer:
+        """Abre uma sessão de avaliação incremental para uma resposta em streaming"""
+        return self.stream_sessions.create(self, context)
+    
+    def stream_session(self, session_id: str) -> Optional[ResponseStreamScorer]:
+        return self.stream_sessions.get(session_id)
+    
+    def finish_stream(self, scorer: ResponseStreamScorer, delta: str = "") -> Dict:
+        """Finaliza a sessão; a análise final também entra no memo"""
+        try:
+            analysis = scorer.finish(delta)
+        finally:
+            self.stream_sessions.remove(scorer.session_id)
+        if self.memo is not None:
+            self._memo_put(self.memo_key(analysis["original_response"], scorer.context), analysis)
+        return analysis
+    
+    def memo_stats(self) -> Dict:
+        return self.memo.stats() if self.memo is not None else {"enabled": False}
+    
+    def enhance_response_quality(self, response: str, context: Dict, deadline_ms: Optional[float] = None) -> Dict:
         """
         Melhora qualidade das respostas usando técnicas de ML
         - Análise de sentimento
         - Verificação de coerência
         - Sugestões de melhorias
         - Detecção de lacunas
+        Resultados memoizados por (resposta, pergunta, crew)
+        Com deadline_ms, os avaliadores rodam em ordem de custo e só começam se
+        o custo estimado couber no tempo restante; os demais ficam como None e
+        o resultado traz "partial", "skipped" e "timings_ms"
         """
+        key = self.memo_key(response, context) if self.memo is not None else None
+        analysis = self._memo_get(key, response) if key is not None else None
+        if analysis is None:
+            analysis = self._enhance_response_quality(response, context, deadline_ms)
+            if key is not None and not analysis.get("partial"):
+                self._memo_put(key, analysis)
+        elif deadline_ms is not None:
+            analysis.update(partial=False, skipped=[], timings_ms={})
+        return analysis
+    
+    def _enhance_response_quality(self, response: str, context: Dict, deadline_ms: Optional[float] = None) -> Dict:
         try:
-            analysis = {
-                "original_response": response,
-                "length": len(response),
-                "word_count": len(response.split()),
-                "educational_quality": self.assess_educational_quality(response),
-                "clarity_score": self.assess_clarity(response),
-                "completeness": self.assess_completeness(response, context),
-                "suggestions": []
-            }
+            start = time.perf_counter()
+            deadline = start + deadline_ms / 1000 if deadline_ms is not None else None
             
-            # Gerar sugestões de melhoria
-            if analysis["clarity_score"] < 0.7:
-                analysis["suggestions"].append("Considere simplificar a linguagem")
-                
-            if analysis["word_count"] < 50:
-                analysis["suggestions"].append("Resposta muito curta, adicione mais detalhes")
-                
-            if analysis["educational_quality"] < 0.6:
-                analysis["suggestions"].append("Adicione mais exemplos práticos")
-                
+            # Tokenizado uma vez; os avaliadores reutilizam o resultado do memo
+            tokens = self.core.tokenize(response)
+            timings = {"tokenize": round((time.perf_counter() - start) * 1000, 3)}
+            
+            # Sem prazo, os tempos são amostrados (1 a cada 16 chamadas) para
+            # manter as estimativas atualizadas sem custo em toda chamada
+            self._scorer_calls += 1
+            if deadline is None and self._scorer_calls % 16:
+                scores = {name: scorer(response, context) for name, scorer in self._scorers}
+                skipped = []
+            else:
+                scores, skipped = self._run_scorers(response, context, deadline, timings)
+            
+            analysis = {"original_response": response, **self._quality_analysis(
+                length=len(response),
+                word_count=tokens.word_count,
+                **{name: scores.get(name) for name, _ in self._scorers}
+            )}
+            if deadline is not None:
+                analysis.update(partial=bool(skipped), skipped=skipped, timings_ms=timings)
             return analysis
             
         except Exception as e:
             return {"error": f"Erro na análise de qualidade: {e}"}
     
-    def assess_educational_quality(self, response: str) -> float:
-        """Avalia qualidade educacional da resposta"""
-        quality_indicators = [
-            "exemplo", "por exemplo", "imagine que", "considere",
-            "passo a passo", "primeiro", "segundo", "finalmente",
-            "importante", "lembre-se", "note que", "observe",
-            "prática", "exercício", "atividade", "aplicação"
-        ]
+    def _run_scorers(self, response: str, context: Dict, deadline: Optional[float], timings: Dict):
+        """Executa os avaliadores em ordem de custo, medindo cada um e respeitando o prazo"""
+        # Custo proporcional ao tamanho; abaixo de 1000 caracteres domina o custo fixo
+        size = max(len(response), 1000) / 1000
+        scores, skipped = {}, []
+        for name, scorer in self._scorers:
+            if deadline is not None and not self._scorer_fits(name, size, deadline - time.perf_counter()):
+                skipped.append(name)
+                continue
+            scorer_start = time.perf_counter()
+            scores[name] = scorer(response, context)
+            elapsed = time.perf_counter() - scorer_start
+            self._record_timing(name, elapsed, size)
+            timings[name] = round(elapsed * 1000, 3)
+        return scores, skipped
+    
+    def _record_timing(self, name: str, seconds: float, size: float):
+        cost = seconds * 1000 / size
+        with self._timings_lock:
+            stats = self.scorer_timings.get(name)
+            if stats is None:
+                self.scorer_timings[name] = {"calls": 1, "skipped": 0, "avg": cost, "dev": cost / 2, "max_ms": seconds * 1000}
+            else:
+                stats["calls"] += 1
+                stats["dev"] = 0.75 * stats["dev"] + 0.25 * abs(cost - stats["avg"])
+                stats["avg"] = 0.875 * stats["avg"] + 0.125 * cost
+                stats["max_ms"] = max(stats["max_ms"], seconds * 1000)
+            self._sort_scorers()
+    
+    def _sort_scorers(self):
+        """Reordena os avaliadores pela estimativa de custo (chamar com o lock; não medidos por último)"""
+        def estimate(entry):
+            stats = self.scorer_timings.get(entry[0])
+            return stats["avg"] + 4 * stats["dev"] if stats is not None else float("inf")
+        self._scorers = tuple(sorted(self._scorers, key=estimate))
+    
+    def calibrate_scorers(self, rounds: int = 2):
+        """
+        Mede cada avaliador com CALIBRATION_RESPONSE para que a primeira chamada
+        com prazo já tenha estimativa de custo (chamado no __init__; chame de
+        novo ao trocar os avaliadores). Só a última rodada é registrada: as
+        anteriores aquecem imports e caches
+        """
+        response, context = self.CALIBRATION_RESPONSE, self.CALIBRATION_CONTEXT
+        size = max(len(response), 1000) / 1000
+        for name, scorer in self._scorers:
+            for _ in range(max(rounds, 1)):
+                start = time.perf_counter()
+                scorer(response, context)
+                elapsed = time.perf_counter() - start
+            with self._timings_lock:
+                self.scorer_timings.pop(name, None)
+            self._record_timing(name, elapsed, size)
+    
+    def _scorer_fits(self, name: str, size: float, remaining: float) -> bool:
+        """
+        O avaliador só começa se a estimativa (média + 4 desvios) couber no tempo restante
+        Sem estimativa (avaliador ainda não medido, ver calibrate_scorers) ele não cabe
+        A cada vez que é pulado o desvio diminui: se a média cabe no prazo, ele volta a ser
+        medido; sem prazo, as chamadas amostradas também atualizam a estimativa
+        """
+        with self._timings_lock:
+            stats = self.scorer_timings.get(name)
+            if stats is None:
+                return False
+            if remaining > 0 and (stats["avg"] + 4 * stats["dev"]) * size <= remaining * 1000:
+                return True
+            stats["skipped"] += 1
+            stats["dev"] *= 0.75
+            return False
+    
+    def scorer_stats(self) -> Dict:
+        """Estimativas por avaliador, na ordem em que rodam"""
+        with self._timings_lock:
+            return {
+                name: {
+                    "calls": stats["calls"],
+                    "skipped": stats["skipped"],
+                    "avg_ms_per_kchar": round(stats["avg"], 4),
+                    "estimate_ms_per_kchar": round(stats["avg"] + 4 * stats["dev"], 4),
+                    "max_ms": round(stats["max_ms"], 3)
+                }
+                for name, stats in (
+                    (name, self.scorer_timings[name]) for name, _ in self._scorers if name in self.scorer_timings
+                )
+            }
+    
+    def enhance_batch(self, responses: List[str], context: Dict) -> List[Dict]:
+        """
+        Avalia N respostas com o mesmo contexto em uma chamada
+        - Indicadores e marcadores: uma varredura sobre o lote inteiro (matriz NumPy)
+        - Estatísticas de sentenças e palavras em arrays
+        - Pergunta tokenizada uma única vez
+        Cada item é idêntico ao de enhance_response_quality para a mesma resposta;
+        respostas já memoizadas não são reavaliadas
+        """
+        if self.memo is None:
+            return self._enhance_batch(responses, context)
+        
+        keys = [self.memo_key(response, context) for response in responses]
+        results = [self._memo_get(key, response) for key, response in zip(keys, responses)]
+        pending = [i for i, result in enumerate(results) if result is None]
         
-        response_lower = response.lower()
-        found_indicators = sum(1 for indicator in quality_indicators if indicator in response_lower)
+        if pending:
+            scored = self._enhance_batch([responses[i] for i in pending], context)
+            for i, analysis in zip(pending, scored):
+                self._memo_put(keys[i], analysis)
+                results[i] = analysis
+        return results
+    
+    def _enhance_batch(self, responses: List[str], context: Dict) -> List[Dict]:
+        try:
+            import numpy as np
+        except ImportError:
+            return [self._enhance_response_quality(response, context) for response in responses]
         
+        try:
+            tokens = [self.core.tokenize(response) for response in responses]
+            presence = self.PHRASES.presence([t.folded for t in tokens])
+            word_counts = np.array([t.word_count for t in tokens], dtype=np.int64)
+            
+            # Qualidade educacional
+            quality_columns = [self.PHRASES.columns[i] for i in self.QUALITY_INDICATORS]
+            found_indicators = presence[:, quality_columns].sum(axis=1)
+            max_possible = np.minimum(len(self.QUALITY_INDICATORS), word_counts // 10)
+            educational = np.minimum(found_indicators / np.maximum(max_possible, 1), 1.0)
+            
+            # Clareza (text.split('.') sempre tem ao menos um trecho)
+            sentence_words = np.array([sum(t.sentence_lengths) for t in tokens], dtype=np.int64)
+            sentence_counts = np.array([len(t.sentence_lengths) for t in tokens], dtype=np.int64)
+            avg_sentence_length = sentence_words / sentence_counts
+            clarity = np.where(avg_sentence_length > 30, 0.3, np.where(avg_sentence_length < 5, 0.4, 0.8))
+            structured = presence[:, [self.PHRASES.columns[m] for m in self.STRUCTURE_MARKERS]].any(axis=1)
+            clarity = np.minimum(np.where(structured, clarity + 0.2, clarity), 1.0)
+            
+            query_tokens = self.core.tokenize(context.get('query', ''))
+            crew = context.get('crew', '')
+            completeness = [self._completeness(query_tokens, t, crew) for t in tokens]
+            semantic = self._batch_semantic_completeness(query_tokens, tokens, context.get('topic'), completeness)
+            
+            return [
+                {"original_response": response, **self._quality_analysis(
+                    length=len(response),
+                    word_count=response_tokens.word_count,
+                    educational_quality=float(educational[i]),
+                    clarity_score=float(clarity[i]),
+                    completeness=completeness[i],
+                    semantic_completeness=semantic[i]
+                )}
+                for i, (response, response_tokens) in enumerate(zip(responses, tokens))
+            ]
+            
+        except Exception as e:
+            return [{"error": f"Erro na análise de qualidade: {e}"} for _ in responses]
+    
+    @staticmethod
+    def _quality_analysis(length: int, word_count: int, educational_quality: Optional[float],
+                          clarity_score: Optional[float], completeness: Optional[float],
+                          semantic_completeness: Optional[float]) -> Dict:
+        """Monta a análise (sem a resposta original) e as sugestões a partir dos scores"""
+        analysis = {
+            "length": length,
+            "word_count": word_count,
+            "educational_quality": educational_quality,
+            "clarity_score": clarity_score,
+            "completeness": completeness,
+            "semantic_completeness": semantic_completeness,
+            "suggestions": []
+        }
+        
+        # Gerar sugestões de melhoria (scores não calculados dentro do prazo são None)
+        if clarity_score is not None and clarity_score < 0.7:
+            analysis["suggestions"].append("Considere simplificar a linguagem")
+            
+        if analysis["word_count"] < 50:
+            analysis["suggestions"].append("Resposta muito curta, adicione mais detalhes")
+            
+        if educational_quality is not None and educational_quality < 0.6:
+            analysis["suggestions"].append("Adicione mais exemplos práticos")
+            
+        return analysis
+    
+    def assess_educational_quality(self, response: str) -> float:
+        """Avalia qualidade educacional da resposta"""
+        tokens = self.core.tokenize(response)
+        found_indicators = sum(1 for indicator in self.QUALITY_INDICATORS if indicator in tokens.folded)
+        return self.educational_score(found_indicators, tokens.word_count)
+    
+    @classmethod
+    def educational_score(cls, found_indicators: int, word_count: int) -> float:
         # Normalizar score (0-1)
-        max_possible = min(len(quality_indicators), len(response.split()) // 10)
+        max_possible = min(len(cls.QUALITY_INDICATORS), word_count // 10)
         return min(found_indicators / max(max_possible, 1), 1.0)
     
     def assess_clarity(self, response: str) -> float:
         """Avalia clareza da resposta"""
-        sentences = response.split('.')
-        if not sentences:
+        tokens = self.core.tokenize(response)
+        sentence_lengths = tokens.sentence_lengths
+        if not sentence_lengths:
             return 0.0
-            
+        structured = any(marker in tokens.folded for marker in self.STRUCTURE_MARKERS)
+        return self.clarity_score(sum(sentence_lengths), len(sentence_lengths), structured)
+    
+    @staticmethod
+    def clarity_score(sentence_words: int, sentences: int, structured: bool) -> float:
         # Calcular comprimento médio das sentenças
-        avg_sentence_length = sum(len(s.split()) for s in sentences) / len(sentences)
+        avg_sentence_length = sentence_words / sentences
         
         # Penalizar sentenças muito longas ou muito curtas
         if avg_sentence_length > 30:
@@ -508,28 +1822,81 @@ class DarcyMLEnhancer:
             clarity = 0.8  # Bom tamanho
         
         # Bonus por estrutura organizada
-        if any(marker in response.lower() for marker in ["primeiro", "segundo", "além disso", "portanto"]):
+        if structured:
             clarity += 0.2
             
         return min(clarity, 1.0)
     
     def assess_completeness(self, response: str, context: Dict) -> float:
         """Avalia completude da resposta baseada no contexto"""
-        query = context.get('query', '').lower()
-        crew = context.get('crew', '')
+        return self._completeness(
+            self.core.tokenize(context.get('query', '')),
+            self.core.tokenize(response),
+            context.get('crew', '')
+        )
+    
+    def assess_semantic_completeness(self, response: str, context: Dict) -> float:
+        """
+        Completude semântica: cobertura dos n-gramas de caracteres da pergunta
+        pela resposta e, havendo referências do tópico (context['topic']),
+        similaridade com a referência mais próxima
+        Sem NumPy, igual à completude por sobreposição de termos
+        """
+        if self.vectorizer is None:
+            return self.assess_completeness(response, context)
+        query_tokens = self.core.tokenize(context.get('query', ''))
+        response_counts = self.vectorizer.counts(self.core.tokenize(response).terms)
+        coverage = self.vectorizer.coverage(self.vectorizer.counts(query_tokens.terms), response_counts)
+        return self._semantic_score(coverage, response_counts, context.get('topic'))
+    
+    def _semantic_score(self, coverage: float, response_counts, topic: Optional[str]) -> float:
+        from darcy_semantic import semantic_completeness
         
-        # Verificar se a resposta aborda a pergunta
-        query_words = set(query.split())
-        response_words = set(response.lower().split())
+        reference_similarity = None
+        if self.references.has_topic(topic):
+            nearest = self.references.nearest(topic, self.vectorizer.weigh(response_counts))
+            if nearest:
+                reference_similarity = nearest[0][1]
+        return semantic_completeness(coverage, reference_similarity)
+    
+    def _batch_semantic_completeness(self, query_tokens: TokenizedText, tokens: List[TokenizedText],
+                                     topic: Optional[str], completeness: List[float]) -> List[float]:
+        """Cobertura da pergunta calculada para o lote inteiro em uma matriz (respostas x baldes)"""
+        if self.vectorizer is None:
+            return list(completeness)
+        import numpy as np
         
+        query_buckets = self.vectorizer.counts(query_tokens.terms) > 0
+        counts = np.stack([self.vectorizer.counts(t.terms) for t in tokens])
+        total = int(query_buckets.sum())
+        covered = ((counts > 0) & query_buckets).sum(axis=1)
+        return [
+            self._semantic_score(int(covered[i]) / total if total else 0.0, counts[i], topic)
+            for i in range(len(tokens))
+        ]
+    
+    @staticmethod
+    def _completeness(query_tokens: TokenizedText, response_tokens: TokenizedText, crew: str) -> float:
+        # Verificar se a resposta aborda a pergunta (termos de conteúdo, sem
+        # stopwords, pontuação ou diferença de acentos)
+        query_terms = query_tokens.term_set
+        return DarcyMLEnhancer.completeness_score(
+            overlap=len(query_terms & response_tokens.term_set),
+            query_terms=len(query_terms),
+            word_count=response_tokens.word_count,
+            has_exercise='exercicio' in response_tokens.folded,
+            crew=crew
+        )
+    
+    @staticmethod
+    def completeness_score(overlap: int, query_terms: int, word_count: int, has_exercise: bool, crew: str) -> float:
         # Calcular sobreposição semântica básica
-        overlap = len(query_words.intersection(response_words))
-        completeness = overlap / max(len(query_words), 1)
+        completeness = overlap / max(query_terms, 1)
         
         # Ajustar baseado no tipo de crew
-        if crew == 'teaching' and len(response.split()) < 100:
+        if crew == 'teaching' and word_count < 100:
             completeness *= 0.7  # Ensino precisa de mais detalhes
-        elif crew == 'assessment' and 'exercício' not in response.lower():
+        elif crew == 'assessment' and not has_exercise:
             completeness *= 0.8  # Avaliação deveria ter exercícios
             
         return min(completeness, 1.0)
@@ -612,24 +1979,24 @@ class DarcyWebScraper:
             search_url = "https://pt.wikipedia.org/api/rest_v1/page/summary/"
             search_query = query.replace(' ', '_')
             
-            async with self.core.session.get(f"{search_url}{search_query}") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    return {
-                        'source': 'Wikipedia',
-                        'results': [{
-                            'title': data.get('title', query),
-                            'snippet': data.get('extract', 'Conteúdo não disponível'),
-                            'url': data.get('content_urls', {}).get('desktop', {}).get('page', ''),
-                            'educational_score': 0.9,  # Wikipedia é confiável
-                            'content_type': 'encyclopedia',
-                            'language': 'pt'
-                        }]
-                    }
-                else:
-                    # Tentar busca por termos relacionados
-                    return await self._wikipedia_search_fallback(query)
+            response = await self.core.fetch_json(f"{search_url}{search_query}", source="wikipedia_summary")
+            if response.status == 200:
+                data = response.data
+                
+                return {
+                    'source': 'Wikipedia',
+                    'results': [{
+                        'title': data.get('title', query),
+                        'snippet': data.get('extract', 'Conteúdo não disponível'),
+                        'url': data.get('content_urls', {}).get('desktop', {}).get('page', ''),
+                        'educational_score': 0.9,  # Wikipedia é confiável
+                        'content_type': 'encyclopedia',
+                        'language': 'pt'
+                    }]
+                }
+            else:
+                # Tentar busca por termos relacionados
+                return await self._wikipedia_search_fallback(query)
                     
         except Exception as e:
             logger.error(f"Erro na busca Wikipedia: {e}")
@@ -646,24 +2013,24 @@ class DarcyWebScraper:
                 'format': 'json'
             }
             
-            async with self.core.session.get(search_url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    titles, descriptions, urls = data[1], data[2], data[3]
-                    
-                    results = []
-                    for i, title in enumerate(titles):
-                        if i < len(descriptions) and i < len(urls):
-                            results.append({
-                                'title': title,
-                                'snippet': descriptions[i] or 'Resumo não disponível',
-                                'url': urls[i],
-                                'educational_score': 0.8,
-                                'content_type': 'encyclopedia',
-                                'language': 'pt'
-                            })
-                    
-                    return {'source': 'Wikipedia', 'results': results}
+            response = await self.core.fetch_json(search_url, params=params, source="wikipedia_search")
+            if response.status == 200:
+                data = response.data
+                titles, descriptions, urls = data[1], data[2], data[3]
+                
+                results = []
+                for i, title in enumerate(titles):
+                    if i < len(descriptions) and i < len(urls):
+                        results.append({
+                            'title': title,
+                            'snippet': descriptions[i] or 'Resumo não disponível',
+                            'url': urls[i],
+                            'educational_score': 0.8,
+                            'content_type': 'encyclopedia',
+                            'language': 'pt'
+                        })
+                
+                return {'source': 'Wikipedia', 'results': results}
                     
         except Exception as e:
             logger.error(f"Erro na busca alternativa Wikipedia: {e}")
@@ -717,9 +2084,10 @@ class DarcyWebScraper:
         """Busca especializada em matemática"""
         try:
             # Verificar se é consulta matemática
-            math_keywords = ['matemática', 'equação', 'função', 'derivada', 'integral', 'álgebra', 'geometria']
+            math_keywords = ['matematica', 'equacao', 'funcao', 'derivada', 'integral', 'algebra', 'geometria']
             
-            if any(keyword in query.lower() for keyword in math_keywords):
+            folded_query = self.core.tokenize(query).folded
+            if any(keyword in folded_query for keyword in math_keywords):
                 # Link direto para Só Matemática
                 search_url = f"https://www.somatematica.com.br/busca.php?busca={query.replace(' ', '+')}"
                 
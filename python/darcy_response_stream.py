@@ -0,0 +1,200 @@
+# Darcy AI - Avaliação Incremental de Respostas
+# Scores provisórios de respostas de LLM em streaming, atualizados a cada trecho recebido
+
+import uuid
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from darcy_cache import LRUCache
+from darcy_tokenizer import TERM_PATTERN, normalize_text
+
+def _split_with_carry(carry: str, chunk: str) -> Tuple[List[str], str]:
+    """Palavras completas de carry + chunk (semântica de str.split) e a palavra ainda aberta"""
+    text = carry + chunk
+    words = text.split()
+    if words and not text[-1].isspace():
+        return words, words.pop()
+    return words, ""
+
+class ResponseStreamScorer:
+    """
+    Avaliação de uma resposta recebida em trechos (deltas)
+    - Cada delta atualiza contagens em O(tamanho do delta): palavras, palavras
+      por sentença, pontos, indicadores e marcadores encontrados, termos da
+      pergunta cobertos e baldes de n-gramas da completude semântica
+    - Palavras, termos e expressões que atravessam a fronteira entre deltas
+      são tratados (palavra aberta e janela com o fim do texto anterior)
+    - scores() a qualquer momento equivale a enhance_response_quality sobre o
+      texto recebido até ali (sem "original_response")
+    """
+
+    def __init__(self, enhancer, context: Optional[Dict] = None):
+        self.enhancer = enhancer
+        self.context = dict(context or {})
+        self.crew = self.context.get('crew', '')
+        self.topic = self.context.get('topic')
+        self.session_id = uuid.uuid4().hex
+        self.finished = False
+
+        tokenizer = enhancer.core.tokenizer
+        self.stopwords = tokenizer.stopwords
+        query_tokens = tokenizer.tokenize(self.context.get('query', ''))
+        self.query_terms = query_tokens.term_set
+        self.matched_terms = set()
+
+        self.phrases = enhancer.PHRASES.phrases
+        self.found_phrases = set()
+        self._phrase_tail = ""
+        self._tail_size = max(len(phrase) for phrase in self.phrases) - 1
+
+        self.chunks = []
+        self.chars = 0
+        self.words = 0
+        self.sentence_words = 0  # palavras somadas por trecho de text.split('.')
+        self.dots = 0
+        self._word_carry = ""
+        self._sentence_carry = ""
+        self._term_carry = ""
+
+        self.vectorizer = enhancer.vectorizer
+        if self.vectorizer is not None:
+            import numpy as np
+            self.bucket_counts = np.zeros(self.vectorizer.dimensions, dtype=np.int64)
+            self.query_buckets = self.vectorizer.counts(query_tokens.terms) > 0
+
+        self.deltas = 0
+        self._lock = threading.Lock()
+
+    def feed(self, delta: str) -> 'ResponseStreamScorer':
+        with self._lock:
+            if self.finished:
+                raise RuntimeError("Sessão de avaliação já finalizada")
+            if delta:
+                self._feed(delta)
+        return self
+
+    def _feed(self, delta: str):
+        self.deltas += 1
+        self.chunks.append(delta)
+        self.chars += len(delta)
+        self.dots += delta.count('.')
+
+        words, self._word_carry = _split_with_carry(self._word_carry, delta)
+        self.words += len(words)
+        sentence_words, self._sentence_carry = _split_with_carry(self._sentence_carry, delta.replace('.', ' '))
+        self.sentence_words += len(sentence_words)
+
+        folded = normalize_text(delta)
+        window = self._phrase_tail + folded
+        for phrase in self.phrases:
+            if phrase not in self.found_phrases and phrase in window:
+                self.found_phrases.add(phrase)
+        self._phrase_tail = window[-self._tail_size:] if self._tail_size else ""
+
+        # Termo que toca o fim do texto pode continuar no próximo delta
+        text = self._term_carry + folded
+        matches = list(TERM_PATTERN.finditer(text))
+        if matches and matches[-1].end() == len(text):
+            self._term_carry = matches.pop().group()
+        else:
+            self._term_carry = ""
+        self._add_terms([match.group() for match in matches])
+
+    def _add_terms(self, terms: List[str]):
+        terms = [term for term in terms if term not in self.stopwords]
+        self.matched_terms.update(term for term in terms if term in self.query_terms)
+        if self.vectorizer is not None and terms:
+            import numpy as np
+            np.add.at(self.bucket_counts, np.concatenate([self.vectorizer.term_buckets(t) for t in terms]), 1)
+
+    def _pending_term(self) -> List[str]:
+        carry = self._term_carry
+        return [carry] if carry and carry not in self.stopwords else []
+
+    def scores(self) -> Dict:
+        """Scores provisórios do texto recebido até agora"""
+        with self._lock:
+            return self._analysis()
+
+    def _analysis(self) -> Dict:
+        enhancer = self.enhancer
+        pending = self._pending_term()
+        word_count = self.words + (1 if self._word_carry else 0)
+        sentence_words = self.sentence_words + (1 if self._sentence_carry else 0)
+        found = self.found_phrases
+
+        educational = enhancer.educational_score(
+            sum(1 for indicator in enhancer.QUALITY_INDICATORS if indicator in found), word_count
+        )
+        clarity = enhancer.clarity_score(
+            sentence_words, self.dots + 1, any(marker in found for marker in enhancer.STRUCTURE_MARKERS)
+        )
+        completeness = enhancer.completeness_score(
+            overlap=len(self.matched_terms | (set(pending) & self.query_terms)),
+            query_terms=len(self.query_terms),
+            word_count=word_count,
+            has_exercise='exercicio' in found,
+            crew=self.crew
+        )
+        if self.vectorizer is None:
+            semantic = completeness
+        else:
+            counts = self.bucket_counts
+            if pending:
+                counts = counts.copy()
+                import numpy as np
+                np.add.at(counts, self.vectorizer.term_buckets(pending[0]), 1)
+            total = int(self.query_buckets.sum())
+            coverage = int((self.query_buckets & (counts > 0)).sum()) / total if total else 0.0
+            semantic = enhancer._semantic_score(coverage, counts, self.topic)
+
+        return enhancer._quality_analysis(
+            length=self.chars,
+            word_count=word_count,
+            educational_quality=educational,
+            clarity_score=clarity,
+            completeness=completeness,
+            semantic_completeness=semantic
+        )
+
+    def finish(self, delta: str = "") -> Dict:
+        """Último delta (opcional); retorna a análise final, igual a enhance_response_quality"""
+        with self._lock:
+            if self.finished:
+                raise RuntimeError("Sessão de avaliação já finalizada")
+            if delta:
+                self._feed(delta)
+            self.finished = True
+            response = "".join(self.chunks)
+            return {"original_response": response, **self._analysis()}
+
+    def status(self) -> Dict:
+        return {
+            "session_id": self.session_id,
+            "deltas": self.deltas,
+            "chars": self.chars,
+            "finished": self.finished
+        }
+
+class ScoringSessions:
+    """Sessões de avaliação incremental em memória (LRU com expiração por inatividade)"""
+
+    def __init__(self, max_sessions: int = 256, ttl: Optional[float] = 600):
+        self._sessions = LRUCache(max_sessions, ttl=ttl)
+
+    def create(self, enhancer, context: Optional[Dict] = None) -> ResponseStreamScorer:
+        scorer = ResponseStreamScorer(enhancer, context)
+        self._sessions.put(scorer.session_id, scorer)
+        return scorer
+
+    def get(self, session_id: str) -> Optional[ResponseStreamScorer]:
+        scorer = self._sessions.get(session_id)
+        if scorer is not None:
+            self._sessions.put(session_id, scorer)  # renova o prazo de inatividade
+        return scorer
+
+    def remove(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id) is not None
+
+    def stats(self) -> Dict:
+        return self._sessions.stats()
@@ -0,0 +1,169 @@
+# Darcy AI - Similaridade Semântica
+# Vetores de n-gramas de caracteres com hashing (NumPy, CPU, offline) e índice de respostas de referência
+
+import zlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from darcy_cache import LRUCache
+
+class HashedNgramVectorizer:
+    """
+    Vetorizador de n-gramas de caracteres sem vocabulário (hashing trick)
+    - Entrada: termos de conteúdo já normalizados (TokenizedText.terms), então
+      acentos, caixa e stopwords seguem o tokenizador compartilhado
+    - Cada termo vira n-gramas de " termo " (ngram_min..ngram_max caracteres),
+      o que aproxima variações ("derivada", "derivadas", "derivação")
+    - Os baldes de cada termo ficam em um cache LRU: o custo por resposta é
+      um bincount sobre índices já calculados
+    """
+
+    def __init__(self, dimensions: int = 2048, ngram_min: int = 3, ngram_max: int = 5,
+                 term_cache_entries: int = 50_000):
+        self.dimensions = dimensions
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+        self.term_cache = LRUCache(term_cache_entries)
+
+    def term_buckets(self, term: str) -> np.ndarray:
+        buckets = self.term_cache.get(term)
+        if buckets is None:
+            padded = f" {term} ".encode("utf-8")
+            buckets = np.array([
+                zlib.crc32(padded[start:start + size]) % self.dimensions
+                for size in range(self.ngram_min, self.ngram_max + 1)
+                for start in range(max(len(padded) - size + 1, 0))
+            ], dtype=np.int32)
+            self.term_cache.put(term, buckets)
+        return buckets
+
+    def counts(self, terms: Iterable[str]) -> np.ndarray:
+        """Contagem de n-gramas por balde (vetor de tamanho `dimensions`)"""
+        buckets = [self.term_buckets(term) for term in terms]
+        if not buckets:
+            return np.zeros(self.dimensions, dtype=np.int64)
+        return np.bincount(np.concatenate(buckets), minlength=self.dimensions)
+
+    @staticmethod
+    def weigh(counts: np.ndarray) -> np.ndarray:
+        """TF sublinear normalizado (norma L2), em float32"""
+        vector = np.log1p(counts.astype(np.float32))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def vector(self, terms: Iterable[str]) -> np.ndarray:
+        return self.weigh(self.counts(terms))
+
+    @staticmethod
+    def coverage(query_counts: np.ndarray, response_counts: np.ndarray) -> float:
+        """Fração dos baldes da pergunta presentes na resposta"""
+        query_buckets = query_counts > 0
+        total = int(query_buckets.sum())
+        if not total:
+            return 0.0
+        return int((query_buckets & (response_counts > 0)).sum()) / total
+
+    def stats(self) -> Dict:
+        return {
+            "dimensions": self.dimensions,
+            "ngram_range": [self.ngram_min, self.ngram_max],
+            "term_cache": self.term_cache.stats()
+        }
+
+class ReferenceIndex:
+    """
+    Índice em memória de respostas de referência por tópico
+    - Vetores de cada tópico empilhados em uma matriz float32; a busca do
+      vizinho mais próximo é um produto matriz-vetor (cosseno, vetores normalizados)
+    - Limites: max_per_topic referências (as mais antigas saem primeiro) e
+      max_topics tópicos (o menos usado sai primeiro)
+    """
+
+    def __init__(self, vectorizer: HashedNgramVectorizer, max_per_topic: int = 100, max_topics: int = 100):
+        self.vectorizer = vectorizer
+        self.max_per_topic = max(1, max_per_topic)
+        self.max_topics = max(1, max_topics)
+        self._topics = OrderedDict()  # tópico -> {"ids": [...], "matrix": ndarray, "version": int}
+        self._lock = threading.Lock()
+        self._version = 0
+
+    def add(self, topic: str, reference_id: str, vector: np.ndarray):
+        with self._lock:
+            entry = self._topics.get(topic)
+            if entry is None:
+                entry = {"ids": [], "matrix": np.empty((0, self.vectorizer.dimensions), dtype=np.float32)}
+                self._topics[topic] = entry
+            self._topics.move_to_end(topic)
+
+            ids = list(entry["ids"])
+            matrix = entry["matrix"]
+            if reference_id in ids:
+                row = ids.index(reference_id)
+                ids.pop(row)
+                matrix = np.delete(matrix, row, axis=0)
+            ids.append(reference_id)
+            matrix = np.vstack([matrix, vector[np.newaxis, :]])
+
+            # Lista e matriz substituídas (não alteradas no lugar): buscas em
+            # andamento continuam com a versão anterior sem precisar do lock
+            overflow = len(ids) - self.max_per_topic
+            if overflow > 0:
+                del ids[:overflow]
+                matrix = matrix[overflow:]
+            entry["ids"], entry["matrix"] = ids, matrix
+            self._version += 1
+            entry["version"] = self._version
+
+            while len(self._topics) > self.max_topics:
+                self._topics.popitem(last=False)
+
+    def nearest(self, topic: str, vector: np.ndarray, k: int = 1) -> List[Tuple[str, float]]:
+        """Até k referências mais próximas do tópico como (id, similaridade)"""
+        with self._lock:
+            entry = self._topics.get(topic)
+            if entry is None:
+                return []
+            self._topics.move_to_end(topic)
+            ids, matrix = entry["ids"], entry["matrix"]
+
+        if not ids:
+            return []
+        scores = matrix @ vector
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [(ids[i], float(scores[i])) for i in order]
+
+    def remove_topic(self, topic: str) -> bool:
+        with self._lock:
+            return self._topics.pop(topic, None) is not None
+
+    def has_topic(self, topic: Optional[str]) -> bool:
+        return bool(topic) and topic in self._topics
+
+    def version(self, topic: Optional[str]) -> int:
+        """Versão das referências do tópico (muda a cada alteração; 0 = sem referências)"""
+        entry = self._topics.get(topic) if topic else None
+        return entry["version"] if entry else 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            references = sum(len(entry["ids"]) for entry in self._topics.values())
+            return {
+                "topics": len(self._topics),
+                "references": references,
+                "max_topics": self.max_topics,
+                "max_per_topic": self.max_per_topic,
+                "memory_bytes": sum(entry["matrix"].nbytes for entry in self._topics.values())
+            }
+
+def semantic_completeness(coverage: float, reference_similarity: Optional[float]) -> float:
+    """
+    Completude semântica (0-1)
+    - Sem referências do tópico: cobertura dos n-gramas da pergunta pela resposta
+    - Com referências: média entre a cobertura e a similaridade com a melhor referência
+    """
+    if reference_similarity is None:
+        return min(coverage, 1.0)
+    return min((coverage + max(reference_similarity, 0.0)) / 2, 1.0)
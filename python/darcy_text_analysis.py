@@ -0,0 +1,248 @@
+# Darcy AI - Análise de Texto
+# Motor de análise educacional em passagem única, com casamento de palavras-chave compilado
+
+import re
+import bisect
+from typing import Dict, Iterable, List, Set
+
+# Palavras-chave educacionais por assunto
+SUBJECT_KEYWORDS = {
+    "mathematics": ["equação", "função", "derivada", "integral", "geometria", "álgebra"],
+    "science": ["experimento", "hipótese", "teoria", "átomo", "célula", "energia"],
+    "history": ["século", "guerra", "revolução", "império", "civilização"],
+    "literature": ["narrativa", "poesia", "romance", "análise", "personagem"],
+    "programming": ["código", "função", "variável", "algoritmo", "programa"]
+}
+
+CODE_KEYWORDS = ["def ", "function", "class ", "import"]
+
+EQUATION_SYMBOLS = ["=", "∫", "∑"]
+
+EDUCATIONAL_IMAGE_INDICATORS = [
+    "exercício", "problema", "questão", "resposta",
+    "capítulo", "página", "figura", "gráfico",
+    "fórmula", "definição", "exemplo", "teoria"
+]
+
+class KeywordMatcher:
+    """
+    Casamento de várias palavras-chave (em minúsculas) com semântica de
+    `keyword in text.lower()`, compilado uma única vez
+    - Palavras-chave sem espaço não podem atravessar tokens, então são
+      buscadas no vocabulário (tokens distintos) em vez do texto inteiro,
+      com uma única regex de alternativas em lookahead (casamentos sobrepostos)
+    - Palavras-chave com espaço ("def ") são buscadas no texto original
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        keywords = sorted(set(keywords), key=lambda k: (-len(k), k))
+        self.keywords = keywords
+
+        token_keywords = [k for k in keywords if not any(c.isspace() for c in k)]
+        self.spaced_keywords = [k for k in keywords if k not in token_keywords]
+
+        # Mais longas primeiro: na mesma posição a regex escolhe a maior, e os
+        # prefixos dela (também palavras-chave) são marcados por implicação
+        self._token_pattern = re.compile(
+            "(?=(" + "|".join(re.escape(k) for k in token_keywords) + "))"
+        ) if token_keywords else None
+        self._implied = {
+            k: {p for p in token_keywords if k.startswith(p)} for k in token_keywords
+        }
+        self._spaced_pattern = re.compile(
+            "|".join(re.escape(k) for k in self.spaced_keywords), re.IGNORECASE
+        ) if self.spaced_keywords else None
+
+    def match_vocabulary(self, vocabulary_lower: str) -> Set[str]:
+        """Palavras-chave presentes no vocabulário já em minúsculas (tokens separados por \\n)"""
+        found = set()
+        if self._token_pattern is None:
+            return found
+        for match in self._token_pattern.finditer(vocabulary_lower):
+            found |= self._implied[match.group(1)]
+        return found
+
+    def match_spaced(self, text: str) -> Set[str]:
+        """Palavras-chave com espaço presentes em text.lower()"""
+        found = set()
+        if self._spaced_pattern is None:
+            return found
+        # IGNORECASE aceita um superconjunto; cada candidato é confirmado com lower()
+        for match in self._spaced_pattern.finditer(text):
+            candidate = match.group().lower()
+            if candidate in self.spaced_keywords:
+                found.add(candidate)
+                if len(found) == len(self.spaced_keywords):
+                    break
+        return found
+
+EDUCATIONAL_MATCHER = KeywordMatcher(
+    [k for keywords in SUBJECT_KEYWORDS.values() for k in keywords]
+    + CODE_KEYWORDS
+    + EDUCATIONAL_IMAGE_INDICATORS
+)
+
+class DocumentStatsAccumulator:
+    """
+    Estatísticas de um documento alimentadas em blocos, com memória constante
+    - feed(bloco): qualquer divisão do texto; palavras e palavras-chave que
+      atravessam a fronteira entre blocos são tratadas
+    - add_page(texto): páginas unidas por "\n", como no texto completo do PDF
+    Os valores finais são os mesmos de text.split(), len(text.split('.')) e
+    `keyword in text.lower()` sobre o texto completo
+    """
+
+    def __init__(self, matcher: KeywordMatcher = EDUCATIONAL_MATCHER):
+        self.matcher = matcher
+        self.chars = 0
+        self.words = 0
+        self.word_chars = 0
+        self.dots = 0
+        self.pages = 0
+        self.keywords = set()
+        self.has_equations = False
+        self._carry = ""  # palavra possivelmente incompleta no fim do bloco anterior
+        self._tail = ""   # fim do bloco anterior para palavras-chave com espaço
+        self._tail_size = max((len(k) for k in matcher.spaced_keywords), default=1) - 1
+
+    @property
+    def sentences(self) -> int:
+        return self.dots + 1
+
+    def feed(self, chunk: str) -> 'DocumentStatsAccumulator':
+        if not chunk:
+            return self
+
+        self.chars += len(chunk)
+        self.dots += chunk.count('.')
+        if not self.has_equations:
+            self.has_equations = any(symbol in chunk for symbol in EQUATION_SYMBOLS)
+
+        text = self._carry + chunk
+        tokens = text.split()
+        self._carry = tokens.pop() if tokens and not text[-1].isspace() else ""
+        self._add_tokens(tokens)
+
+        if self._tail_size > 0:
+            window = self._tail + chunk
+            self.keywords |= self.matcher.match_spaced(window)
+            self._tail = window[-self._tail_size:]
+        return self
+
+    def add_page(self, text: str) -> 'DocumentStatsAccumulator':
+        """Adiciona uma página (separada da anterior por quebra de linha)"""
+        if self.pages:
+            self.feed("\n")
+        self.pages += 1
+        return self.feed(text)
+
+    def finish(self) -> 'DocumentStatsAccumulator':
+        """Conta a última palavra pendente; pode ser chamado mais de uma vez"""
+        if self._carry:
+            self._add_tokens([self._carry])
+            self._carry = ""
+        return self
+
+    def _add_tokens(self, tokens: List[str]):
+        if not tokens:
+            return
+        self.words += len(tokens)
+        self.word_chars += sum(map(len, tokens))
+        self.keywords |= self.matcher.match_vocabulary("\n".join(set(tokens)).lower())
+
+    def subject_scores(self) -> Dict[str, int]:
+        """Quantidade de palavras-chave presentes por assunto (apenas assuntos com acerto)"""
+        scores = {}
+        for subject, keywords in SUBJECT_KEYWORDS.items():
+            score = sum(1 for keyword in keywords if keyword in self.keywords)
+            if score > 0:
+                scores[subject] = score
+        return scores
+
+    def reading_level(self) -> str:
+        return reading_level(self.words, self.sentences, self.word_chars)
+
+    def educational_analysis(self) -> Dict:
+        return educational_analysis(self.finish())
+
+def profile_text(text: str) -> DocumentStatsAccumulator:
+    """Estatísticas de um texto completo em uma passagem"""
+    return DocumentStatsAccumulator().feed(text).finish()
+
+def reading_level(words: int, sentences: int, word_chars: int) -> str:
+    """Heurística de nível de leitura a partir das contagens do texto"""
+    if words < 10:
+        return "insufficient"
+
+    avg_sentence_length = words / max(sentences, 1)
+    avg_word_length = word_chars / words
+
+    # Heurística simples
+    if avg_sentence_length > 25 or avg_word_length > 6:
+        return "advanced"
+    elif avg_sentence_length > 15 or avg_word_length > 5:
+        return "intermediate"
+    else:
+        return "basic"
+
+def educational_analysis(profile: DocumentStatsAccumulator) -> Dict:
+    """Análise educacional (formato de DarcyFileProcessor.analyze_educational_content)"""
+    if profile.chars < 50:
+        return {"type": "insufficient_content"}
+
+    subject_scores = profile.subject_scores()
+
+    # Determinar assunto principal
+    main_subject = max(subject_scores.items(), key=lambda x: x[1])[0] if subject_scores else "general"
+
+    return {
+        "main_subject": main_subject,
+        "subject_scores": subject_scores,
+        "word_count": profile.words,
+        "reading_level": profile.reading_level(),
+        "has_equations": profile.has_equations,
+        "has_code": any(keyword in profile.keywords for keyword in CODE_KEYWORDS)
+    }
+
+def has_educational_indicators(profile: DocumentStatsAccumulator, indicators: List[str] = EDUCATIONAL_IMAGE_INDICATORS) -> bool:
+    """Verifica se algum indicador educacional aparece no texto"""
+    return any(indicator in profile.keywords for indicator in indicators)
+
+class PhraseMatcher:
+    """
+    Presença de várias expressões (semântica `phrase in text`) em um lote de
+    textos concatenados com um separador que não aparece nas expressões
+    - Uma busca str.find por expressão sobre o lote inteiro; após um acerto
+      a busca salta para o texto seguinte (no máximo um acerto por texto)
+    """
+
+    SEPARATOR = "\x00"
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases = list(dict.fromkeys(phrases))
+        self.columns = {phrase: i for i, phrase in enumerate(self.phrases)}
+
+    def presence(self, texts: List[str]):
+        """Matriz booleana (textos x expressões) em NumPy"""
+        import numpy as np
+
+        matrix = np.zeros((len(texts), len(self.phrases)), dtype=bool)
+        if not texts:
+            return matrix
+
+        joined = self.SEPARATOR.join(texts)
+        starts = [0]
+        for text in texts[:-1]:
+            starts.append(starts[-1] + len(text) + 1)
+        ends = starts[1:] + [len(joined)]
+
+        for column, phrase in enumerate(self.phrases):
+            if not phrase:
+                matrix[:, column] = True
+                continue
+            position = joined.find(phrase)
+            while position != -1:
+                row = bisect.bisect_right(starts, position) - 1
+                matrix[row, column] = True
+                position = joined.find(phrase, ends[row])
+        return matrix
@@ -0,0 +1,102 @@
+# Darcy AI - Tokenização
+# Tokenizador compartilhado (português): acentos, stopwords e memo LRU
+
+import re
+import sys
+import hashlib
+import unicodedata
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from darcy_cache import LRUCache
+
+# Stopwords do português já sem acento (comparadas com os termos normalizados)
+STOPWORDS_PT = frozenset("""
+a ao aos as ate com como da das de dela dele deles do dos e ela elas ele eles
+em entre era essa essas esse esses esta estas este estes eu foi ha isso isto ja
+la mais mas me mesmo meu minha muito na nao nas nem no nos nossa nosso num numa
+o os ou para pela pelas pelo pelos por qual quando que quem sao se seja sejam
+sem ser seu so sobre sua tambem te tem ter um uma umas uns voce voces
+""".split())
+
+TERM_PATTERN = re.compile(r"\w+")
+
+def fold_accents(text: str) -> str:
+    """Remove acentos e cedilha ("função" -> "funcao")"""
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+def normalize_text(text: str) -> str:
+    """Minúsculas sem acentos (mesma forma de TokenizedText.folded)"""
+    return fold_accents(text.lower())
+
+class TokenizedText:
+    """
+    Resultado imutável da tokenização de um texto
+    - words: text.split() (contagens de palavras compatíveis com o histórico)
+    - lower / folded: texto em minúsculas, com e sem acentos (buscas de expressões)
+    - sentence_lengths: palavras por trecho de text.split('.')
+    - terms / term_set: termos de conteúdo normalizados (internados), sem stopwords
+    """
+
+    __slots__ = ("text", "words", "lower", "folded", "sentence_lengths", "terms", "term_set")
+
+    def __init__(self, text: str, words: Tuple[str, ...], lower: str, folded: str,
+                 sentence_lengths: Tuple[int, ...], terms: Tuple[str, ...]):
+        self.text = text
+        self.words = words
+        self.lower = lower
+        self.folded = folded
+        self.sentence_lengths = sentence_lengths
+        self.terms = terms
+        self.term_set: FrozenSet[str] = frozenset(terms)
+
+    @property
+    def word_count(self) -> int:
+        return len(self.words)
+
+class Tokenizer:
+    """
+    Serviço de tokenização compartilhado pelos componentes do DarcyPythonCore
+    - Normalização: minúsculas, remoção de acentos, pontuação descartada
+    - Stopwords do português filtradas dos termos de conteúdo
+    - Memo LRU por hash do texto: o mesmo texto é tokenizado uma vez e reutilizado
+      por todos os avaliadores da requisição
+    """
+
+    def __init__(self, memo_entries: int = 1024, stopwords: FrozenSet[str] = STOPWORDS_PT):
+        self.stopwords = stopwords
+        self.memo = LRUCache(memo_entries)
+
+    @staticmethod
+    def text_key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def tokenize(self, text: Optional[str]) -> TokenizedText:
+        text = text or ""
+        key = self.text_key(text)
+        tokens = self.memo.get(key)
+        if tokens is None:
+            tokens = self._tokenize(text)
+            self.memo.put(key, tokens)
+        return tokens
+
+    def _tokenize(self, text: str) -> TokenizedText:
+        lower = text.lower()
+        folded = fold_accents(lower)
+        terms = tuple(
+            sys.intern(term) for term in TERM_PATTERN.findall(folded)
+            if term not in self.stopwords
+        )
+        return TokenizedText(
+            text=text,
+            words=tuple(text.split()),
+            lower=lower,
+            folded=folded,
+            sentence_lengths=tuple(len(sentence.split()) for sentence in text.split('.')),
+            terms=terms
+        )
+
+    def stats(self) -> Dict:
+        return {"memo": self.memo.stats()}
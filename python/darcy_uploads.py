@@ -0,0 +1,147 @@
+# Darcy AI - Uploads
+# Conteúdo enviado entregue ao processador sem gravar em disco quando possível
+
+import io
+import os
+import mmap
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple, Union
+
+class UploadSource:
+    """
+    Conteúdo de um arquivo para o DarcyFileProcessor
+    - Em memória (bytes) para uploads pequenos: nenhuma escrita em disco
+    - Em disco (caminho) para arquivos existentes ou uploads acima do limite;
+      diretórios temporários criados aqui são removidos em close()
+    `payload` é o que segue para o pool de processos (bytes ou caminho)
+    """
+
+    def __init__(self, data: Optional[bytes] = None, path: Optional[str] = None,
+                 filename: Optional[str] = None, temp_dir: Optional[tempfile.TemporaryDirectory] = None):
+        if (data is None) == (path is None):
+            raise ValueError("Informe data ou path")
+        self.data = data
+        self.path = path
+        self.filename = filename or (Path(path).name if path else "upload")
+        self._temp_dir = temp_dir
+        self._sha256 = None
+
+    @classmethod
+    def from_path(cls, path: str, filename: Optional[str] = None) -> 'UploadSource':
+        """Arquivo já em disco: usado diretamente, sem cópia"""
+        return cls(path=str(path), filename=filename)
+
+    @classmethod
+    def from_stream(cls, stream: BinaryIO, filename: Optional[str] = None,
+                    memory_threshold: int = 32 * 1024 * 1024,
+                    temp_root: Optional[str] = None) -> 'UploadSource':
+        """
+        Upload recebido como stream (ex.: werkzeug FileStorage.stream)
+        Até memory_threshold bytes o conteúdo fica em memória; acima disso é
+        copiado em blocos para um diretório temporário próprio
+        """
+        size = _stream_size(stream)
+        if size is not None and size <= memory_threshold:
+            return cls(data=stream.read(), filename=filename)
+
+        if temp_root:
+            Path(temp_root).mkdir(parents=True, exist_ok=True)
+        temp_dir = tempfile.TemporaryDirectory(prefix="darcy-upload-", dir=temp_root)
+        try:
+            path = os.path.join(temp_dir.name, "upload" + Path(filename or "").suffix.lower())
+            with open(path, 'wb') as f:
+                shutil.copyfileobj(stream, f, 1024 * 1024)
+        except BaseException:
+            temp_dir.cleanup()
+            raise
+        return cls(path=path, filename=filename, temp_dir=temp_dir)
+
+    @classmethod
+    def coerce(cls, source: Union['UploadSource', str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]) -> 'UploadSource':
+        """Aceita UploadSource, caminho, bytes ou objeto de arquivo binário"""
+        if isinstance(source, UploadSource):
+            return source
+        if isinstance(source, (str, os.PathLike)):
+            return cls.from_path(source)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return cls(data=bytes(source))
+        return cls.from_stream(source, getattr(source, 'name', None))
+
+    @property
+    def payload(self) -> Union[bytes, str]:
+        """Conteúdo serializável para tarefas do pool (bytes ou caminho)"""
+        return self.data if self.data is not None else self.path
+
+    @property
+    def size(self) -> int:
+        if self.data is not None:
+            return len(self.data)
+        return os.path.getsize(self.path)
+
+    def open(self) -> BinaryIO:
+        """Stream binário somente leitura sobre o conteúdo"""
+        return open_payload(self.payload)
+
+    def sha256(self) -> str:
+        """SHA-256 do conteúdo (arquivos em disco são lidos via mmap)"""
+        if self._sha256 is None:
+            if self.data is not None:
+                self._sha256 = hashlib.sha256(self.data).hexdigest()
+            else:
+                digest = hashlib.sha256()
+                with open(self.path, 'rb') as f:
+                    if os.fstat(f.fileno()).st_size:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                            digest.update(mapped)
+                self._sha256 = digest.hexdigest()
+        return self._sha256
+
+    def close(self):
+        """Remove o diretório temporário, se houver"""
+        if self._temp_dir is not None:
+            self._temp_dir.cleanup()
+            self._temp_dir = None
+
+    def __enter__(self) -> 'UploadSource':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def spill_to_temp(data: bytes, suffix: str = "",
+                  temp_root: Optional[str] = None) -> Tuple[tempfile.TemporaryDirectory, str]:
+    """
+    Grava bytes em um diretório temporário próprio e retorna (diretório, caminho)
+    Usado antes de enviar o mesmo conteúdo a várias tarefas do pool: cada
+    tarefa recebe só o caminho em vez de uma cópia serializada dos bytes
+    """
+    if temp_root:
+        Path(temp_root).mkdir(parents=True, exist_ok=True)
+    temp_dir = tempfile.TemporaryDirectory(prefix="darcy-upload-", dir=temp_root)
+    try:
+        path = os.path.join(temp_dir.name, "upload" + suffix)
+        with open(path, 'wb') as f:
+            f.write(data)
+    except BaseException:
+        temp_dir.cleanup()
+        raise
+    return temp_dir, path
+
+def open_payload(payload: Union[bytes, str]) -> BinaryIO:
+    """Abre um payload (bytes ou caminho) como stream binário"""
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        return io.BytesIO(payload)
+    return open(payload, 'rb')
+
+def _stream_size(stream: BinaryIO) -> Optional[int]:
+    """Tamanho restante do stream, se ele permitir seek"""
+    try:
+        position = stream.tell()
+        end = stream.seek(0, io.SEEK_END)
+        stream.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None
@@ -0,0 +1,13 @@
+# Darcy AI - Testes
+# Fixtures compartilhadas entre os módulos de teste
+
+import pytest
+
+from tests.support import StandInSource
+
+@pytest.fixture
+def source():
+    """Servidor HTTP local no papel da Wikipedia, encerrado ao fim do teste"""
+    source = StandInSource()
+    yield source
+    source.close()
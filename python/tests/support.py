@@ -0,0 +1,212 @@
+# Darcy AI - Apoio aos testes
+# Implementações de referência, dados sintéticos e dublês locais usados pelos testes
+# e pelos benchmarks (python darcy_benchmarks.py)
+
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+def legacy_analyze_educational_content(text: str) -> Dict:
+    """Implementação anterior (várias passagens), mantida como referência"""
+    if not text or len(text) < 50:
+        return {"type": "insufficient_content"}
+
+    educational_keywords = {
+        "mathematics": ["equação", "função", "derivada", "integral", "geometria", "álgebra"],
+        "science": ["experimento", "hipótese", "teoria", "átomo", "célula", "energia"],
+        "history": ["século", "guerra", "revolução", "império", "civilização"],
+        "literature": ["narrativa", "poesia", "romance", "análise", "personagem"],
+        "programming": ["código", "função", "variável", "algoritmo", "programa"]
+    }
+
+    text_lower = text.lower()
+    subject_scores = {}
+    for subject, keywords in educational_keywords.items():
+        score = sum(1 for keyword in keywords if keyword in text_lower)
+        if score > 0:
+            subject_scores[subject] = score
+
+    main_subject = max(subject_scores.items(), key=lambda x: x[1])[0] if subject_scores else "general"
+
+    words = text.split()
+    sentences = text.split('.')
+    if len(words) < 10:
+        reading_level = "insufficient"
+    else:
+        avg_sentence_length = len(words) / max(len(sentences), 1)
+        avg_word_length = sum(len(word) for word in words) / len(words)
+        if avg_sentence_length > 25 or avg_word_length > 6:
+            reading_level = "advanced"
+        elif avg_sentence_length > 15 or avg_word_length > 5:
+            reading_level = "intermediate"
+        else:
+            reading_level = "basic"
+
+    return {
+        "main_subject": main_subject,
+        "subject_scores": subject_scores,
+        "word_count": len(text.split()),
+        "reading_level": reading_level,
+        "has_equations": "=" in text or "∫" in text or "∑" in text,
+        "has_code": any(keyword in text_lower for keyword in ["def ", "function", "class ", "import"])
+    }
+
+def sample_text(words: int, seed: int = 42) -> str:
+    """Texto sintético no estilo de uma apostila"""
+    vocabulary = (
+        "o a de que para com uma aula estudo exercício página livro professor aluno "
+        "matemática física química texto exemplo resposta questão capítulo Brasil "
+        "Equação Derivada teoria célula século narrativa código = def class import"
+    ).split()
+    rng = random.Random(seed)
+    tokens = []
+    for _ in range(words):
+        token = rng.choice(vocabulary)
+        if rng.random() < 0.07:
+            token += "."
+        tokens.append(token)
+        tokens.append("\n" if rng.random() < 0.05 else " ")
+    return "".join(tokens)
+
+def random_chunks(text: str, rng: random.Random, max_chunk: int = 4096) -> List[str]:
+    """Divide o texto em pedaços de 1 a max_chunk caracteres (ex.: deltas de um stream)"""
+    chunks, pos = [], 0
+    while pos < len(text):
+        size = rng.randint(1, max_chunk)
+        chunks.append(text[pos:pos + size])
+        pos += size
+    return chunks
+
+def sample_interactions(count: int, seed: int = 42) -> List[Dict]:
+    """Histórico sintético de interações no formato enviado pelo frontend"""
+    topics = (
+        "física quântica matemática derivadas história do brasil equação célula "
+        "século revolução código algoritmo função integral poesia energia"
+    ).split()
+    crews = ["teaching", "research", "creative", "assessment"]
+    rng = random.Random(seed)
+    interactions = []
+    for _ in range(count):
+        interactions.append({
+            "query": " ".join(rng.choices(topics, k=rng.randint(1, 4))),
+            "crew": rng.choice(crews),
+            "timestamp": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00Z",
+            "processing_time": round(rng.uniform(0.5, 4.0), 2)
+        })
+    return interactions
+
+def comparable_patterns(result: Dict) -> Dict:
+    """Resultado sem o horário da análise e com as datas como texto"""
+    result = {k: v for k, v in result.items() if k != "analysis_timestamp"}
+    result["daily_activity"] = {str(k): v for k, v in result["daily_activity"].items()}
+    result["avg_response_time"] = round(float(result["avg_response_time"]), 9)
+    return result
+
+def legacy_learning_patterns(analyzer, interaction_data: List[Dict]) -> Dict:
+    """Implementação anterior (DataFrame e laços em Python), mantida como referência"""
+    import pandas as pd
+    import numpy as np
+    from collections import Counter
+    from datetime import datetime
+
+    df = pd.DataFrame(interaction_data)
+
+    topics = Counter()
+    for item in interaction_data:
+        if 'query' in item:
+            topics.update(item['query'].lower().split())
+
+    if 'timestamp' in df.columns:
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        daily_interactions = df.groupby(df['timestamp'].dt.date).size()
+
+    crew_usage = Counter([item.get('crew', 'unknown') for item in interaction_data])
+    avg_response_time = np.mean([item.get('processing_time', 0) for item in interaction_data])
+
+    return {
+        "total_interactions": len(interaction_data),
+        "top_topics": dict(topics.most_common(10)),
+        "crew_preferences": dict(crew_usage),
+        "avg_response_time": avg_response_time,
+        "daily_activity": daily_interactions.to_dict() if 'timestamp' in df.columns else {},
+        "recommendations": analyzer.generate_recommendations(topics, crew_usage),
+        "analysis_timestamp": datetime.now().isoformat()
+    }
+
+def zipf_words(count: int, vocabulary: int, seed: int = 42) -> List[str]:
+    """Palavras com frequência de Zipf, incluindo uma cauda longa de "erros de digitação" raros"""
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, vocabulary + 1)]
+    words = [f"termo{i}" for i in range(vocabulary)]
+    stream = rng.choices(words, weights=weights, k=count)
+    for i in range(0, count, 10):
+        stream[i] = f"typo{rng.randrange(count)}"
+    return stream
+
+def sample_responses(count: int, seed: int = 42) -> List[str]:
+    """Respostas sintéticas com indicadores, marcadores e tamanhos de sentença variados"""
+    vocabulary = (
+        "exemplo por exemplo imagine que considere passo a passo primeiro segundo "
+        "finalmente importante lembre-se note que observe prática exercício atividade "
+        "aplicação além disso portanto derivada função integral célula energia século"
+    ).split() + ["a", "de", "o", "que", "e", "do", "da", "em", "um", "para"] * 6
+    rng = random.Random(seed)
+    responses = []
+    for _ in range(count):
+        sentences = [
+            " ".join(rng.choices(vocabulary, k=rng.choice([2, 8, 15, 40])))
+            for _ in range(rng.randint(1, 12))
+        ]
+        text = ". ".join(sentences)
+        responses.append(text.upper() if rng.random() < 0.1 else text)
+    return responses
+
+class StandInSource:
+    """Servidor HTTP local no papel da Wikipedia: ETag por página, 304, 404 e modo de falha (500)"""
+
+    def __init__(self):
+        source = self
+        self.failing = False
+        self.counts = {200: 0, 304: 0, 404: 0, 500: 0}
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # cabeçalho e corpo saem em escritas separadas
+
+            def do_GET(self):
+                page = self.path.rsplit("/", 1)[-1]
+                etag = f'"v1-{page}"'
+                if source.failing:
+                    status, body = 500, b""
+                elif page.startswith("missing"):
+                    status, body = 404, b""
+                elif self.headers.get("If-None-Match") == etag:
+                    status, body = 304, b""
+                else:
+                    status = 200
+                    body = json.dumps({"title": page, "extract": f"Resumo de {page}. " * 20}).encode("utf-8")
+                with source._lock:
+                    source.counts[status] += 1
+                self.send_response(status)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+                if status != 304:
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/summary/"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,85 @@
+# Darcy AI - Testes do DarcyMLEnhancer
+# Ordem dos avaliadores pelo custo medido e avaliação em lote (enhance_batch)
+
+import time
+
+import pytest
+
+from darcy_python_core import DarcyPythonCore, DarcyMLEnhancer
+from tests.support import sample_responses
+
+CONTEXT = {"query": "Explique derivada e integral de uma função", "crew": "teaching"}
+
+@pytest.fixture
+def enhancer():
+    enhancer = DarcyMLEnhancer(DarcyPythonCore())
+    enhancer.memo = None
+    return enhancer
+
+def scorer_order(enhancer):
+    return [name for name, _ in enhancer._scorers]
+
+def test_scorers_sorted_by_calibrated_cost(enhancer):
+    estimates = enhancer.scorer_stats()
+    assert list(estimates) == scorer_order(enhancer)
+    costs = [estimates[name]["estimate_ms_per_kchar"] for name in scorer_order(enhancer)]
+    assert costs == sorted(costs)
+
+def test_slow_scorer_moves_last_and_is_skipped_under_deadline(enhancer):
+    def slow_clarity(response, context):
+        time.sleep(0.02)
+        return enhancer.assess_clarity(response)
+
+    # O avaliador lento começa em primeiro: a ordem fixa não deve prevalecer
+    enhancer._scorers = (("clarity_score", slow_clarity),) + tuple(
+        entry for entry in enhancer._scorers if entry[0] != "clarity_score"
+    )
+    enhancer.calibrate_scorers()
+    assert scorer_order(enhancer)[-1] == "clarity_score"
+
+    result = enhancer.enhance_response_quality(DarcyMLEnhancer.CALIBRATION_RESPONSE, CONTEXT, deadline_ms=10)
+    assert result["skipped"] == ["clarity_score"]
+    assert result["clarity_score"] is None
+    assert result["educational_quality"] is not None
+
+# ---------------------------------------------------------------------------
+# enhance_batch: mesma saída das chamadas individuais, com e sem memo
+# ---------------------------------------------------------------------------
+
+BATCH_CONTEXTS = [
+    CONTEXT,
+    {"query": "exercícios sobre células", "crew": "assessment"},
+    {"query": "derivadas", "topic": "calculo"},
+    {}
+]
+
+# Texto vazio, só pontuação, expressões no limite entre respostas
+EDGE_RESPONSES = ["", "...", "por", "exemplo", "Por exemplo.", "ALÉM DISSO", "primeiro" * 3]
+
+@pytest.fixture
+def memoized():
+    return DarcyMLEnhancer(DarcyPythonCore())
+
+@pytest.mark.parametrize("context", BATCH_CONTEXTS)
+def test_batch_matches_single_calls(enhancer, context):
+    enhancer.add_references("calculo", sample_responses(20, seed=5))
+    responses = EDGE_RESPONSES + sample_responses(200, seed=7)
+    single = [enhancer.enhance_response_quality(response, context) for response in responses]
+    assert enhancer.enhance_batch(responses, context) == single
+
+@pytest.mark.parametrize("context", BATCH_CONTEXTS)
+def test_memo_hits_match_fresh_results(enhancer, memoized, context):
+    for target in (enhancer, memoized):
+        target.add_references("calculo", sample_responses(20, seed=5))
+    responses = EDGE_RESPONSES + sample_responses(100, seed=11)
+    fresh = [enhancer.enhance_response_quality(response, context) for response in responses]
+
+    # Metade memoizada por chamadas individuais: o lote mistura acertos e avaliações
+    for response in responses[::2]:
+        memoized.enhance_response_quality(response, context)
+    assert memoized.enhance_batch(responses, context) == fresh
+
+    # Tudo memoizado: lote e chamadas individuais saem do memo
+    assert memoized.enhance_batch(responses, context) == fresh
+    assert [memoized.enhance_response_quality(response, context) for response in responses] == fresh
+    assert memoized.memo_stats()["hits"] > 0
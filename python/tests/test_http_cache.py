@@ -0,0 +1,88 @@
+# Darcy AI - Testes do cache HTTP das fontes de busca
+# Servidor local (fixture source, ver conftest.py) no papel da Wikipedia: ETag, 304, 404 e falhas
+
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+
+from darcy_http_cache import HttpResponseCache, UpstreamError
+
+TTL = 1.0
+PAGES = [f"pagina{i}" for i in range(10)]
+
+def make_cache(cache_dir, **kwargs):
+    return HttpResponseCache(str(cache_dir), ttls={"wikipedia_summary": TTL}, max_stale=60, **kwargs)
+
+async def fetch_all(cache, session, url, pages):
+    return [await cache.get_json(session, url + page, source="wikipedia_summary") for page in pages]
+
+def run(coro_func, *args):
+    async def main():
+        async with aiohttp.ClientSession() as session:
+            return await coro_func(session, *args)
+    return asyncio.run(main())
+
+def test_fresh_entries_hit_upstream_once(source, tmp_path):
+    async def scenario(session):
+        cache = make_cache(tmp_path)
+        return await fetch_all(cache, session, source.url, PAGES * 3 + ["missing1", "missing1"])
+
+    results = run(scenario)
+    assert source.counts[200] == len(PAGES)
+    assert source.counts[404] == 1
+    assert [r.origin for r in results[:len(PAGES)]] == ["upstream"] * len(PAGES)
+    assert all(r.origin == "memory" for r in results[len(PAGES):-2])
+    assert results[-1].status == 404 and results[-1].origin == "memory"
+
+def test_expired_entries_are_revalidated(source, tmp_path):
+    async def scenario(session):
+        cache = make_cache(tmp_path)
+        first = await fetch_all(cache, session, source.url, PAGES)
+        await asyncio.sleep(TTL + 0.1)
+        return first, await fetch_all(cache, session, source.url, PAGES)
+
+    first, revalidated = run(scenario)
+    assert [r.origin for r in revalidated] == ["revalidated"] * len(PAGES)
+    assert source.counts[304] == len(PAGES)
+    assert source.counts[200] == len(PAGES)
+    assert [r.data for r in revalidated] == [r.data for r in first]
+
+def test_disk_tier_survives_restart(source, tmp_path):
+    async def scenario(session):
+        await fetch_all(make_cache(tmp_path), session, source.url, PAGES)
+        return await fetch_all(make_cache(tmp_path), session, source.url, PAGES)
+
+    from_disk = run(scenario)
+    assert [r.origin for r in from_disk] == ["disk"] * len(PAGES)
+    assert sum(source.counts.values()) == len(PAGES)
+
+def test_failing_source_serves_stale_within_margin(source, tmp_path):
+    async def scenario(session):
+        cache = make_cache(tmp_path)
+        first = await fetch_all(cache, session, source.url, PAGES)
+        await asyncio.sleep(TTL + 0.1)
+        source.failing = True
+        stale = await fetch_all(cache, session, source.url, PAGES)
+        return cache, first, stale
+
+    cache, first, stale = run(scenario)
+    assert [r.origin for r in stale] == ["stale"] * len(PAGES)
+    assert [r.data for r in stale] == [r.data for r in first]
+    totals = cache.stats()["totals"]
+    assert totals["stale_served"] == len(PAGES)
+
+def test_failing_source_without_margin_raises(source, tmp_path):
+    async def scenario(session):
+        cache = make_cache(tmp_path)
+        await fetch_all(cache, session, source.url, PAGES[:1])
+        await asyncio.sleep(TTL + 0.1)
+        source.failing = True
+        cache.max_stale = 0
+        with pytest.raises(UpstreamError):
+            await cache.get_json(session, source.url + PAGES[0], source="wikipedia_summary")
+        return cache
+
+    cache = run(scenario)
+    assert cache.stats()["totals"]["errors"] == 1
@@ -0,0 +1,39 @@
+# Darcy AI - Testes do pipeline de imagem
+# OCR em blocos limitado à janela de tarefas por requisição
+
+import asyncio
+import io
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from darcy_image_pipeline import ocr_tile
+from darcy_python_core import DarcyPythonCore, DarcyFileProcessor
+from darcy_uploads import UploadSource
+
+def test_tiles_respect_request_window():
+    core = DarcyPythonCore()
+    core.config["execution"]["max_workers"] = 2
+    core.config["ocr"]["image"] = {"tile_size": 200, "binarize": False}
+    in_flight, peak, tiles = 0, 0, 0
+
+    async def run_cpu_bound(func, *args, timeout=None):
+        nonlocal in_flight, peak, tiles
+        if func is not ocr_tile:
+            return func(*args)
+        in_flight += 1
+        peak = max(peak, in_flight)
+        tiles += 1
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {"words": [(0, 0, 10, 10, f"bloco{tiles}")], "ocr_available": True}
+
+    core.run_cpu_bound = run_cpu_bound
+    buffer = io.BytesIO()
+    Image.new("L", (1000, 1000), 255).save(buffer, format="PNG")
+
+    result = asyncio.run(DarcyFileProcessor(core)._ocr_image(UploadSource(data=buffer.getvalue()), {}))
+    assert tiles == 25
+    assert peak == 2
+    assert result["ocr_available"]
@@ -0,0 +1,150 @@
+# Darcy AI - Testes dos agregados de padrões de aprendizado
+# Estado incremental por usuário (LearningPatternStore), lotes malformados e
+# equivalência do caminho colunar com a implementação anterior
+
+import time
+from collections import Counter
+
+import pytest
+
+from darcy_learning import LearningPatternAggregate, LearningPatternStore
+from tests.support import comparable_patterns, legacy_learning_patterns, sample_interactions
+
+def recommend(topics, crews):
+    return []
+
+def test_non_numeric_processing_time_counts_as_zero():
+    aggregate = LearningPatternAggregate().extend([
+        {"query": "frações", "processing_time": "abc"},
+        {"query": "frações", "processing_time": 2.5},
+        {"query": "frações", "processing_time": None}
+    ])
+    assert aggregate.total == 3
+    assert aggregate.processing_time_sum == 2.5
+
+def test_unhashable_crew_is_normalized():
+    aggregate = LearningPatternAggregate().extend([{"crew": ["teaching"]}, {"crew": "teaching"}])
+    assert aggregate.crews == Counter({'["teaching"]': 1, "teaching": 1})
+
+def test_failed_batch_leaves_aggregate_untouched(tmp_path):
+    store = LearningPatternStore(str(tmp_path), recommend)
+    store.append("aluno1", [{"query": "álgebra", "crew": "teaching", "processing_time": 1}])
+
+    class Broken(dict):
+        def get(self, key, default=None):
+            raise RuntimeError("interação corrompida")
+
+    batch = [{"query": "geometria", "crew": "creative"}, Broken(query="x")]
+    with pytest.raises(RuntimeError):
+        store.append("aluno1", batch)
+
+    analysis = store.analysis("aluno1")
+    assert analysis["total_interactions"] == 1
+    assert analysis["crew_preferences"] == {"teaching": 1}
+    assert analysis["top_topics"] == {"álgebra": 1}
+
+def test_rejected_batch_is_not_stored(tmp_path):
+    from darcy_python_core import DarcyPythonCore, DarcyDataAnalyzer
+
+    core = DarcyPythonCore()
+    core.config["file_paths"]["cache"] = str(tmp_path)
+    analyzer = DarcyDataAnalyzer(core)
+    try:
+        analyzer.record_interactions("aluno1", [{"query": "álgebra", "processing_time": 1}])
+
+        class Broken(dict):
+            def get(self, key, default=None):
+                raise RuntimeError("interação corrompida")
+
+        with pytest.raises(RuntimeError):
+            analyzer.record_interactions("aluno1", [{"query": "geometria"}, Broken(query="x")])
+
+        # Uma nova tentativa (já corrigida) não duplica o que foi aceito antes
+        analyzer.record_interactions("aluno1", [{"query": "geometria"}])
+        stored = analyzer.analyze_period("aluno1")
+        assert stored["total_interactions"] == 2
+        assert stored["top_topics"] == analyzer.get_learning_patterns("aluno1")["top_topics"]
+    finally:
+        analyzer.close()
+
+def test_writes_are_debounced(tmp_path):
+    store = LearningPatternStore(str(tmp_path), recommend, flush_interval=3600)
+    for i in range(50):
+        store.append("aluno1", [{"query": f"tópico{i}", "processing_time": 1}])
+    assert store.saves == 0
+    assert not (tmp_path / "aluno1.json").exists()
+
+    store.close()
+    assert store.saves == 1
+    restarted = LearningPatternStore(str(tmp_path), recommend)
+    assert restarted.analysis("aluno1")["total_interactions"] == 50
+
+def test_evicted_user_is_saved(tmp_path):
+    store = LearningPatternStore(str(tmp_path), recommend, max_cached_users=1, flush_interval=3600)
+    store.append("aluno1", [{"query": "álgebra"}])
+    store.append("aluno2", [{"query": "geometria"}])
+    assert (tmp_path / "aluno1.json").exists()
+    assert store.analysis("aluno1")["total_interactions"] == 1
+
+def test_analysis_timestamp_is_read_time(tmp_path):
+    store = LearningPatternStore(str(tmp_path), recommend)
+    store.append("aluno1", [{"query": "álgebra"}])
+    first = store.analysis("aluno1")
+    time.sleep(0.01)
+    second = store.analysis("aluno1")
+    assert second["analysis_timestamp"] > first["analysis_timestamp"]
+    assert {**first, "analysis_timestamp": None} == {**second, "analysis_timestamp": None}
+
+# ---------------------------------------------------------------------------
+# analyze_learning_patterns: caminho colunar x implementação anterior (DataFrame)
+# ---------------------------------------------------------------------------
+
+# Campos ausentes, empates e consultas com espaços repetidos
+EDGE_INTERACTIONS = [
+    [{"query": "a  b\tA", "crew": "x"}, {"crew": "y"}, {"query": "B"}],
+    [{"query": "z", "timestamp": "2026-01-02T10:00:00Z", "processing_time": 1}, {"query": "y"}],
+    sample_interactions(1_000, seed=7),
+    sample_interactions(20_000, seed=3)
+]
+
+@pytest.fixture
+def analyzer():
+    pytest.importorskip("pandas")
+    from darcy_python_core import DarcyDataAnalyzer
+    return DarcyDataAnalyzer(None)
+
+@pytest.mark.parametrize("interactions", EDGE_INTERACTIONS)
+def test_columnar_matches_legacy(analyzer, interactions):
+    current = comparable_patterns(analyzer.analyze_learning_patterns(interactions))
+    legacy = comparable_patterns(legacy_learning_patterns(analyzer, interactions))
+    assert current == legacy
+    # Empates em top_topics saem na mesma ordem
+    assert list(current["top_topics"]) == list(legacy["top_topics"])
+
+@pytest.mark.parametrize("interactions", EDGE_INTERACTIONS)
+def test_aggregate_matches_columnar(analyzer, interactions):
+    aggregate = LearningPatternAggregate().extend(interactions).analysis(analyzer.generate_recommendations)
+    assert comparable_patterns(aggregate) == comparable_patterns(analyzer.analyze_learning_patterns(interactions))
+
+# Perto da meia-noite: em UTC, 23:30-03:00 e 01:30+02:00 caem em dias diferentes
+OFFSET_INTERACTIONS = [
+    {"query": "álgebra", "timestamp": "2026-03-01T23:30:00-03:00"},
+    {"query": "geometria", "timestamp": "2026-03-02T01:30:00+02:00"},
+    {"query": "física", "timestamp": "2026-03-02T12:00:00"},
+]
+
+def test_daily_activity_uses_utc_days_everywhere(analyzer, tmp_path):
+    from darcy_interaction_store import InteractionStore
+
+    expected = {"2026-03-01": 1, "2026-03-02": 2}
+    aggregate = LearningPatternAggregate().extend(OFFSET_INTERACTIONS)
+    assert aggregate.analysis(analyzer.generate_recommendations)["daily_activity"] == expected
+    assert analyzer.analyze_learning_patterns(OFFSET_INTERACTIONS)["daily_activity"] == expected
+
+    store = InteractionStore(str(tmp_path / "interactions.db"))
+    try:
+        store.add("aluno1", OFFSET_INTERACTIONS)
+        rollups = {row["bucket"]: row["interactions"] for row in store.activity("aluno1", "day")}
+    finally:
+        store.close()
+    assert rollups == expected
@@ -0,0 +1,44 @@
+# Darcy AI - Testes da extração de PDF em streaming
+# stream_pdf_pages: mesmos registros de iter_pdf_pages, extraídos em faixas no pool
+
+import os
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+pytest.importorskip("PyPDF2")
+
+from darcy_python_core import DarcyPythonCore, DarcyFileProcessor
+from darcy_uploads import UploadSource
+
+@pytest.fixture
+def processor(tmp_path):
+    core = DarcyPythonCore()
+    core.config["jobs"]["pages_per_task"] = 3
+    core.config["file_paths"]["temp"] = str(tmp_path)
+    yield DarcyFileProcessor(core)
+    core.shutdown_process_pool()
+    core.stop_event_loop()
+
+def make_pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"Página {i + 1}: a derivada mede a taxa de variação.")
+    return doc.tobytes()
+
+@pytest.mark.parametrize("pages", [1, 3, 8])
+def test_records_match_iter_pdf_pages(processor, pages):
+    pdf = make_pdf(pages)
+    records = list(processor.stream_pdf_pages(UploadSource(data=pdf)))
+    assert records == list(DarcyFileProcessor.iter_pdf_pages(pdf))
+    assert [record["type"] for record in records].count("document") == 1
+
+def test_spilled_copy_removed_when_client_leaves(processor, tmp_path):
+    stream = processor.stream_pdf_pages(UploadSource(data=make_pdf(8)))
+    for record in stream:
+        if record["type"] == "page" and record["page"] == 5:
+            break
+    # A partir da segunda faixa as tarefas leem uma cópia em disco
+    assert any(tmp_path.iterdir())
+    stream.close()
+    assert not any(tmp_path.iterdir())
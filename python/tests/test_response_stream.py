@@ -0,0 +1,40 @@
+# Darcy AI - Testes da avaliação incremental em streaming
+# scores() de ResponseStreamScorer equivale a reavaliar o texto recebido até ali
+
+import random
+
+import pytest
+
+from darcy_python_core import DarcyPythonCore, DarcyMLEnhancer
+from tests.support import random_chunks, sample_responses
+
+CONTEXT = {"query": "Explique derivada e integral de uma função", "crew": "assessment", "topic": "calculo"}
+
+# Combinações de acentos, espaços e pontuação repetidos que atravessam deltas
+TEXTS = sample_responses(30, seed=9) + ["ação̧ funç̃ao. Exercício", "ALÉM  DISSO...primeiro"]
+
+@pytest.fixture(scope="module")
+def enhancer():
+    enhancer = DarcyMLEnhancer(DarcyPythonCore())
+    enhancer.memo = None
+    enhancer.add_references("calculo", sample_responses(20, seed=5))
+    return enhancer
+
+@pytest.mark.parametrize("index", range(len(TEXTS)))
+def test_provisional_scores_match_partial_text(enhancer, index):
+    text = TEXTS[index]
+    scorer = enhancer.start_stream(CONTEXT)
+    received = ""
+    for chunk in random_chunks(text, random.Random(index), max_chunk=12):
+        received += chunk
+        expected = enhancer.enhance_response_quality(received, CONTEXT)
+        expected.pop("original_response")
+        assert scorer.feed(chunk).scores() == expected
+    assert enhancer.finish_stream(scorer) == enhancer.enhance_response_quality(text, CONTEXT)
+
+def test_long_stream_matches_rescoring(enhancer):
+    text = " ".join(sample_responses(200, seed=3))
+    scorer = enhancer.start_stream(CONTEXT)
+    for i in range(0, len(text), 40):
+        scorer.feed(text[i:i + 40])
+    assert enhancer.finish_stream(scorer) == enhancer.enhance_response_quality(text, CONTEXT)
@@ -0,0 +1,48 @@
+# Darcy AI - Testes da completude semântica
+# N-gramas de caracteres com hashing e índice de referências por tópico
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from darcy_python_core import DarcyPythonCore, DarcyMLEnhancer
+
+RELATED = "A derivada de uma função mede a taxa de variação."
+UNRELATED = "A Revolução Francesa começou em 1789."
+CONTEXT = {"query": "Como calcular derivadas de funções?"}
+
+@pytest.fixture
+def enhancer():
+    return DarcyMLEnhancer(DarcyPythonCore())
+
+def test_related_answer_scores_higher(enhancer):
+    related = enhancer.assess_semantic_completeness(RELATED, CONTEXT)
+    assert related > enhancer.assess_semantic_completeness(UNRELATED, CONTEXT)
+
+def test_word_form_variations_count(enhancer):
+    # "derivada"/"derivadas" e "função"/"funções" não coincidem como termos inteiros
+    assert enhancer.assess_semantic_completeness(RELATED, CONTEXT) > enhancer.assess_completeness(RELATED, CONTEXT)
+
+def test_references_pull_score_towards_nearest(enhancer):
+    context = {**CONTEXT, "topic": "calculo"}
+    without = enhancer.assess_semantic_completeness(RELATED, context)
+    enhancer.add_references("calculo", [RELATED, {"id": "historia", "text": UNRELATED}])
+    assert enhancer.assess_semantic_completeness(RELATED, context) > without
+
+    vector = enhancer.vectorizer.vector(enhancer.core.tokenize(RELATED).terms)
+    (nearest_id, similarity), = enhancer.references.nearest("calculo", vector)
+    assert nearest_id != "historia"
+    assert similarity == pytest.approx(1.0, abs=1e-5)
+
+def test_reference_changes_invalidate_memo(enhancer):
+    context = {**CONTEXT, "topic": "calculo"}
+    before = enhancer.enhance_response_quality(RELATED, context)["semantic_completeness"]
+    enhancer.add_references("calculo", [RELATED])
+    after = enhancer.enhance_response_quality(RELATED, context)["semantic_completeness"]
+    assert after != before
+
+def test_oldest_references_leave_first(enhancer):
+    enhancer.references.max_per_topic = 3
+    enhancer.add_references("calculo", [{"id": f"r{i}", "text": f"resposta de referência {i}"} for i in range(10)])
+    nearest = enhancer.references.nearest("calculo", enhancer.vectorizer.vector(["referência"]), k=10)
+    assert sorted(reference_id for reference_id, _ in nearest) == ["r7", "r8", "r9"]
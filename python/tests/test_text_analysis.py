@@ -0,0 +1,47 @@
+# Darcy AI - Testes da análise de texto educacional
+# Saída idêntica à implementação anterior (várias passagens), mantida em tests/support.py,
+# também com o texto entregue em pedaços ou páginas (DocumentStatsAccumulator)
+
+import random
+
+import pytest
+
+from darcy_python_core import DarcyFileProcessor
+from tests.support import legacy_analyze_educational_content, random_chunks, sample_text
+
+EDGE_TEXTS = [
+    "", "curto", "A INTEGRALGORITMO do PROGRAMAÇÃO " * 5, "DEF\nclass\tdef  x " * 10,
+    "Capítulo 1. Exercício: calcule a Função f(x) = 2x. Class Def import" * 3,
+    "∫ f(x) dx e ∑ aᵢ. " * 5, "palavra " * 9 + "fim.",
+    sample_text(5_000, seed=7)
+]
+
+@pytest.fixture
+def processor():
+    return DarcyFileProcessor(None)
+
+@pytest.mark.parametrize("text", EDGE_TEXTS)
+def test_matches_legacy_on_edge_cases(processor, text):
+    assert processor.analyze_educational_content(text) == legacy_analyze_educational_content(text)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_legacy_on_sample_texts(processor, seed):
+    text = sample_text(20_000, seed=seed)
+    assert processor.analyze_educational_content(text) == legacy_analyze_educational_content(text)
+
+# ---------------------------------------------------------------------------
+# DocumentStatsAccumulator: texto em pedaços ou páginas dá o mesmo resultado
+# ---------------------------------------------------------------------------
+
+# Divisões arbitrárias, inclusive no meio de palavras e de "def "
+@pytest.mark.parametrize("text", ["def x = 1 " * 20, "Class  INTEGRAL. algoritmo\n" * 40, sample_text(3_000, seed=11)])
+@pytest.mark.parametrize("max_chunk", [1, 2, 7, 64])
+def test_chunked_feed_matches_legacy(processor, text, max_chunk):
+    stats = processor.new_document_stats()
+    for chunk in random_chunks(text, random.Random(3), max_chunk):
+        stats.feed(chunk)
+    assert stats.educational_analysis() == legacy_analyze_educational_content(text)
+
+def test_pages_match_joined_text(processor):
+    pages = [sample_text(500, seed=i) for i in range(20)]
+    assert processor.analyze_pages(pages) == legacy_analyze_educational_content("\n".join(pages))
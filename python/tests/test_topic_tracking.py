@@ -0,0 +1,63 @@
+# Darcy AI - Testes do rastreamento de tópicos
+# Garantias documentadas em SpaceSavingCounter, conferidas contra Counter exato
+
+from collections import Counter
+
+import pytest
+
+from darcy_learning import SpaceSavingCounter
+from tests.support import zipf_words
+
+CAPACITY = 200
+WORDS = zipf_words(50_000, vocabulary=5_000)
+
+def assert_guarantees(summary, exact, total):
+    bound = total / summary.capacity
+    assert summary.total == total
+    assert summary.max_error() <= bound
+    for item, count in summary.most_common():
+        error = summary.error(item)
+        assert count - error <= exact[item] <= count, item
+        assert error <= bound
+    tracked = dict(summary.most_common())
+    for item, frequency in exact.items():
+        if frequency > bound:
+            assert item in tracked, f"{item} ({frequency}) deveria estar no resumo"
+
+def test_guarantees_hold_on_zipf_stream():
+    summary = SpaceSavingCounter(CAPACITY)
+    summary.update(WORDS)
+    assert len(summary) == CAPACITY
+    assert_guarantees(summary, Counter(WORDS), len(WORDS))
+
+@pytest.mark.parametrize("shards", [2, 8])
+def test_merged_shards_keep_guarantees(shards):
+    merged = SpaceSavingCounter(CAPACITY)
+    for i in range(shards):
+        shard = SpaceSavingCounter(CAPACITY)
+        shard.update(WORDS[i::shards])
+        merged.merge(shard)
+    assert_guarantees(merged, Counter(WORDS), len(WORDS))
+
+def test_exact_below_capacity():
+    words = ["fração", "álgebra", "fração", "geometria", "fração", "álgebra"]
+    summary = SpaceSavingCounter(CAPACITY)
+    summary.update(words)
+    assert summary.most_common() == Counter(words).most_common()
+    assert summary.max_error() == 0
+
+def test_update_accepts_counts():
+    counts = Counter(WORDS)
+    summary = SpaceSavingCounter.from_counter(counts, CAPACITY)
+    assert_guarantees(summary, counts, len(WORDS))
+
+def test_dict_round_trip():
+    summary = SpaceSavingCounter(CAPACITY)
+    summary.update(WORDS)
+    restored = SpaceSavingCounter.from_dict(summary.to_dict())
+    assert restored.most_common() == summary.most_common()
+    assert restored.max_error() == summary.max_error()
+
+    # O estado restaurado continua recebendo itens com as mesmas garantias
+    restored.update(WORDS)
+    assert_guarantees(restored, Counter(WORDS * 2), 2 * len(WORDS))